@@ -39,6 +39,7 @@ from config import defaults
 
 import hela_data
 import hela_data.io.filenames
+from hela_data.io.matrix import SparseMatrix
 from hela_data.log import setup_nb_logger
 
 logger = setup_nb_logger()
@@ -55,7 +56,7 @@ FIGSIZE = (15, 10)
 # %% tags=["parameters"]
 N_MIN_INSTRUMENT = 300
 META_DATA: str = 'data/pride_metadata.csv'
-FILE_EXT = 'pkl'  # 'csv' or 'pkl'
+FILE_EXT = 'pkl'  # 'csv', 'pkl' or 'sparse' (folder of a SparseMatrix, only observed values)
 SAMPLE_ID = 'Sample ID'
 
 # DUMP: str = erda_dumps.FN_PROTEIN_GROUPS  # Filepath to erda dump
@@ -87,12 +88,18 @@ files_out = dict()
 # ## Dumps
 
 # %% [markdown]
-# - load dumps
+# - load dumps: pickled DataFrame or folder of a `SparseMatrix` (`erda_03_training_data` with `SPARSE`)
 # - load file to machine mappings
 
 # %%
-data = pd.read_pickle(DUMP)
-data = data.squeeze()  # In case it is a DataFrame, not a series (-> leads to MultiIndex)
+if DUMP.is_dir():
+    # only observed values, counts and selections of samples work on the sparse matrix
+    data = SparseMatrix.load(DUMP)
+    if data.index.name != SAMPLE_ID:
+        data = data.T  # samples as rows
+else:
+    data = pd.read_pickle(DUMP)
+    data = data.squeeze()  # In case it is a DataFrame, not a series (-> leads to MultiIndex)
 # name_data = data.name
 logger.info(
     f"Number of rows (row = sample, feature, intensity): {len(data):,d}")
@@ -272,7 +279,9 @@ reducer = umap.UMAP(random_state=42)
 data
 
 # %%
-embedding = reducer.fit_transform(data.fillna(data.median()))
+data_dense = data.to_dense() if isinstance(data, SparseMatrix) else data
+embedding = reducer.fit_transform(data_dense.fillna(data_dense.median()))
+del data_dense
 embedding = pd.DataFrame(embedding, index=data.index,
                          columns=['UMAP 1', 'UMAP 2'])
 embedding = embedding.join(
@@ -432,7 +441,8 @@ cols = selected_instruments.index.names
 
 file_formats = {'pkl': 'to_pickle',
                 'pickle': 'to_pickle',
-                'csv': 'to_csv'}
+                'csv': 'to_csv',
+                'sparse': 'save'}
 
 
 for values in selected_instruments.index:
@@ -10,6 +10,7 @@ os to pathlib functionaly, see
 https://docs.python.org/3/library/pathlib.html#correspondence-to-tools-in-the-os-module
 
 """
+import functools
 import hela_data.io
 import logging
 import yaml
@@ -19,7 +20,6 @@ from pprint import pformat
 
 import numpy as np
 import pandas
-import matplotlib as mpl
 
 
 def mkdir(path=Path):
@@ -50,53 +50,73 @@ PROTEIN_DUMPS = PROCESSED_DATA
 ###############################################################################
 ###############################################################################
 # Adapt this part
-ON_ERDA = True
-# local PC config
-FOLDER_MQ_TXT_DATA = None
-
 FOLDERS_MQ_TXT_DATA = [
     Path('Y:/') / 'mq_out',
     FOLDER_DATA / 'mq_out',
     Path('/home/jovyan/work/mq_out/'),
 ]
-for folder in FOLDERS_MQ_TXT_DATA[:-1]:
-    if folder.exists():
-        print(f'FOLDER_MQ_TXT_DATA = {folder}')
-        FOLDER_MQ_TXT_DATA = folder
-        ON_ERDA = False
-        break
-
-if FOLDERS_MQ_TXT_DATA[-1].exists():
-    print(f'FOLDER_MQ_TXT_DATA = {folder}')
-    FOLDER_MQ_TXT_DATA = folder
-
-if not FOLDER_MQ_TXT_DATA:
-    print(
-        'Not found. Check FOLDER_MQ_TXT_DATA entries above: {}'.format(
-            ", ".join([str(fname) for fname in FOLDERS_MQ_TXT_DATA])
+# set on first access by find_mq_txt_data
+LAZY_PATHS = ('ON_ERDA', 'FOLDER_MQ_TXT_DATA', 'FOLDER_RAW_DATA')
+
+
+@functools.lru_cache(maxsize=None)
+def find_mq_txt_data() -> dict:
+    """Probe `FOLDERS_MQ_TXT_DATA` for the folder of MaxQuant outputs.
+    Is called on first access of one of `LAZY_PATHS`, e.g. `config.FOLDER_MQ_TXT_DATA`,
+    instead of on import."""
+    ON_ERDA = True
+    # local PC config
+    FOLDER_MQ_TXT_DATA = None
+    for folder in FOLDERS_MQ_TXT_DATA[:-1]:
+        if folder.exists():
+            print(f'FOLDER_MQ_TXT_DATA = {folder}')
+            FOLDER_MQ_TXT_DATA = folder
+            ON_ERDA = False
+            break
+
+    if FOLDERS_MQ_TXT_DATA[-1].exists():
+        print(f'FOLDER_MQ_TXT_DATA = {FOLDERS_MQ_TXT_DATA[-1]}')
+        FOLDER_MQ_TXT_DATA = FOLDERS_MQ_TXT_DATA[-1]
+
+    if not FOLDER_MQ_TXT_DATA:
+        print(
+            'Not found. Check FOLDER_MQ_TXT_DATA entries above: {}'.format(
+                ", ".join([str(fname) for fname in FOLDERS_MQ_TXT_DATA])
+            )
         )
-    )
-    FOLDER_MQ_TXT_DATA = FOLDERS_MQ_TXT_DATA[1]
-    FOLDER_MQ_TXT_DATA.mkdir()
-    ON_ERDA = False
-    print(f"Created local folder: {FOLDER_MQ_TXT_DATA}")
-
-if ON_ERDA:
-    import sys
-    sys.path.append('/home/jovyan/work/hela_data/')
-
-    FOLDER_MQ_TXT_DATA = Path('/home/jovyan/work/mq_out/')
-    if FOLDER_MQ_TXT_DATA.exists():
-        print(f'FOLDER_MQ_TXT_DATA = {FOLDER_MQ_TXT_DATA}')
-    else:
-        raise FileNotFoundError(f"Check config for FOLDER_MQ_TXT_DATA")
+        FOLDER_MQ_TXT_DATA = FOLDERS_MQ_TXT_DATA[1]
+        FOLDER_MQ_TXT_DATA.mkdir()
+        ON_ERDA = False
+        print(f"Created local folder: {FOLDER_MQ_TXT_DATA}")
+
+    paths = {'ON_ERDA': ON_ERDA, 'FOLDER_MQ_TXT_DATA': FOLDER_MQ_TXT_DATA}
+    if ON_ERDA:
+        import sys
+        sys.path.append('/home/jovyan/work/hela_data/')
+
+        FOLDER_MQ_TXT_DATA = Path('/home/jovyan/work/mq_out/')
+        if FOLDER_MQ_TXT_DATA.exists():
+            print(f'FOLDER_MQ_TXT_DATA = {FOLDER_MQ_TXT_DATA}')
+        else:
+            raise FileNotFoundError(f"Check config for FOLDER_MQ_TXT_DATA")
+
+        FOLDER_RAW_DATA = Path('/home/jovyan/work/share_hela_raw/')
+        if FOLDER_RAW_DATA.exists():
+            print(f'FOLDER_RAW_DATA = {FOLDER_RAW_DATA}')
+        else:
+            raise FileNotFoundError(
+                f"Check config for FOLDER_RAW_DATA: {FOLDER_RAW_DATA}")
+        paths.update(FOLDER_MQ_TXT_DATA=FOLDER_MQ_TXT_DATA, FOLDER_RAW_DATA=FOLDER_RAW_DATA)
+    return paths
+
+
+def __getattr__(name):
+    if name in LAZY_PATHS:
+        paths = find_mq_txt_data()
+        if name in paths:
+            return paths[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    FOLDER_RAW_DATA = Path('/home/jovyan/work/share_hela_raw/')
-    if FOLDER_RAW_DATA.exists():
-        print(f'FOLDER_RAW_DATA = {FOLDER_RAW_DATA}')
-    else:
-        raise FileNotFoundError(
-            f"Check config for FOLDER_RAW_DATA: {FOLDER_RAW_DATA}")
 
 # FOLDER_KEY  = None
 
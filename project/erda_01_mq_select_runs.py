@@ -35,6 +35,7 @@ import matplotlib.pyplot as plt
 
 from hela_data.io.data_objects import MqAllSummaries
 from hela_data import plotting
+from hela_data.io.catalog import FolderCatalog
 from hela_data.io.mq import MaxQuantOutputDynamic
 
 import config
@@ -63,18 +64,31 @@ logging.info('Start with handlers: \n' + "\n".join(f"- {repr(log_)}" for log_ in
 ELIGABLE_FILES_YAML = Path('config/eligable_files.yaml')
 ELIGABLE_FILE_PATHS = Path('config/file_paths')
 FPATH_ALL_SUMMARIES = FOLDER_PROCESSED / 'all_summaries.json'
+FPATH_CATALOG = FOLDER_PROCESSED / 'mq_txt_catalog.json'
 FN_RAWFILE_METADATA = 'data/rawfile_metadata.csv'
 
 logger.info(f"Search Raw-Files on path: {FOLDER_MQ_TXT_DATA}")
 
+# %% [markdown]
+# Catalog of MQ output folders and their files. Only new or changed folders are scanned
+# on a refresh.
+
+# %%
+# %%time
+catalog = FolderCatalog(FOLDER_MQ_TXT_DATA, fp_catalog=FPATH_CATALOG)
+changes = catalog.refresh()
+logger.info(f"Catalog of {len(catalog):,d} folders: " + ", ".join(f"{len(v):,d} {k}" for k, v in changes.items()))
+
 # %%
 # Initally query folders once
-# folders = [folder for folder in Path(FOLDER_MQ_TXT_DATA).iterdir() if folder.is_dir()
-#            and not folder.name.startswith('.')]
+# folders = catalog.get_folders()
 
 with open(ELIGABLE_FILES_YAML) as f:
     folders = yaml.safe_load(f)['files']
     folders = [FOLDER_MQ_TXT_DATA  / folder for folder in folders]
+missing = [folder for folder in folders if folder not in catalog]
+if missing:
+    logger.warning(f"Eligable folders not found in {FOLDER_MQ_TXT_DATA}: {len(missing)}")
 folders[:10]
 
 # %%
@@ -89,7 +103,7 @@ w_file = widgets.Dropdown(options=folders_dict, description='View files')
 w_file
 
 # %%
-mq_output = MaxQuantOutputDynamic(w_file.value)
+mq_output = MaxQuantOutputDynamic(w_file.value, catalog=catalog)
 mq_output
 
 # %%
@@ -107,7 +121,14 @@ print(f"Results will be saved in subfolders in\n\t{str(FOLDER_PROCESSED.absolute
 pd.options.display.max_columns = 49
 mq_all_summaries = MqAllSummaries(FPATH_ALL_SUMMARIES)
 logger.info(f"{FPATH_ALL_SUMMARIES = }")
-mq_all_summaries.load_new_samples(folders=folders)
+# only the first row of each summary.txt is read, summaries of new folders are appended to the state
+mq_all_summaries.load_new_samples(folders=folders, workers=8, executor='thread')
+
+# %%
+# summaries of new folders were appended as Parquet parts by load_new_samples.
+# The JSON (and pickle) export for other notebooks (e.g. 00_3_0) is a full rewrite,
+# which is skipped if no summaries were appended since the last export.
+mq_all_summaries.save_state()
 
 # %%
 if mq_all_summaries.empty_folders:
@@ -17,6 +17,7 @@
 
 # %%
 from collections import Counter
+from functools import partial
 import os
 import logging
 from pathlib import Path
@@ -27,8 +28,9 @@ import pandas as pd
 from tqdm.notebook import tqdm
 
 import hela_data.pandas
-from hela_data.io.data_objects import PeptideCounter
+from hela_data.io.data_objects import MultiLevelCounter, PEPTIDES, EVIDENCE, PROTEIN_GROUPS, GENES, count_all_levels
 from hela_data.io import mq
+from hela_data.io.catalog import FolderCatalog
 from hela_data.io.mq import MaxQuantOutputDynamic
 
 ##### CONFIG #####
@@ -46,7 +48,7 @@ def rename_dumps(counter, ids):
     for k, v in tqdm(counter.dumps.copy().items()):
         old_name = v
         new_key = ids.loc[k, 'new_sample_id']
-        new_name = v.parent / (new_key + '.csv')
+        new_name = v.parent / (new_key + v.suffix)
         try:
             os.rename(old_name, new_name)
             del counter.dumps[k]
@@ -94,11 +96,17 @@ df_ids = pd.read_csv(fn_id_old_new, index_col=0)
 df_ids
 
 # %% [markdown]
-# Select files and create list of folders
+# Select files and create list of folders. The folders are looked up in the catalog
+# of MQ output folders (see `erda_01_mq_select_runs`), which is refreshed for changed folders.
+
+# %%
+catalog = FolderCatalog(FOLDER_MQ_TXT_DATA, fp_catalog=FOLDER_PROCESSED / 'mq_txt_catalog.json')
+_ = catalog.refresh()
 
 # %%
 files = [file for file in files if file in df_ids.index]
-folders_dict = {sample_id: FOLDER_MQ_TXT_DATA / sample_id for sample_id in files}
+folders_dict = {sample_id: FOLDER_MQ_TXT_DATA / sample_id for sample_id in files
+                if sample_id in catalog}
 # folders_dict = {p.stem : p.parent / p.stem for p in folders_dict}
 # folders_dict
 folders = [Path(folder_path) for folder_path in folders_dict.values()]
@@ -117,7 +125,7 @@ FNAME_C_PEPTIDES, FNAME_C_EVIDENCE, FNAME_C_PG, FNAME_C_GENES
 # %%
 pd.set_option('display.max_columns', 60)
 random_folder, random_path = random.sample(folders_dict.items(), 1)[0]
-mq_output = MaxQuantOutputDynamic(random_path)
+mq_output = MaxQuantOutputDynamic(random_path, catalog=catalog)
 print(f"peptides.txt from {random_folder!s}")
 mq_output.peptides
 
@@ -146,31 +154,41 @@ peptides = hela_data.io.data_objects.load_process_peptides(random_path,
 peptides
 
 # %% [markdown]
-# ## Count aggregated peptides
-
-# %%
-peptide_counter = PeptideCounter(FNAME_C_PEPTIDES, overwrite=OVERWRITE)
-peptide_counter
+# ## Count features of all levels
+#
+# Peptides, precursors, protein groups and genes are counted in one pass over the folders,
+# i.e. each folder is read once (see `count_all_levels`). Genes are counted on the processed
+# protein groups. The processing of each level is shown in the sections below.
+#
+# - creates intensity dumps for each MQ outputfolder and level, as Parquet files partitioned by year
 
 # %%
-if peptide_counter.loaded:
-    print(peptide_counter.counter.most_common(10),
-          len(peptide_counter.loaded),
-          sep='\n')
-else:
-    print('New file created.')
-
-# %% [markdown]
-# - creates peptide intensity dumps for each MQ outputfolder per default `count_peptides` function (default processing function for `PeptideCounter`)
+DUMP_FORMAT = 'parquet'  # or 'csv'
+counters = MultiLevelCounter({PEPTIDES: FNAME_C_PEPTIDES,
+                              EVIDENCE: FNAME_C_EVIDENCE,
+                              PROTEIN_GROUPS: FNAME_C_PG,
+                              GENES: FNAME_C_GENES},
+                             counting_fct=partial(count_all_levels, dump_format=DUMP_FORMAT),
+                             overwrite=OVERWRITE)
+counters
 
 # %%
 # %%time
-c = peptide_counter.sum_over_files(folders=folders)
+counts = counters.sum_over_files(folders=folders)
 
 # %%
-rename_dumps(peptide_counter, df_ids)
+for level in [PEPTIDES, EVIDENCE, PROTEIN_GROUPS]:
+    rename_dumps(counters[level], df_ids)
+# genes are based on the protein groups dumps
+counters[GENES].dumps = dict(counters[PROTEIN_GROUPS].dumps)
+counters[GENES].save()
+
+# %% [markdown]
+# ## Count aggregated peptides
 
 # %%
+peptide_counter = counters[PEPTIDES]
+c = counts[PEPTIDES]
 c.most_common(10)  # peptide_counter.counter.most_common(10)
 
 # %%
@@ -292,11 +310,9 @@ evidence
 # ## Count precursors based on evidence files
 
 # %%
-evidence_counter = hela_data.io.data_objects.EvidenceCounter(FNAME_C_EVIDENCE, overwrite=OVERWRITE)
-c = evidence_counter.sum_over_files(folders=folders)
-
-# %%
-rename_dumps(evidence_counter, df_ids)
+evidence_counter = counters[EVIDENCE]
+c = counts[EVIDENCE]
+c.most_common(10)
 
 # %% [markdown]
 # ## Protein Groups
@@ -411,7 +427,7 @@ selection_no_gene
 
 # %%
 selection = hela_data.pandas.select_max_by(df=selection.loc[~mask_no_gene].reset_index(), grouping_columns=[
-    pg_cols.Gene_names], selection_column=pg_cols.Score)
+    pg_cols.Gene_names], selection_column=pg_cols.Score).sort_values(by=pg_cols.Gene_names, ascending=False)
 logging.info(f"Selection shape after  dropping duplicates by gene: {selection.shape}")
 selection = selection.set_index(pg_cols.Protein_IDs)
 mask = selection[cols.Gene_names].isin(non_unique_genes)
@@ -431,11 +447,8 @@ hela_data.io.data_objects.load_and_process_proteinGroups(random_path)
 # ## Count protein groups (genes) based on proteinGroups files
 
 # %%
-protein_groups_counter = hela_data.io.data_objects.ProteinGroupsCounter(FNAME_C_PG, overwrite=OVERWRITE)
-c = protein_groups_counter.sum_over_files(folders=folders)
-
-# %%
-rename_dumps(protein_groups_counter, df_ids)
+protein_groups_counter = counters[PROTEIN_GROUPS]
+c = counts[PROTEIN_GROUPS]
 
 # %% [markdown]
 # Over 400,000 protein groups were only identified once (as exactly this group).
@@ -454,16 +467,8 @@ hela_data.pandas.counts_with_proportion(pd.Series(c))  # Most proteinGroups are
 # - If genes set are not unique for a single run, one would have to decide which to take
 
 # %%
-gene_counter = hela_data.io.data_objects.GeneCounter(FNAME_C_GENES, overwrite=OVERWRITE)
-
-if not gene_counter.dumps:
-    # empty dict, replace
-    gene_counter.dumps = dict(protein_groups_counter.dumps)  # prot proteinGroups files to GeneCounter
-pg_dumps = list(gene_counter.dumps.values())
-
-c_genes = gene_counter.sum_over_files(folders=pg_dumps)
-
-c_genes = pd.Series(c_genes)
+gene_counter = counters[GENES]
+c_genes = pd.Series(counts[GENES])
 hela_data.pandas.counts_with_proportion(c_genes)  # Most proteinGroups are unique
 
 # %% [markdown] Collapsed="false"
@@ -23,17 +23,12 @@
 #    - collect in wide format data from output files
 
 # %%
-from functools import partial
 from pathlib import Path
-import logging
-import multiprocessing
 
-import numpy as np
 import pandas as pd
 
-from tqdm.notebook import tqdm_notebook
-
 import hela_data
+import hela_data.io.matrix
 
 import config
 
@@ -52,6 +47,10 @@ FEAT_COMPLETNESS_CUTOFF = 0.25  # Minimal proportion of samples which have to sh
 SAMPLE_COL = 'Sample ID'
 OUT_FOLDER = 'data/selected/'
 FN_ID_OLD_NEW: str = 'data/rename/selected_old_new_id_mapping.csv'  # selected samples with pride and original id
+N_WORKERS: int = 8  # Number of workers collecting intensities
+EXECUTOR: str = 'process'  # Executor backend: 'serial', 'thread', 'process' or 'cluster'
+DTYPE: str = 'Int64'  # dtype of intensities: 'Int64', 'float32' or 'float64' ('float32' needs less than half the memory)
+SPARSE: bool = False  # keep only observed intensities in a sparse matrix (memory scales with observed values)
 
 
 # %% [markdown]
@@ -146,13 +145,14 @@ selected_dumps[:10]
 
 
 # %% [markdown]
-# ## Collect in parallel
+# ## Load a single dump
 
 # %%
 def load_fct(path):
+    # CSV or Parquet dumps
     s = (
-        pd.read_csv(path, index_col=cfg.IDX_COLS_LONG[1:], usecols=[*cfg.IDX_COLS_LONG[1:], "Intensity"])
-        .squeeze()
+        hela_data.io.read_dump(path, index_col=cfg.IDX_COLS_LONG[1:], columns=["Intensity"])
+        .squeeze(axis=1)
         .astype(pd.Int64Dtype())
     )
     if len(cfg.IDX_COLS_LONG[1:]) > 1:
@@ -164,69 +164,45 @@ def load_fct(path):
 load_fct(selected_dumps[0][-1])
 
 
-# %%
-def collect(folders, index, load_fct):
-    current = multiprocessing.current_process()
-    i = current._identity[0] % N_WORKERS + 1
-    print(" ", end="", flush=True)
-
-    failed = []
-    all = pd.DataFrame(index=index)
-
-    with tqdm_notebook(total=len(folders), position=i) as pbar:
-        for id, path in folders:
-            try:
-                s = load_fct(path)
-                s.name = id
-                all = all.join(s, how='left')
-            except FileNotFoundError:
-                logging.warning(f"File not found: {path}")
-                failed.append((id, path))
-            except pd.errors.EmptyDataError:
-                logging.warning(f"Empty file: {path}")
-                failed.append((id, path))
-            pbar.update(1)
-
-    return all
-
-
 # %% [markdown]
 # ## Collect intensities in parallel
+#
+# - the wide matrix is preallocated for the selected features and all dumps
+# - blocks of samples are loaded in parallel and filled in by index lookup
+# - `SPARSE`: only the observed intensities are kept in a sparse matrix (CSC), which is
+#   saved to a folder instead of pickle and csv files
 
 # %%
 all = None  # free memory
 
-collect_intensities = partial(collect, index=IDX_selected, load_fct=load_fct)
-
-N_WORKERS = 8
-
-with multiprocessing.Pool(N_WORKERS) as p:
-    all = list(
-        tqdm_notebook(
-            p.imap(collect_intensities,
-                   np.array_split(selected_dumps, N_WORKERS)),
-            total=N_WORKERS,
-        )
-    )
-
-all = pd.concat(all, axis=1)
+all = hela_data.io.matrix.collect_wide(IDX_selected,
+                                       selected_dumps,
+                                       load_fct=load_fct,
+                                       dtype=DTYPE,
+                                       n_workers=N_WORKERS,
+                                       executor=EXECUTOR,
+                                       sparse=SPARSE)
 all
 
 # %%
-all.memory_usage(deep=True).sum() / (2**20)
+all.nbytes / (2**20) if SPARSE else all.memory_usage(deep=True).sum() / (2**20)
 
 # %%
 all.head()
 
 # %%
 # %%time
-fname = out_folder / config.insert_shape(all, 'intensities_wide_selected{}.pkl')
-all.to_pickle(fname)
+if SPARSE:
+    fname = all.save(out_folder / config.insert_shape(all, 'intensities_wide_selected{}'))
+else:
+    fname = out_folder / config.insert_shape(all, 'intensities_wide_selected{}.pkl')
+    all.to_pickle(fname)
 fname
 
 # %%
 # %%time
-all.to_csv(fname.with_suffix('.csv'), chunksize=1_000)
+if not SPARSE:
+    all.to_csv(fname.with_suffix('.csv'), chunksize=1_000)
 
 # %% [markdown]
 # Samples as rows, feature columns as columns
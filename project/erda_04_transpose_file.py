@@ -21,12 +21,18 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 import hela_data
+import hela_data.io.matrix
 
 import config
 
 # %% [markdown]
 # Paramters
 
+# %%
+MAX_MEMORY: int = 2**30  # bytes of values held in memory at once while transposing
+STORE_DTYPE: str = 'float64'  # dtype of the on-disk matrices, float64 keeps integer intensities exact
+DTYPE: str = 'Int64'  # dtype of the transposed DataFrame
+
 # %%
 out_folder = Path('data/selected/geneGroups')
 fname = out_folder / 'intensities_wide_selected_N04547_M07444.pkl'
@@ -90,9 +96,23 @@ ax = count_samples.sort_values().plot(rot=90, ylabel='observations')
 ax.yaxis.set_major_formatter("{x:,.0f}")
 hela_data.savefig(ax.get_figure(), fname)
 
+# %% [markdown]
+# Transpose out-of-core: store the matrix as memory-mappable blocked layout, free the
+# DataFrame and transpose on disk in tiles of at most `MAX_MEMORY` bytes. Only one
+# orientation is held in memory at a time.
+
+# %%
+# %%time
+folder_store = out_folder / Path(config.insert_shape(df, template=template)).stem
+folder_store_T = out_folder / Path(config.insert_shape(df, template=template, shape=df.shape[::-1])).stem
+hela_data.io.matrix.to_memmap(df, folder_store, dtype=STORE_DTYPE, max_memory=MAX_MEMORY)
+df = None  # free memory
+hela_data.io.matrix.transpose_memmap(folder_store, folder_store_T, max_memory=MAX_MEMORY)
+files_out[folder_store_T.name] = folder_store_T.as_posix()
+
 # %%
 # %%time
-df = df.T
+df = hela_data.io.matrix.read_memmap(folder_store_T, dtype=DTYPE)
 df.memory_usage(deep=True).sum() / (2**20)
 
 # %%
@@ -0,0 +1,61 @@
+# ---
+# jupyter:
+#   jupytext:
+#     text_representation:
+#       extension: .py
+#       format_name: percent
+#       format_version: '1.3'
+#       jupytext_version: 1.15.2
+#   kernelspec:
+#     display_name: hela_data
+#     language: python
+#     name: hela_data
+# ---
+
+# %% [markdown]
+# # Chunked store of intensity matrices
+#
+# Convert the selected intensity matrices (`intensities_wide_selected_N*_M*.pkl`) to a
+# `ChunkedMatrix`: float32 values with NaN for missing values stored in tiles, so that
+# all features of a sample, a feature across all samples or any sub-block are read
+# from the same store. Only one orientation of each matrix has to be converted.
+
+# %%
+from pathlib import Path
+
+from hela_data.io.matrix import ChunkedMatrix
+
+from config import erda_dumps
+
+# %% tags=["parameters"]
+CHUNK_ROWS: int = 256  # rows of a tile (samples)
+CHUNK_COLS: int = 256  # columns of a tile (features)
+
+# %%
+fnames = [Path(fname) for fname in erda_dumps.ERDA_DUMPS]  # samples as rows
+fnames
+
+# %% [markdown]
+# ## Convert pickled DataFrames
+
+# %%
+# %%time
+stores = {}
+for fname in fnames:
+    if not fname.exists():
+        print(f"Not found: {fname}")
+        continue
+    stores[fname.stem] = ChunkedMatrix.from_pickle(fname, chunks=(CHUNK_ROWS, CHUNK_COLS))
+stores
+
+# %% [markdown]
+# ## Read from a store
+#
+# - all features of the first sample
+# - the first feature across all samples
+
+# %%
+if stores:
+    matrix = next(iter(stores.values()))
+    display(matrix.iread(rows=[0]))
+    display(matrix.iread(columns=[0]))
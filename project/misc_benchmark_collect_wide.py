@@ -0,0 +1,112 @@
+# ---
+# jupyter:
+#   jupytext:
+#     text_representation:
+#       extension: .py
+#       format_name: percent
+#       format_version: '1.3'
+#       jupytext_version: 1.15.2
+#   kernelspec:
+#     display_name: hela_data
+#     language: python
+#     name: hela_data
+# ---
+
+# %% [markdown]
+# # Benchmark collection of the wide intensity table
+#
+# `erda_03_training_data` collects the intensities of the selected features from the
+# dumps of all samples into a wide table (features x samples).
+#
+# - previous implementation: join the intensities of each sample to a growing DataFrame,
+#   which copies the DataFrame once per sample
+# - `hela_data.io.matrix.collect_wide`: preallocate the matrix and fill each column by
+#   index lookup, blocks of samples are loaded in parallel
+
+# %%
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import hela_data.io.matrix
+
+# %% [markdown]
+# Simulate Parquet dumps of samples with about 60% of a pool of peptides each and
+# select the features observed in at least 25% of the samples.
+
+# %% tags=["parameters"]
+N_SAMPLES: int = 500  # number of samples (dumps)
+N_PEPTIDES: int = 50_000  # number of peptides in pool
+N_WORKERS: int = 4  # number of workers of collect_wide
+EXECUTOR: str = 'process'  # executor backend of collect_wide
+
+# %%
+rng = np.random.default_rng(42)
+AMINO_ACIDS = np.array(list('ACDEFGHILMNPQRSTVWY'))
+peptides = pd.Index([''.join(rng.choice(AMINO_ACIDS, size=length)) + 'K'
+                     for length in rng.integers(6, 25, size=N_PEPTIDES)],
+                    name='Sequence').unique()
+# common peptides are observed more often
+p_observed = np.clip(rng.beta(2, 1.3, size=len(peptides)), 0.01, 1)
+
+folder = Path(tempfile.mkdtemp())
+dumps = []
+for i in range(N_SAMPLES):
+    mask = rng.random(len(peptides)) < p_observed
+    s = pd.Series(rng.lognormal(18, 2, size=mask.sum()).round().astype(np.int64),
+                  index=peptides[mask], name='Intensity')
+    fname = folder / f'sample_{i:04d}.parquet'
+    s.to_frame().to_parquet(fname)
+    dumps.append((fname.stem, fname))
+
+IDX_selected = peptides[p_observed >= 0.25]
+print(f"Selected {len(IDX_selected):,d} of {len(peptides):,d} peptides in {len(dumps):,d} dumps.")
+
+
+# %%
+def load_fct(path):
+    return pd.read_parquet(path).squeeze(axis=1).astype(pd.Int64Dtype())
+
+
+# %% [markdown]
+# Previous implementation (on a single worker)
+
+# %%
+def collect_by_join(folders, index, load_fct):
+    all = pd.DataFrame(index=index)
+    for id, path in folders:
+        s = load_fct(path)
+        s.name = id
+        all = all.join(s, how='left')
+    return all
+
+
+times = {}
+start = time.perf_counter()
+expected = collect_by_join(dumps, IDX_selected, load_fct)
+times['join'] = time.perf_counter() - start
+
+# %%
+for n_workers in [1, N_WORKERS]:
+    start = time.perf_counter()
+    actual = hela_data.io.matrix.collect_wide(IDX_selected, dumps, load_fct, dtype='Int64',
+                                              n_workers=n_workers, executor=EXECUTOR)
+    times[f'collect_wide (Int64, {n_workers} workers)'] = time.perf_counter() - start
+pd.testing.assert_frame_equal(actual, expected)
+
+start = time.perf_counter()
+actual = hela_data.io.matrix.collect_wide(IDX_selected, dumps, load_fct, dtype='float32',
+                                          n_workers=N_WORKERS, executor=EXECUTOR)
+times[f'collect_wide (float32, {N_WORKERS} workers)'] = time.perf_counter() - start
+times = pd.Series(times, name='seconds')
+times.to_frame().assign(speedup=times['join'] / times)
+
+# %% [markdown]
+# Memory of the wide table in MiB
+
+# %%
+pd.Series({'Int64': expected.memory_usage(deep=True).sum(),
+           'float32': actual.memory_usage(deep=True).sum()}) / 2**20
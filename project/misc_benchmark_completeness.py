@@ -0,0 +1,113 @@
+# ---
+# jupyter:
+#   jupytext:
+#     text_representation:
+#       extension: .py
+#       format_name: percent
+#       format_version: '1.3'
+#       jupytext_version: 1.15.2
+#   kernelspec:
+#     display_name: hela_data
+#     language: python
+#     name: hela_data
+# ---
+
+# %% [markdown]
+# # Benchmark completeness calculation
+#
+# Completeness of a gene in a sample: proportion of exactly cleaved peptides of its razor
+# protein which are contained in any peptide found for the gene in the sample
+# (see `ExtractFromPeptidesTxt`).
+#
+# - previous implementation: double loop with `in` checks (and debug logging) per pair of peptides
+# - `PeptideMatcher`: observed peptides of a run are compiled once, each exact peptide
+#   is looked up using a single substring search restricted to the peptides of a gene
+#
+# `PeptideMatcher` still loops over the exact peptides (one `str.find` each). A
+# pure-Python Aho-Corasick automaton over all exact peptides, which scans the observed
+# peptides once, gave the same completeness, but was more than 100x slower than
+# `PeptideMatcher` on this simulation (about 14 s vs. 0.1 s), as it steps through the
+# text character by character in Python.
+
+# %%
+import logging
+import timeit
+
+import numpy as np
+
+from hela_data.io import mq
+
+logger = logging.getLogger('hela_data')
+
+# %% [markdown]
+# Simulate a run with tryptic peptides of random proteins
+
+# %%
+N_GENES = 4_000
+rng = np.random.default_rng(42)
+AMINO_ACIDS = np.array(list('ACDEFGHIKLMNPQRSTVWY'))
+
+
+def random_exact_peptides(n_peptides):
+    lengths = rng.integers(6, 25, size=n_peptides)
+    return [''.join(rng.choice(AMINO_ACIDS[AMINO_ACIDS != 'K'], size=length)) + 'K'
+            for length in lengths]
+
+
+genes = {}
+for i in range(N_GENES):
+    peps_exact = random_exact_peptides(rng.integers(5, 60))
+    # found peptides: subset of exact peptides, some with one missed cleavage
+    n_found = rng.integers(1, len(peps_exact) + 1)
+    idx = np.sort(rng.choice(len(peps_exact) - 1, size=min(n_found, len(peps_exact) - 1), replace=False))
+    peps_found = [peps_exact[j] + peps_exact[j + 1] if rng.random() < 0.2 else peps_exact[j]
+                  for j in idx]
+    genes[f'GENE{i}'] = (peps_exact, peps_found)
+sum(len(v[1]) for v in genes.values())
+
+
+# %% [markdown]
+# Previous implementation
+
+# %%
+def calculate_completness_for_sample_loop(peps_exact_cleaved, peps_in_data):
+    c = 0
+    if not peps_exact_cleaved:
+        return 0  # no exact peptides
+    for i, _pep in enumerate(peps_exact_cleaved):
+        logger.debug(f"Check if exact peptide matches: {_pep}")
+        for _found_pep in peps_in_data:
+            logger.debug(f"Check for peptide: {_found_pep}")
+            if _pep in _found_pep:
+                c += 1
+                break
+        if c == len(peps_in_data):
+            break
+    return c / len(peps_exact_cleaved)
+
+
+def completeness_loop():
+    return {gene: calculate_completness_for_sample_loop(peps_exact, peps_found)
+            for gene, (peps_exact, peps_found) in genes.items()}
+
+
+def completeness_matcher():
+    matcher = mq.PeptideMatcher(pep for _, peps_found in genes.values() for pep in peps_found)
+    completeness, start = {}, 0
+    for gene, (peps_exact, peps_found) in genes.items():
+        stop = start + len(peps_found)
+        completeness[gene] = matcher.completeness(peps_exact, start=start, stop=stop)
+        start = stop
+    return completeness
+
+
+assert completeness_loop() == completeness_matcher()
+
+# %%
+times = {}
+for fct in [completeness_loop, completeness_matcher]:
+    times[fct.__name__] = min(timeit.repeat(fct, number=1, repeat=3))
+times
+
+# %%
+print(f"Speedup: {times['completeness_loop'] / times['completeness_matcher']:.1f}x")
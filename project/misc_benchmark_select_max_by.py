@@ -0,0 +1,90 @@
+# ---
+# jupyter:
+#   jupytext:
+#     text_representation:
+#       extension: .py
+#       format_name: percent
+#       format_version: '1.3'
+#       jupytext_version: 1.15.2
+#   kernelspec:
+#     display_name: hela_data
+#     language: python
+#     name: hela_data
+# ---
+
+# %% [markdown]
+# # Benchmark selection of best rows per group
+#
+# `select_max_by` selects for each precursor `(Sequence, Charge)` in `evidence.txt` the row
+# with the highest `Score` (and for each gene set in `proteinGroups.txt` the protein group
+# with the highest `Score`).
+#
+# - previous implementation: sort the whole table by the grouping columns and the score,
+#   then drop duplicates
+# - `hela_data.pandas.select_max_by`: hashed groups and the maximum per group broadcast to
+#   the rows (`groupby.transform`). The selected rows keep their original order, callers
+#   sort them if needed. `numpy.ufunc.at` is not used, as it is only fast from numpy 1.25 on.
+
+# %%
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import hela_data.pandas
+
+# %% [markdown]
+# Simulate an evidence table of a HeLa run: about 150,000 evidence entries (after filtering)
+# of about 60,000 precursors, some with missing scores. Set `FN_EVIDENCE` to use a real table.
+
+# %% tags=["parameters"]
+N_ROWS: int = 150_000  # number of evidence entries
+N_PRECURSORS: int = 60_000  # number of unique precursors
+FN_EVIDENCE: str = None  # optional path to an evidence.txt
+
+# %%
+rng = np.random.default_rng(42)
+AMINO_ACIDS = np.array(list('ACDEFGHILMNPQRSTVWY'))
+
+if FN_EVIDENCE:
+    evidence = pd.read_table(FN_EVIDENCE, usecols=['Sequence', 'Charge', 'Score', 'Intensity'])
+else:
+    sequences = np.array([''.join(rng.choice(AMINO_ACIDS, size=length)) + 'K'
+                          for length in rng.integers(6, 25, size=N_PRECURSORS)], dtype=object)
+    idx = rng.integers(0, N_PRECURSORS, size=N_ROWS)
+    evidence = pd.DataFrame({'Sequence': sequences[idx],
+                             'Charge': rng.integers(1, 5, size=N_ROWS),
+                             'Score': rng.gamma(2, 40, size=N_ROWS).round(1),
+                             'Intensity': rng.lognormal(18, 2, size=N_ROWS).round()})
+    evidence.loc[rng.random(N_ROWS) < 0.01, 'Score'] = np.nan
+evidence.shape
+
+
+# %% [markdown]
+# Previous implementation
+
+# %%
+def select_max_by_sorting(df, grouping_columns, selection_column):
+    df = df.sort_values(by=[*grouping_columns, selection_column], ascending=False)
+    df = df.drop_duplicates(subset=grouping_columns,
+                            keep='first')
+    return df
+
+
+GROUPING_COLUMNS = ['Sequence', 'Charge']
+
+expected = select_max_by_sorting(evidence, GROUPING_COLUMNS, 'Score')
+actual = hela_data.pandas.select_max_by(evidence, GROUPING_COLUMNS, 'Score')
+pd.testing.assert_frame_equal(actual, expected.sort_index())
+actual.shape
+
+# %%
+times = {}
+for fct in [select_max_by_sorting, hela_data.pandas.select_max_by]:
+    times[fct.__name__] = min(timeit.repeat(lambda: fct(evidence, GROUPING_COLUMNS, 'Score'),
+                                            number=1, repeat=5))
+print(np.__version__, pd.__version__)
+times
+
+# %%
+print(f"Speedup: {times['select_max_by_sorting'] / times['select_max_by']:.1f}x")
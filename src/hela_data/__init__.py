@@ -1,4 +1,5 @@
 # Set default logging handler to avoid "No handler found" warnings.
+import importlib
 import logging
 from logging import NullHandler
 
@@ -6,8 +7,6 @@ from logging import NullHandler
 import pandas as pd
 import pandas.io.formats.format as pf
 
-import hela_data.plotting
-from hela_data.plotting import savefig
 import hela_data.pandas
 
 logging.getLogger(__name__).addHandler(NullHandler())
@@ -27,3 +26,10 @@ pd.options.display.float_format = '{:,.3f}'.format
 pf.IntArrayFormatter = IntArrayFormatter
 
 
+def __getattr__(name):
+    # matplotlib and seaborn are only loaded when plotting is used
+    if name == 'plotting':
+        return importlib.import_module('hela_data.plotting')
+    if name == 'savefig':
+        return importlib.import_module('hela_data.plotting').savefig
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -20,6 +20,7 @@ from hela_data.analyzers import Analysis
 
 from hela_data.pandas import _add_indices
 from hela_data.analyzers import long_format, wide_format
+from hela_data.io.matrix import SparseMatrix
 
 
 __doc__ = 'A collection of Analyzers to perform certain type of analysis.'
@@ -28,6 +29,13 @@ __doc__ = 'A collection of Analyzers to perform certain type of analysis.'
 ALPHA = 0.5
 
 
+def _as_frame(df: Union[pd.DataFrame, SparseMatrix]) -> pd.DataFrame:
+    """Dense DataFrame for methods which need all values, e.g. imputation."""
+    if isinstance(df, SparseMatrix):
+        return df.to_dense()
+    return df
+
+
 def verify_df(df,
               fname,
               index_col: str,  # could be potentially 0 for the first column
@@ -51,17 +59,20 @@ class AnalyzePeptides(SimpleNamespace):
 
     Attributes
     ----------
-    df:  pandas.DataFrame
-        current eagerly loaded data in wide format only: sample index, features in columns
+    df:  pandas.DataFrame or hela_data.io.matrix.SparseMatrix
+        current eagerly loaded data in wide format only: sample index, features in columns.
+        A SparseMatrix keeps only observed values, see `from_sparse`.
     stats: types.SimpleNamespace
         Some statistics of certain aspects. Normally each will be a DataFrame.
 
     Many more attributes are set dynamically depending on the concrete analysis.
     """
 
-    def __init__(self, data: pd.DataFrame,
+    def __init__(self, data: Union[pd.DataFrame, SparseMatrix],
                  is_log_transformed: bool = False,
                  is_wide_format: bool = True, ind_unstack: str = '',):
+        if not is_wide_format and isinstance(data, SparseMatrix):
+            raise ValueError("A SparseMatrix is always in wide format.")
         if not is_wide_format:
             if not ind_unstack:
                 raise ValueError("Please specify index level for unstacking via "
@@ -111,6 +122,21 @@ class AnalyzePeptides(SimpleNamespace):
                   usecols=usecols)
         return cls(data=df, **kwargs)  # all __init__ parameters are kwargs
 
+    @classmethod
+    def from_sparse(cls, folder: Union[str, Path, SparseMatrix],
+                    index_col: str = 'Sample ID',
+                    verify_fname: bool = False,
+                    **kwargs):
+        """Load a matrix saved by `SparseMatrix.save`, e.g. by `collect_wide(..., sparse=True)`.
+        A matrix with samples (`index_col`) in columns is transposed without copying."""
+        df = folder if isinstance(folder, SparseMatrix) else SparseMatrix.load(folder)
+        if df.columns.name == index_col:
+            df = df.T
+        verify_df(df=df, fname=folder,
+                  index_col=index_col,
+                  verify_fname=verify_fname and not isinstance(folder, SparseMatrix))
+        return cls(data=df, **kwargs)  # all __init__ parameters are kwargs
+
     def get_consecutive_dates(self, n_samples, seed=42):
         """Select n consecutive samples using a seed.
 
@@ -228,11 +254,13 @@ class AnalyzePeptides(SimpleNamespace):
         return df_wide
 
     def describe_peptides(self, sample_n: int = None):
-        if sample_n:
+        if sample_n and isinstance(self.df, SparseMatrix):
+            df = self.df.iselect(columns=np.random.choice(self.df.shape[1], size=sample_n, replace=False))
+        elif sample_n:
             df = self.df.sample(n=sample_n, axis=1)
         else:
             df = self.df
-        stats = df.describe()
+        stats = _as_frame(df).describe()
         stats.loc['CV'] = stats.loc['std'] / stats.loc['mean']
         self.stats.peptides = stats
         return stats
@@ -243,8 +271,9 @@ class AnalyzePeptides(SimpleNamespace):
 
     def get_PCA(self, n_components=2, imputer=SimpleImputer):
         self.imputer_ = imputer()
-        X = self.imputer_.fit_transform(self.df)
-        X = _add_indices(X, self.df)
+        df = _as_frame(self.df)
+        X = self.imputer_.fit_transform(df)
+        X = _add_indices(X, df)
         assert all(X.notna())
 
         PCs, self.pca_ = run_pca(X, n_components=n_components)
@@ -337,8 +366,12 @@ class AnalyzePeptides(SimpleNamespace):
         str
             Information on detection limit
         """
-        self.detection_limit = self.df.min().min() if self.is_log_transformed else np.log10(
-            self.df).min().min()  # all zeros become nan.
+        df = self.df
+        if isinstance(df, SparseMatrix):
+            # missing values are not stored, only the observed values are needed
+            df = pd.Series(df.matrix.data)
+        self.detection_limit = df.min().min() if self.is_log_transformed else np.log10(
+            df).min().min()  # all zeros become nan.
         return "Detection limit: {:6.3f}, corresponding to intensity value of {:,d}".format(
             self.detection_limit,
             int(10 ** self.detection_limit))
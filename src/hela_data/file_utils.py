@@ -1,11 +1,14 @@
 from pathlib import Path
 import logging
+import re
 
 import pandas as pd
 
 import xmltodict
 from numpy import dtype
 
+from hela_data.io.parsers import FALSE_VALUES, NA_VALUES, TRUE_VALUES, read_table
+
 logger = logging.getLogger('src.file_utils.py')
 
 
@@ -44,25 +47,74 @@ def check_for_key(iterable, key):
 # check tf.data
 
 
-def load_summary(filepath: str = 'summary.txt') -> pd.DataFrame:
+def load_summary(filepath: str = 'summary.txt', engine: str = None) -> pd.DataFrame:
     """Load MaxQuant {MQ_VERSION} summary.txt file.
 
     Parameters
     ----------
     filepath : str, optional
         filepath, by default 'summary.txt'
+    engine : str, optional
+        parse engine, see `hela_data.io.parsers.read_table`, by default None
 
     Returns
     -------
     pd.DataFrame
         Text-File is returned as pandas.DataFrame
     """.format(MQ_VERSION=MQ_VERSION)
-    df = pd.read_table(filepath)
+    df = read_table(filepath, engine=engine)
     df = df.T
     df = df.iloc[:, :-1]
     return df
 
 
+_NA_VALUES = frozenset(NA_VALUES)
+_BOOL_VALUES = {**dict.fromkeys(TRUE_VALUES, True), **dict.fromkeys(FALSE_VALUES, False)}
+# numbers as accepted by the pandas C parser: ASCII digits only, no digit separators
+_RE_INT = re.compile(r' *[+-]?[0-9]+ *')
+_RE_FLOAT = re.compile(r' *[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)? *|[+-]?(?:inf|infinity)',
+                       flags=re.IGNORECASE)
+_INT_MIN, _UINT_MAX = -2**63, 2**64 - 1
+
+
+def _parse_value(value: str):
+    """Parse a single value as int, float, bool or string (NaN for missing values),
+    as `pandas.read_csv` parses a column containing only this value."""
+    if value in _NA_VALUES:
+        return float('nan')
+    if value in _BOOL_VALUES:
+        return _BOOL_VALUES[value]
+    if _RE_INT.fullmatch(value):
+        number = int(value)
+        # integers not fitting into (u)int64 are kept as strings
+        return number if _INT_MIN <= number <= _UINT_MAX else value
+    if _RE_FLOAT.fullmatch(value):
+        return float(value)
+    return value
+
+
+def load_summary_row(filepath: str = 'summary.txt') -> dict:
+    """Load the first data row of a MaxQuant {MQ_VERSION} summary.txt file, i.e. the
+    summary of the first raw file, reading only the header and this row.
+
+    Parameters
+    ----------
+    filepath : str, optional
+        filepath, by default 'summary.txt'
+
+    Returns
+    -------
+    dict
+        Typed values (int, float, bool, str or NaN) by column name, excluding the first
+        column ('Raw file').
+    """.format(MQ_VERSION=MQ_VERSION)
+    with open(filepath, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        row = f.readline().rstrip('\r\n').split('\t')
+    row += [''] * (len(header) - len(row))
+    return {col: _parse_value(value) for col, value in zip(header[1:], row[1:])}
+
+
 def load_mqpar_xml(filepath: Path) -> dict:
     """Load MaxQuant {MQ_VERSION}parameter file in xml format which stores parameters for MaxQuant run,
     including version numbers.
@@ -178,7 +230,7 @@ dtypes_proteins = {'Protein IDs': dtype('O'),
                    'Taxonomy IDs': dtype('O')}
 
 
-def load_protein_intensities(filepath):
+def load_protein_intensities(filepath, engine: str = None):
     """Load Intensities from `proteins.txt`.
     Data types of columns as of in MaxQuant {MQ_VERSION}
 
@@ -186,12 +238,14 @@ def load_protein_intensities(filepath):
     ----------
     filepath : str
         filepath (rel or absolute) to MQ proteins.txt
+    engine : str, optional
+        parse engine, see `hela_data.io.parsers.read_table`, by default None
 
     Returns
     -------
     pandas.DataFrame
         Return text file as DataFrame.
     """.format(MQ_VERSION=MQ_VERSION)
-    df = pd.read_table(
-        filepath, index_col='Majority protein IDs', dtype=dtypes_proteins)
+    df = read_table(
+        filepath, index_col='Majority protein IDs', dtype=dtypes_proteins, engine=engine)
     return df[['Intensity']]
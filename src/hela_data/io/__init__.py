@@ -1,5 +1,7 @@
 from collections import namedtuple
+from contextlib import contextmanager
 import logging
+import os
 from typing import List, Tuple, Union
 import json
 from pathlib import Path, PurePath, PurePosixPath
@@ -106,6 +108,91 @@ def dump_to_csv(df: pd.DataFrame,
     return fname
 
 
+def dump_to_parquet(df: pd.DataFrame,
+                    folder: Path,
+                    outfolder: Path,
+                    parent_folder_fct=None,
+                    dtypes: dict = None
+                    ) -> Path:
+    """Dump table of a folder as dictionary-encoded Parquet file. Using a
+    `parent_folder_fct` the dumps are partitioned into subfolders, e.g. by year.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to dump.
+    folder : Path
+        Folder the table belongs to, its name is used as file name.
+    outfolder : Path
+        Folder of dumps.
+    parent_folder_fct : Callable, optional
+        Callable returning the name of the subfolder of `outfolder` for a folder, by default None
+    dtypes : dict, optional
+        dtypes of columns (and index levels) present in `df`, by default None
+
+    Returns
+    -------
+    Path
+        Filepath of dump.
+    """
+    fname = f"{folder.stem}.parquet"
+    if parent_folder_fct is not None:
+        outfolder = outfolder / parent_folder_fct(folder)
+    outfolder.mkdir(exist_ok=True, parents=True)
+    fname = outfolder / fname
+    if dtypes:
+        index_names = [name for name in df.index.names if name is not None]
+        df = df.reset_index()
+        df = df.astype({k: v for k, v in dtypes.items() if k in df.columns})
+        if index_names:
+            df = df.set_index(index_names)
+    logger.info(f"Dump to file: {fname}")
+    df.to_parquet(fname, use_dictionary=True)
+    return fname
+
+
+def read_dump(fpath: Union[str, Path], index_col=0, columns: List[str] = None, dtype: dict = None) -> pd.DataFrame:
+    """Read dump written by `dump_to_csv` or `dump_to_parquet` based on the file extension.
+
+    Parameters
+    ----------
+    fpath : Union[str, Path]
+        Filepath of dump.
+    index_col : Union[int, str, List[str]], optional
+        index column(s), by default 0. Parquet dumps keep their index and only
+        accept column names.
+    columns : List[str], optional
+        columns to read (besides the index), by default None, i.e. all columns
+    dtype : dict, optional
+        dtypes of columns of CSV dumps, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        Table of dump.
+    """
+    fpath = Path(fpath)
+    if isinstance(index_col, int):
+        if columns is not None:
+            raise ValueError("Select columns of dumps using the names of the index columns.")
+        index_names = None
+    else:
+        index_names = list(index_col) if isinstance(index_col, (list, tuple)) else [index_col]
+    if fpath.suffix != '.parquet':
+        usecols = index_names + list(columns) if columns is not None else None
+        return pd.read_csv(fpath, index_col=index_col, usecols=usecols, dtype=dtype)
+    if columns is not None:
+        columns = index_names + [col for col in columns if col not in index_names]
+    df = pd.read_parquet(fpath, columns=columns)
+    if index_names is not None and list(df.index.names) != index_names:
+        # e.g. other column as index than the one of the dump
+        df = df.reset_index()
+        if columns is not None:
+            df = df[columns]
+        df = df.set_index(index_names)
+    return df
+
+
 def dump_json(data_dict: dict, filename: Union[str, Path]):
     """Dump dictionary as JSON.
 
@@ -120,6 +207,31 @@ def dump_json(data_dict: dict, filename: Union[str, Path]):
         json.dump(obj=data_dict, fp=f, indent=4)
 
 
+@contextmanager
+def atomic_write(fname: Union[str, Path]):
+    """Write to a temporary file in the same folder which replaces `fname` atomically
+    if the block finishes without an exception.
+
+    Parameters
+    ----------
+    fname : Union[str, Path]
+        Filepath of file to write.
+
+    Yields
+    ------
+    Path
+        Temporary filepath to write to.
+    """
+    fname = Path(fname)
+    fname_tmp = fname.with_name(f".{fname.name}.{os.getpid()}.tmp")
+    try:
+        yield fname_tmp
+        os.replace(fname_tmp, fname)
+    finally:
+        if fname_tmp.exists():
+            fname_tmp.unlink()
+
+
 def load_json(fname: Union[str, Path]) -> dict:
     """Load JSON from disc.
 
@@ -0,0 +1,260 @@
+"""Caching of parsed MaxQuant text tables.
+
+Parsed tables are stored on disk as Parquet files. The size and modification time of the
+source text file are kept in the Parquet schema metadata, so a cached table is only
+used as long as the source file is unchanged.
+
+In memory, loaded tables can be kept in a process-wide least-recently-used cache with a
+limited size in bytes (`TABLE_CACHE`), which is shared by all `MaxQuantOutput` instances.
+It is disabled by default and enabled by setting a size, e.g.
+`TABLE_CACHE.resize(2**30)`. Forked child processes (e.g. pool workers) always start with
+a disabled and empty cache.
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from typing import Hashable, Iterable, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+CACHE_FOLDER_NAME = '.hela_data_cache'
+CACHE_SUFFIX = '.parquet'
+METADATA_KEY = b'hela_data_source'
+
+
+def get_source_stats(filepath: Union[str, Path]) -> dict:
+    """Size and modification time of a source file used to validate a cache entry."""
+    stat = Path(filepath).stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def get_cache_fpath(filepath: Union[str, Path],
+                    cache_root: Union[str, Path, None] = None) -> Path:
+    """Get the filepath of the cached table for a source text file.
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        Path to source text file, e.g. `txt/evidence.txt`
+    cache_root : Union[str, Path, None], optional
+        Root folder of the cache. Tables are stored in a subfolder named after the
+        folder of the source file and a hash of its resolved path, so that folders
+        with the same name at different locations do not share a subfolder.
+        By default None, i.e. a hidden folder next to the source file is used.
+
+    Returns
+    -------
+    Path
+        Filepath of cached table.
+    """
+    filepath = Path(filepath)
+    if cache_root is None:
+        cache_folder = filepath.parent / CACHE_FOLDER_NAME
+    else:
+        parent = filepath.parent.resolve()
+        digest = hashlib.sha1(str(parent).encode()).hexdigest()[:12]
+        cache_folder = Path(cache_root) / f"{parent.name}-{digest}"
+    return cache_folder / f"{filepath.stem}{CACHE_SUFFIX}"
+
+
+def read_cached_table(fpath_cache: Union[str, Path],
+                      source_stats: dict,
+                      columns: Iterable[str] = None) -> Union[pd.DataFrame, None]:
+    """Read a cached table if it matches the source file statistics.
+
+    Parameters
+    ----------
+    fpath_cache : Union[str, Path]
+        Filepath of cached table.
+    source_stats : dict
+        Statistics of the source file, see `get_source_stats`.
+    columns : Iterable[str], optional
+        Only read selected columns, the index is always read. By default None.
+
+    Returns
+    -------
+    Union[pd.DataFrame, None]
+        Cached table or None if there is no valid cache entry.
+    """
+    fpath_cache = Path(fpath_cache)
+    if not fpath_cache.exists():
+        return None
+    try:
+        metadata = pq.read_schema(fpath_cache).metadata or {}
+    except (pa.ArrowException, OSError) as e:
+        logger.warning(f"Could not read cache {fpath_cache}: {e}")
+        return None
+    cached_stats = json.loads(metadata.get(METADATA_KEY, b'{}'))
+    if cached_stats != source_stats:
+        logger.debug(f"Outdated cache: {fpath_cache}")
+        return None
+    logger.debug(f"Read cached table: {fpath_cache}")
+    if columns is not None:
+        columns = list(columns)
+    df = pd.read_parquet(fpath_cache, columns=columns)
+    # missing values in string columns are read as None, restore parser behaviour
+    object_columns = df.columns[df.dtypes == object]
+    df[object_columns] = df[object_columns].where(df[object_columns].notna(), np.nan)
+    return df
+
+
+def write_cached_table(df: pd.DataFrame,
+                       fpath_cache: Union[str, Path],
+                       source_stats: dict) -> bool:
+    """Write table to cache. The file is replaced atomically.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Parsed table to cache.
+    fpath_cache : Union[str, Path]
+        Filepath of cached table.
+    source_stats : dict
+        Statistics of the source file, see `get_source_stats`.
+
+    Returns
+    -------
+    bool
+        True if the table could be cached.
+    """
+    fpath_cache = Path(fpath_cache)
+    fpath_tmp = fpath_cache.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[METADATA_KEY] = json.dumps(source_stats).encode()
+        table = table.replace_schema_metadata(metadata)
+        fpath_cache.parent.mkdir(exist_ok=True, parents=True)
+        pq.write_table(table, fpath_tmp)
+        os.replace(fpath_tmp, fpath_cache)
+    except (pa.ArrowException, OSError) as e:
+        logger.warning(f"Could not cache table to {fpath_cache}: {e}")
+        fpath_tmp.unlink(missing_ok=True)
+        return False
+    logger.debug(f"Cached table: {fpath_cache}")
+    return True
+
+
+TableCacheInfo = namedtuple('TableCacheInfo', ['hits', 'misses', 'evictions', 'currsize', 'nbytes', 'max_bytes'])
+
+
+class TableCache():
+    """Least-recently-used cache of tables with a maximum size in bytes.
+
+    Tables are copied when they are put into or taken from the cache, so that callers
+    can modify them without changing the cached table.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum memory used by cached tables, by default 0, i.e. no tables are cached.
+        Tables larger than `max_bytes` are not cached.
+
+    Attributes
+    ----------
+    nbytes : int
+        Memory used by cached tables.
+    hits, misses, evictions : int
+        Statistics of cache lookups and evicted tables.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self._tables = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Hashable) -> Union[pd.DataFrame, None]:
+        """Get copy of table and mark it as recently used. Return None if not cached."""
+        try:
+            df, _ = self._tables[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._tables.move_to_end(key)
+        self.hits += 1
+        return df.copy()
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> bool:
+        """Cache copy of table and evict least recently used tables to stay within `max_bytes`.
+
+        Returns
+        -------
+        bool
+            True if the table was cached.
+        """
+        self.pop(key)
+        nbytes = int(df.memory_usage(deep=True, index=True).sum())
+        if nbytes > self.max_bytes:
+            logger.debug(f"Table too large to cache ({nbytes:,d} bytes): {key}")
+            return False
+        self._tables[key] = (df.copy(), nbytes)
+        self.nbytes += nbytes
+        self._evict()
+        return True
+
+    def pop(self, key: Hashable) -> Union[pd.DataFrame, None]:
+        """Remove table from cache."""
+        if key not in self._tables:
+            return None
+        df, nbytes = self._tables.pop(key)
+        self.nbytes -= nbytes
+        return df
+
+    def resize(self, max_bytes: int):
+        """Set new maximum size and evict tables if needed."""
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self):
+        """Remove all tables and reset statistics."""
+        self._tables.clear()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def cache_info(self) -> TableCacheInfo:
+        """Statistics of the cache, similar to `functools.lru_cache`."""
+        return TableCacheInfo(hits=self.hits,
+                              misses=self.misses,
+                              evictions=self.evictions,
+                              currsize=len(self._tables),
+                              nbytes=self.nbytes,
+                              max_bytes=self.max_bytes)
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            key, (_, nbytes) = self._tables.popitem(last=False)
+            self.nbytes -= nbytes
+            self.evictions += 1
+            logger.debug(f"Evicted table ({nbytes:,d} bytes): {key}")
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tables
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(max_bytes={self.max_bytes:,d})"
+
+
+# shared by all MaxQuantOutput instances of a process, disabled by default
+TABLE_CACHE = TableCache()
+
+
+def _disable_table_cache():
+    # workers should not keep tables of the parent alive or cache tables themselves
+    TABLE_CACHE.clear()
+    TABLE_CACHE.resize(0)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_disable_table_cache)
@@ -0,0 +1,217 @@
+"""Persistent catalog of MaxQuant txt output folders.
+
+Listing thousands of folders on a network filesystem using `Path.rglob` is slow.
+The catalog scans each folder below a root folder once using `os.scandir`, stores the
+files with their sizes and modification times on disk and on a refresh only re-scans
+folders which were added or changed. A folder is changed if the modification time of
+one of its (sub-)folders changed. Files rewritten in place (e.g. by a re-run of MaxQuant)
+do not change the folder and are only detected if the size and modification time of
+files are compared as well (`check_files`), which needs one `stat` call per file.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Iterable, List, Union
+
+import hela_data.io
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FNAME = '.hela_data_catalog.json'
+
+
+def scan_folder(path: Union[str, Path]) -> dict:
+    """List all files in a folder and its subfolders using `os.scandir`.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        Folder to scan.
+
+    Returns
+    -------
+    dict
+        Modification times of all scanned (sub-)folders under key 'dirs' and
+        files relative to `path` with their size and modification time
+        under key 'files'.
+    """
+    dirs, files = {}, {}
+    stack = [(str(path), '')]
+    while stack:
+        current, prefix = stack.pop()
+        dirs[prefix] = os.stat(current).st_mtime_ns
+        with os.scandir(current) as entries:
+            for entry in entries:
+                relative_path = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, f"{relative_path}/"))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[relative_path] = [stat.st_size, stat.st_mtime_ns]
+    return {'dirs': dirs, 'files': files}
+
+
+def is_unchanged(path: Union[str, Path], entry: dict, check_files: Union[bool, Iterable[str]] = False) -> bool:
+    """Check if a catalog entry is unchanged.
+
+    Adding, removing or renaming a file changes the modification time of its folder.
+    Rewriting a file in place only changes the size and modification time of the file.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        Scanned folder.
+    entry : dict
+        Catalog entry of folder, see `scan_folder`.
+    check_files : Union[bool, Iterable[str]], optional
+        Compare size and modification time of all files (True) or of the files with
+        the given names, e.g. ['summary.txt'], as well. By default False, i.e. only the
+        modification times of the folders are compared, which needs less `stat` calls,
+        but misses files rewritten in place.
+
+    Returns
+    -------
+    bool
+        True if the folder is unchanged.
+    """
+    path = Path(path)
+    try:
+        if not all(os.stat(path / prefix).st_mtime_ns == mtime_ns
+                   for prefix, mtime_ns in entry['dirs'].items()):
+            return False
+        if check_files is False:
+            return True
+        names = None if check_files is True else set(check_files)
+        for file, (size, mtime_ns) in entry['files'].items():
+            if names is not None and PurePosixPath(file).name not in names:
+                continue
+            stat = os.stat(path / file)
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class FolderCatalog():
+    """Catalog of the folders (e.g. MaxQuant txt output folders) in a root folder.
+
+    Parameters
+    ----------
+    root : Union[str, Path]
+        Root folder containing one subfolder per MaxQuant run.
+    fp_catalog : Union[str, Path], optional
+        Filepath of catalog. By default None, i.e. a hidden file in `root`.
+    n_workers : int, optional
+        Number of threads scanning folders in parallel, by default 8
+
+    Attributes
+    ----------
+    folders : dict
+        Scanned folders with their files, see `scan_folder`.
+    """
+
+    def __init__(self,
+                 root: Union[str, Path],
+                 fp_catalog: Union[str, Path] = None,
+                 n_workers: int = 8):
+        self.root = Path(root)
+        self.fp = Path(fp_catalog) if fp_catalog is not None else self.root / CATALOG_FNAME
+        self.n_workers = n_workers
+        self.folders = {}
+        if self.fp.exists():
+            self.folders = hela_data.io.load_json(self.fp)['folders']
+            logger.info(f"Loaded catalog of {len(self.folders):,d} folders: {self.fp}")
+
+    def refresh(self,
+                full: bool = False,
+                save: bool = True,
+                check_files: Union[bool, Iterable[str]] = False) -> dict:
+        """Scan new and changed folders and remove deleted folders from the catalog.
+
+        Parameters
+        ----------
+        full : bool, optional
+            Re-scan all folders, by default False
+        save : bool, optional
+            Save catalog after refresh, by default True
+        check_files : Union[bool, Iterable[str]], optional
+            Detect files rewritten in place by comparing the size and modification
+            time of all catalogued files (True) or of the files with the given names,
+            see `is_unchanged`. By default False, i.e. only folders are checked.
+
+        Returns
+        -------
+        dict
+            Names of 'added', 'updated' and 'removed' folders.
+        """
+        with os.scandir(self.root) as entries:
+            names = sorted(entry.name for entry in entries
+                           if entry.is_dir() and not entry.name.startswith('.'))
+
+        def refresh_folder(name):
+            entry = self.folders.get(name)
+            path = self.root / name
+            if not full and entry is not None and is_unchanged(path, entry, check_files=check_files):
+                return name, None
+            return name, scan_folder(path)
+
+        changes = {'added': [], 'updated': [], 'removed': []}
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            for name, entry in executor.map(refresh_folder, names):
+                if entry is None:
+                    continue
+                changes['updated' if name in self.folders else 'added'].append(name)
+                self.folders[name] = entry
+
+        changes['removed'] = sorted(set(self.folders) - set(names))
+        for name in changes['removed']:
+            del self.folders[name]
+        logger.info("Catalog refreshed: " + ", ".join(f"{len(v):,d} {k}" for k, v in changes.items()))
+        if save:
+            self.save()
+        return changes
+
+    def save(self):
+        """Save catalog as JSON."""
+        self.fp.parent.mkdir(exist_ok=True, parents=True)
+        hela_data.io.dump_json({'root': str(PurePosixPath(self.root)), 'folders': self.folders},
+                               filename=self.fp)
+        logger.info(f"Saved catalog to: {self.fp}")
+
+    def get_folders(self) -> List[Path]:
+        """Paths to all folders in catalog."""
+        return [self.root / name for name in self.folders]
+
+    def get_files(self, folder: Union[str, Path], query: str = '.txt') -> hela_data.io.PathsList:
+        """Get files of a folder from the catalog, see `hela_data.io.search_files`.
+
+        Parameters
+        ----------
+        folder : Union[str, Path]
+            Name of folder in catalog or path to it.
+        query : str, optional
+            query string for file names, by default '.txt'
+
+        Returns
+        -------
+        hela_data.io.PathsList
+            Files relative to folder containing the query in their file names.
+        """
+        name = Path(folder).name
+        files = [file for file in self.folders[name]['files']
+                 if query in PurePosixPath(file).name]
+        return hela_data.io.PathsList(files=files, folder=self.root / name)
+
+    def __contains__(self, folder: Union[str, Path]) -> bool:
+        folder = Path(folder)
+        if len(folder.parts) > 1 and folder.parent.absolute() != self.root.absolute():
+            return False
+        return folder.name in self.folders
+
+    def __len__(self):
+        return len(self.folders)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(root={str(self.root)!r}, fp_catalog={str(self.fp)!r})"
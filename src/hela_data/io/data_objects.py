@@ -1,24 +1,32 @@
 from collections import Counter
+from contextlib import nullcontext
+from functools import partial
 import os
 import sys
 import logging
 import json
+import pickle
+import shutil
+import time
 from pathlib import Path
-import multiprocessing
 from types import SimpleNamespace
 from typing import Callable, Iterable, List, Union
 
-from tqdm.notebook import tqdm
+from tqdm.auto import tqdm
 import numpy as np
 import pandas as pd
 
 from fastcore.meta import delegates
 
-from hela_data.io import dump_json, dump_to_csv
+from hela_data.io import atomic_write, dump_json, dump_to_csv, dump_to_parquet, read_dump
+from hela_data.io.executors import ClusterExecutor, Executor, ProcessExecutor, executor_context
+from hela_data.io.parsers import read_table
+from hela_data.io.transport import attach_encoded_samples, prepare_transport, share_encoded_samples
+from hela_data.file_utils import load_summary_row
+from hela_data.io.vocabulary import ID_DTYPE, FeatureVocabulary, encode_samples, merge_encoded_samples
 import hela_data.io.mq as mq
 from hela_data.io.mq import MaxQuantOutputDynamic
 import hela_data.pandas
-from hela_data.plotting import plot_feat_counts
 # from .config import FOLDER_MQ_TXT_DATA, FOLDER_PROCESSED
 
 from fastcore.imports import IN_NOTEBOOK
@@ -26,11 +34,9 @@ from fastcore.imports import IN_NOTEBOOK
 logger = logging.getLogger(__name__)
 logger.info(f"Calling from {__name__}")
 
+# folders are created on first use, not on import
 FOLDER_DATA = Path('data')
-FOLDER_DATA.mkdir(exist_ok=True)
-
 FOLDER_PROCESSED = FOLDER_DATA / 'processed'
-FOLDER_PROCESSED.mkdir(exist_ok=True)
 
 FOLDER_MQ_TXT_DATA = FOLDER_DATA / 'mq_out'
 
@@ -50,11 +56,12 @@ if sys.platform == 'win32' and IN_NOTEBOOK:
         "only use main process due to issue with ipython and multiprocessing on Windows")
 
 
-manager = multiprocessing.Manager()
-
-
 def _convert_dtypes(df):
     """Convert dtypes automatically and make string columns categories."""
+    l_category_columns = df.columns[df.dtypes == 'category']
+    if not l_category_columns.empty:
+        # categories of concatenated tables
+        df = df.astype({col: object for col in l_category_columns})
     df = df.convert_dtypes()
     l_string_columns = df.columns[df.dtypes == 'string']
     if not l_string_columns.empty:
@@ -78,22 +85,73 @@ class col_summary:
     MS2 = 'MS/MS Identified'
 
 
+def load_summaries(folders: List[Path]) -> dict:
+    """Load the first row of the summary.txt of a batch of MaxQuant output folders,
+    see `hela_data.file_utils.load_summary_row`. Empty folders are removed.
+
+    Parameters
+    ----------
+    folders : List[Path]
+        MaxQuant output folders.
+
+    Returns
+    -------
+    dict
+        Summaries by folder name under key 'records' and the names of removed
+        empty folders under key 'empty_folders'.
+    """
+    records, empty_folders = {}, []
+    for folder in folders:
+        folder = Path(folder)
+        fpath = folder / 'summary.txt'
+        if not fpath.exists():
+            fpath = next(folder.rglob('summary.txt'), fpath) if folder.is_dir() else fpath
+        try:
+            records[folder.stem] = load_summary_row(fpath)
+        except FileNotFoundError:
+            if folder.is_dir() and not any(folder.iterdir()):
+                folder.rmdir()
+                logger.warning(f'Remove empty folder: {folder}')
+                empty_folders.append(f"{folder.stem}\n")
+            else:
+                logger.error(f"{folder}, No summary and not empty.")
+    return {'records': records, 'empty_folders': empty_folders}
+
+
 class MqAllSummaries():
+    """Summaries (first row of summary.txt) of MaxQuant output folders.
+
+    The state is kept as Parquet dataset (a folder next to `fp_summaries` with suffix
+    `.parquet`) to which the summaries of newly loaded folders are appended as new
+    file. Summaries previously saved as JSON (`fp_summaries`) are loaded if no
+    state exists. Use `save_state` to export all summaries as JSON and pickle, which
+    is only rewritten if summaries were appended since the last export.
+    """
 
     def __init__(self, fp_summaries=DEFAULTS.ALL_SUMMARIES):
         fp_summaries = Path(fp_summaries)
-        if fp_summaries.exists():
+        self.fp_state = fp_summaries.parent / f"{fp_summaries.stem}.parquet"
+        self._n_saved = 0
+        if self.fp_state.exists():
+            self.df = _convert_dtypes(self._load_state())
+            self._n_saved = len(self.df)
+            print(
+                f"{self.__class__.__name__}: Load summaries of {len(self.df)} folders.")
+        elif fp_summaries.exists():
             self.df = _convert_dtypes(
                 pd.read_json(fp_summaries, orient='index'))
             print(
                 f"{self.__class__.__name__}: Load summaries of {len(self.df)} folders.")
         else:
+            if fp_summaries.parent == FOLDER_PROCESSED:
+                FOLDER_PROCESSED.mkdir(exist_ok=True, parents=True)
             if not fp_summaries.parent.exists():
                 raise FileNotFoundError(
                     f'Folder of filename not found: {fp_summaries.parent}')
             self.df = None
         self.fp_summaries = fp_summaries
         self.usecolumns = col_summary()
+        self.empty_folders = []
 
     def __len__(self):
         if self.df is not None:
@@ -102,68 +160,117 @@ class MqAllSummaries():
             raise ValueError("No data loaded yet.")
 
     def load_summary(self, folder):
-        folder_name = folder.stem
-        try:
-            mq_output = MaxQuantOutputDynamic(folder)
-            # to_dict not very performant
-            return {folder_name: mq_output.summary.iloc[0].to_dict()}
-        except FileNotFoundError:
-            if not mq_output.files and len(list(mq_output.folder.iterdir())) == 0:
-                mq_output.folder.rmdir()
-                logger.warning(f'Remove empty folder: {mq_output}')
-                self.empty_folders.append(f"{folder_name}\n")
-            else:
-                logger.error(f"{mq_output}, No summary and not empty.")
-        return {}
+        """Load summary of a single folder, see `load_summaries`."""
+        d = load_summaries([folder])
+        self.empty_folders.extend(d['empty_folders'])
+        return d['records']
+
+    def load_new_samples(self, folders, workers: int = 1, executor: Union[str, Executor] = 'process',
+                         batch_size: int = 100):
+        """Load summaries of folders not yet loaded and append them to the state.
+
+        Parameters
+        ----------
+        folders : List[Path]
+            MaxQuant output folders.
+        workers : int, optional
+            number of workers, by default 1
+        executor : Union[str, Executor], optional
+            executor or its backend, see `hela_data.io.executors.get_executor`.
+            By default 'process', 'thread' suits loading many small files.
+        batch_size : int, optional
+            number of folders loaded per task, by default 100
 
-    def load_new_samples(self, folders, workers: int = 1):
+        Returns
+        -------
+        pd.DataFrame
+            Summaries of all loaded folders.
+        """
         if self.df is not None:
-            d_summaries = self.df.to_dict(orient='index')
-            samples = set(folder.stem for folder in folders) - \
-                set(d_summaries.keys())
+            samples = set(folder.stem for folder in folders) - set(self.df.index)
             samples = [folder for folder in folders if folder.stem in samples]
         else:
-            d_summaries = {}
             samples = folders
-        if not hasattr(self, 'empty_folders'):
-            # should this depend on multiprocessing?
-            self.empty_folders = manager.list()
 
         if samples:
-            # process_chunch_fct = self.load_summary
-            # workers=workers
-            # desc = 'Load summaries'
-            if workers > 1:
-                with multiprocessing.Pool(workers) as p:
-                    # set chunksize: https://stackoverflow.com/a/49533645/9684872
-                    chunksize = calc_chunksize(workers, len(samples), factor=2)
-                    list_of_updates = list(
-                        tqdm(
-                            p.imap(self.load_summary, samples,
-                                   chunksize=chunksize),
-                            total=len(samples),
-                            desc='Load summaries'))
-            else:
-                list_of_updates = [self.load_summary(
-                    folder) for folder in tqdm(samples)]
-
-            print("Newly loaded samples:", len(list_of_updates))
-
-            for d in list_of_updates:
-                d_summaries.update(d)
-
-            self.df = _convert_dtypes(
-                pd.DataFrame.from_dict(d_summaries, orient='index'))
-            self.save_state()
+            batches = [samples[i:i + batch_size] for i in range(0, len(samples), batch_size)]
+            records = {}
+            with executor_context(executor, workers) as ex:
+                for d in tqdm(ex.imap(load_summaries, batches, ordered=False),
+                              total=len(batches),
+                              desc='Load summaries'):
+                    records.update(d['records'])
+                    self.empty_folders.extend(d['empty_folders'])
+
+            print("Newly loaded samples:", len(records))
+            if records:
+                if self.df is not None and self._n_saved < len(self.df):
+                    # summaries loaded from JSON
+                    self._append_state(self.df.iloc[self._n_saved:])
+                df_new = self._append_state(pd.DataFrame.from_dict(records, orient='index'))
+                self.df = _convert_dtypes(df_new if self.df is None else pd.concat([self.df, df_new]))
         else:
             print("No new sample added.")
         return self.df
 
-    def save_state(self):
-        """Save summaries DataFrame as json and pickled object."""
-        self.df.to_json(self.fp_summaries, orient='index')
-        self.df.to_pickle(self.fp_summaries.parent /
-                          f"{self.fp_summaries.stem}.pkl")
+    def _load_state(self) -> pd.DataFrame:
+        parts = sorted(self.fp_state.glob('part-*.parquet'))
+        return pd.concat([pd.read_parquet(fname) for fname in parts])
+
+    def _append_state(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Append summaries to state as new file and return them as saved."""
+        df = _convert_dtypes(df)
+        for col in df.columns[df.dtypes == object]:
+            # mixed types
+            df[col] = df[col].astype('string')
+        self.fp_state.mkdir(exist_ok=True, parents=True)
+        fname = self.fp_state / f"part-{time.time_ns()}.parquet"
+        with atomic_write(fname) as fp_tmp:
+            df.to_parquet(fp_tmp)
+        self._n_saved += len(df)
+        logger.info(f"Appended summaries of {len(df)} folders to: {fname}")
+        return df
+
+    def get_export_fpaths(self) -> List[Path]:
+        """Filepaths of the JSON and pickle export, see `save_state`."""
+        return [self.fp_summaries, self.fp_summaries.parent / f"{self.fp_summaries.stem}.pkl"]
+
+    def is_exported(self) -> bool:
+        """Check if the export is newer than all parts of the Parquet state."""
+        fpaths = self.get_export_fpaths()
+        if not all(fpath.exists() for fpath in fpaths):
+            return False
+        parts = list(self.fp_state.glob('part-*.parquet'))
+        if not parts:
+            return True  # summaries loaded from export
+        return (min(fpath.stat().st_mtime_ns for fpath in fpaths)
+                >= max(fpath.stat().st_mtime_ns for fpath in parts))
+
+    def save_state(self, force: bool = False) -> bool:
+        """Export all summaries as json and pickled object for readers of these files.
+
+        The Parquet state is already appended to by `load_new_samples`. The export
+        rewrites all summaries and is skipped if it is up to date, see `is_exported`.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Rewrite export even if it is up to date, by default False
+
+        Returns
+        -------
+        bool
+            True if the export was written.
+        """
+        if not force and self.is_exported():
+            logger.info(f"Export of summaries is up to date: {self.fp_summaries}")
+            return False
+        json_fpath, pickle_fpath = self.get_export_fpaths()
+        with atomic_write(json_fpath) as fp_tmp:
+            self.df.to_json(fp_tmp, orient='index')
+        with atomic_write(pickle_fpath) as fp_tmp:
+            self.df.to_pickle(fp_tmp)
+        return True
 
     def get_files_w_min_MS2(self, threshold=10_000, relativ_to=FOLDER_MQ_TXT_DATA):
         """Get a list of file ids with a minimum MS2 observations."""
@@ -188,14 +295,68 @@ def create_parent_folder_name(folder: Path) -> str:
     return folder.stem[:4]
 
 
+DUMP_FORMATS = ('csv', 'parquet')
+
+
+def dump_table(df: pd.DataFrame,
+               folder: Path,
+               outfolder: Path,
+               parent_folder_fct: Callable = create_parent_folder_name,
+               dump_format: str = 'csv',
+               dtypes: dict = None) -> Path:
+    """Dump processed table of a folder in `dump_format`, one of `DUMP_FORMATS`.
+    The `dtypes` are only applied to Parquet dumps."""
+    if dump_format == 'csv':
+        return dump_to_csv(df, folder=folder, outfolder=outfolder, parent_folder_fct=parent_folder_fct)
+    if dump_format == 'parquet':
+        return dump_to_parquet(df, folder=folder, outfolder=outfolder, parent_folder_fct=parent_folder_fct,
+                               dtypes=dtypes)
+    raise ValueError(f"Unknown dump format {dump_format!r}, choose one of {DUMP_FORMATS}")
+
+
 # plotting function for value_counts from FeatureCounter.get_df_counts
 
 
+def _tree_reduce(results: Iterable, merge_fct: Callable):
+    """Merge results pairwise in a balanced binary tree while consuming `results`,
+    so at most log2(n) partial results are kept in memory."""
+    stack = []  # (level, result)
+    for result in results:
+        level = 0
+        while stack and stack[-1][0] == level:
+            _, other = stack.pop()
+            result = merge_fct(other, result)
+            level += 1
+        stack.append((level, result))
+    if not stack:
+        return None
+    _, result = stack.pop()
+    while stack:
+        _, other = stack.pop()
+        result = merge_fct(other, result)
+    return result
+
+
+def _process_chunks(chunks: List, process_chunk_fct: Callable, merge_fct: Callable):
+    """Process several chunks in a worker and merge their results."""
+    return _tree_reduce((process_chunk_fct(chunk) for chunk in chunks), merge_fct)
+
+
+def _run_task(task, process_fct: Callable, transport_fct: Callable):
+    """Process task in a worker and prepare its result for the transfer."""
+    return transport_fct(process_fct(task))
+
+
 def collect_in_chuncks(paths: Iterable[Union[str, Path]],
                        process_chunk_fct: Callable,
                        n_workers: int = N_WORKERS_DEFAULT,
                        chunks=10,
-                       desc='Run chunks in parallel') -> List:
+                       desc='Run chunks in parallel',
+                       combine_fct: Callable = None,
+                       merge_fct: Callable = None,
+                       chunks_per_task: int = 1,
+                       executor: Union[str, Executor] = 'process',
+                       transport_fct: Callable = None) -> Union[List, None]:
     """collect the results from process_chunk_fct (chunk of files to loop over).
     The idea is that process_chunk_fct creates a more memory-efficient intermediate
     result than possible if only callling single fpaths in paths.
@@ -208,25 +369,111 @@ def collect_in_chuncks(paths: Iterable[Union[str, Path]],
         Callable which takes a chunk of paths and returns an result to collect, e.g. a dict
     n_workers : int, optional
         number of processes, by default N_WORKERS_DEFAULT
+    chunks : int, optional
+        number of chunks paths are split into, by default 10
+    desc : str, optional
+        description of progress bar
+    combine_fct : Callable, optional
+        Callable which is called in the main process with each result as soon as it
+        arrives (in order of completion), e.g. to update a total in-place. The results
+        are not kept, so only one result is held in memory at a time.
+        By default None, i.e. the results are returned as list (in order of chunks).
+    merge_fct : Callable, optional
+        Callable merging two results into one. Required if `chunks_per_task` > 1.
+    chunks_per_task : int, optional
+        number of chunks processed by a worker per task. Their results are merged pairwise
+        (tree reduction) in the worker using `merge_fct`, so only one result per task is
+        transferred to the main process. By default 1.
+    executor : Union[str, Executor], optional
+        executor or its backend, see `hela_data.io.executors.get_executor`.
+        By default 'process'.
+    transport_fct : Callable, optional
+        Callable applied in the worker to the result of each task before it is
+        transferred to the main process, e.g. to move it to shared memory, by default None
 
     Returns
     -------
-    List
-        List of results returned by process_chunk_fct
+    Union[List, None]
+        List of results returned by process_chunk_fct, None if `combine_fct` is given.
     """
     paths_splits = np.array_split(paths, min(chunks, len(paths)))
-    if n_workers > 1:
-        with multiprocessing.Pool(n_workers) as p:
-            collected = list(tqdm(p.imap(process_chunk_fct, paths_splits),
-                                  total=len(paths_splits),
-                                  desc=desc))
+    if chunks_per_task > 1:
+        if merge_fct is None:
+            raise ValueError("merge_fct is needed to merge results of several chunks per task.")
+        tasks = [paths_splits[i:i + chunks_per_task]
+                 for i in range(0, len(paths_splits), chunks_per_task)]
+        process_chunk_fct = partial(_process_chunks, process_chunk_fct=process_chunk_fct, merge_fct=merge_fct)
+    else:
+        tasks = paths_splits
+    if transport_fct is not None:
+        process_chunk_fct = partial(_run_task, process_fct=process_chunk_fct, transport_fct=transport_fct)
+    with executor_context(executor, n_workers) as ex:
+        if combine_fct is None:
+            return list(tqdm(ex.imap(process_chunk_fct, tasks),
+                             total=len(tasks),
+                             desc=desc))
+        for result in tqdm(ex.imap(process_chunk_fct, tasks, ordered=False),
+                           total=len(tasks),
+                           desc=desc):
+            combine_fct(result)
+
+
+def _count_folders(folders: List[Path], counting_fct: Callable) -> dict:
+    """Run counting function and add the names of the processed folders."""
+    d = counting_fct(folders)
+    d['folders'] = sorted(get_folder_names(folders))
+    return d
+
+
+def _share_counting_result(d: dict) -> dict:
+    """Move encoded features of samples to shared memory, see `hela_data.io.transport`."""
+    return share_encoded_samples(d) if 'features' in d else d
+
+
+def _receive_counting_result(d: dict):
+    """Context with the encoded features of samples of a result, if it was shared."""
+    return attach_encoded_samples(d) if 'shared' in d else nullcontext(d)
+
+
+def _use_shared_memory(executor: Union[str, Executor], n_workers: int, shared_memory: bool = None) -> bool:
+    """Use shared memory to transfer results if workers are processes (default) and
+    start the resource tracker tracking the shared memory blocks."""
+    if shared_memory is None:
+        shared_memory = (isinstance(executor, (ProcessExecutor, ClusterExecutor))
+                         or (executor in ('process', 'cluster') and n_workers > 1))
+    if shared_memory:
+        prepare_transport()
+    return shared_memory
+
+
+def merge_counting_results(a: dict, b: dict) -> dict:
+    """Merge two results of the counting functions of `FeatureCounter`."""
+    if 'counter' in a:
+        a['counter'].update(b['counter'])
+        merged = {'counter': a['counter']}
     else:
-        collected = map(process_chunk_fct, paths_splits)
-    return collected
+        merged = merge_encoded_samples(a, b)
+    merged['dumps'] = {**a['dumps'], **b['dumps']}
+    merged['folders'] = a.get('folders', []) + b.get('folders', [])
+    return merged
 
 
 class FeatureCounter():
-    def __init__(self, fp_counter: str, counting_fct: Callable[[List], Counter],
+    """Count features (e.g. peptides) over samples and keep track of their dumps.
+
+    Features are mapped to int32 ids by a persistent `FeatureVocabulary`. Counts are
+    kept as a NumPy array indexed by id, the features of each sample as an array of ids.
+
+    The state is saved as JSON (`fp_counter`) with the processed samples and dumps,
+    a Parquet file with the vocabulary and a NumPy `.npz` file with the counts and
+    the feature ids of the samples, see `get_state_fpaths`.
+
+    While counting, the result of each chunk of folders is written as checkpoint to a
+    journal. An interrupted count is resumed by replaying the journal on
+    initialization, so only the remaining folders are processed.
+    """
+
+    def __init__(self, fp_counter: str, counting_fct: Callable[[List], dict],
                  idx_names: Union[List, None] = None,
                  feature_name='feature',
                  overwrite=False):
@@ -234,25 +481,97 @@ class FeatureCounter():
         self.counting_fct = counting_fct
         self.idx_names = idx_names
         self.feature_name = feature_name
+        self.vocabulary = FeatureVocabulary(names=idx_names)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.samples = dict()
+        self.fp_journal = self.fp.with_name(f'{self.fp.stem}_journal')
         if self.fp.exists() and not overwrite:
             d = self.load(self.fp)
-            self.counter = d['counter']
             self.loaded = set(folder for folder in d['based_on'])
             self.dumps = d['dumps']
         else:
             self.loaded = set()  # None
-            self.counter = Counter()
             self.dumps = dict()
+        if overwrite:
+            self.clear_journal()
+        else:
+            self.replay_journal()
 
     def __repr__(self):
         return f"{self.__class__.__name__}(fp_counter={str(self.fp)})"
 
+    def get_state_fpaths(self) -> dict:
+        """Filepaths of vocabulary and counts stored next to `fp_counter`."""
+        return {'vocabulary': self.fp.with_name(f'{self.fp.stem}_vocabulary.parquet'),
+                'counts': self.fp.with_name(f'{self.fp.stem}_counts.npz')}
+
     def get_new_folders(self, folders: List[str]):
         ret = get_folder_names(folders) - self.loaded
         return ret
 
+    def add(self, d: dict, skip_loaded: bool = False):
+        """Add result of `counting_fct` with the features of samples encoded by
+        `hela_data.io.vocabulary.encode_samples`, or a Counter under key 'counter'.
+        If `skip_loaded` is set, samples which are already loaded are not added again."""
+        if 'counter' in d:
+            if skip_loaded and set(d.get('folders', [])) <= self.loaded:
+                return
+            counter = pd.Series(d['counter'], dtype=np.int64)
+            ids = self.vocabulary.encode(counter.index)
+            mask = ids >= 0
+            self._add_counts(np.bincount(ids[mask], weights=counter.values[mask],
+                                         minlength=len(self.vocabulary)))
+            return
+        ids = self.vocabulary.encode(d['features'])
+        ids_samples = []
+        for sample, codes in d['samples'].items():
+            if skip_loaded and sample in self.loaded:
+                continue
+            ids_sample = ids[codes[codes >= 0]]
+            ids_sample = ids_sample[ids_sample >= 0]
+            self.samples[sample] = ids_sample
+            ids_samples.append(ids_sample)
+        if ids_samples:
+            self._add_counts(np.bincount(np.concatenate(ids_samples),
+                                         minlength=len(self.vocabulary)))
+
+    def _add_counts(self, counts: np.ndarray):
+        if len(counts) > len(self.counts):
+            # only reallocate if new features were added
+            self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+        self.counts[:len(counts)] += counts.astype(np.int64, copy=False)
+
     # combine multiprocessing into base class?
-    def sum_over_files(self, folders: List[Path], n_workers=N_WORKERS_DEFAULT, save=True):
+    def sum_over_files(self, folders: List[Path], n_workers=N_WORKERS_DEFAULT, save=True,
+                       chunks_per_task: int = 1, executor: Union[str, Executor] = 'process',
+                       shared_memory: bool = None):
+        """Count features of new folders. Results of the counting function are
+        added to the counts as they arrive from the workers.
+
+        Parameters
+        ----------
+        folders : List[Path]
+            MaxQuant output folders.
+        n_workers : int, optional
+            number of processes, by default N_WORKERS_DEFAULT
+        save : bool, optional
+            save state, by default True
+        chunks_per_task : int, optional
+            number of chunks merged in a worker before their result is
+            transferred, see `collect_in_chuncks`. By default 1.
+        executor : Union[str, Executor], optional
+            executor or its backend, see `hela_data.io.executors.get_executor`.
+            By default 'process'.
+        shared_memory : bool, optional
+            transfer the results of workers using shared memory instead of pickling
+            them, see `hela_data.io.transport`. By default None, i.e. if the workers
+            are processes.
+
+        Returns
+        -------
+        collections.Counter
+            Counts of features.
+        """
         if self.loaded:
             new_folder_names = self.get_new_folders(folders)
             logger.info(f'{len(new_folder_names)} new folders to process.')
@@ -263,32 +582,66 @@ class FeatureCounter():
                 folders = []
 
         if folders:
-            list_of_sample_dicts = collect_in_chuncks(folders,
-                                                      process_chunk_fct=self.counting_fct,
-                                                      n_workers=n_workers,
-                                                      chunks=n_workers * 3,
-                                                      desc='Count features in 100 chunks')
-
-            for d in tqdm(list_of_sample_dicts,
-                          total=len(list_of_sample_dicts),
-                          desc='combine counters from chunks'):
-                self.counter += d['counter']
-                self.dumps.update(d['dumps'])
-
-            if self.loaded:
-                self.loaded |= new_folder_names
-            else:
-                self.loaded = get_folder_names(folders)
+            shared_memory = _use_shared_memory(executor, n_workers, shared_memory)
+
+            def combine(d):
+                with _receive_counting_result(d) as d:
+                    self.update(d, save=save)
+
+            collect_in_chuncks(folders,
+                               process_chunk_fct=partial(_count_folders, counting_fct=self.counting_fct),
+                               n_workers=n_workers,
+                               chunks=n_workers * 3 * chunks_per_task,
+                               desc='Count features in chunks',
+                               combine_fct=combine,
+                               merge_fct=merge_counting_results,
+                               chunks_per_task=chunks_per_task,
+                               executor=executor,
+                               transport_fct=_share_counting_result if shared_memory else None)
+
+            self.loaded |= get_folder_names(folders)
             if save:
                 self.save()
         else:
             logger.info('Nothing to process.')
         return self.counter
 
+    def update(self, d: dict, save: bool = True):
+        """Add result of `counting_fct` for a chunk of folders including its dumps and
+        processed folders. Samples already loaded are skipped.
+
+        Parameters
+        ----------
+        d : dict
+            Result of `counting_fct` with the names of the processed folders under key 'folders'.
+        save : bool, optional
+            write result as checkpoint to the journal, by default True
+        """
+        self.add(d, skip_loaded=True)
+        self.dumps.update(d['dumps'])
+        self.loaded |= set(d['folders'])
+        if save:
+            self.write_checkpoint(d)
+
+    @property
+    def counter(self) -> Counter:
+        """Counts of features as `collections.Counter`."""
+        mask = self.counts > 0
+        features = self.vocabulary.index[mask]
+        return Counter(dict(zip(features, self.counts[mask].tolist())))
+
     @property
     def n_samples(self):
         return len(self.loaded)
 
+    def get_features(self, min_count: int = 1, min_proportion: float = None) -> pd.Index:
+        """Features counted at least `min_count` times or in at least a
+        proportion of `min_proportion` of the samples."""
+        if min_proportion is not None:
+            min_count = max(min_count, min_proportion * self.n_samples)
+        ids = np.flatnonzero(self.counts >= min_count)
+        return self.vocabulary.decode(ids)
+
     def get_df_counts(self) -> pd.DataFrame:
         """Counted features as DataFrame with proportion values.
 
@@ -297,10 +650,11 @@ class FeatureCounter():
         pd.DataFrame
             _description_
         """
-        feat_counts = (pd.Series(self.counter)
-                       .sort_values(ascending=False)
-                       .to_frame('counts'))
-        feat_counts['proportion'] = feat_counts / self.n_samples
+        ids = np.flatnonzero(self.counts)
+        ids = ids[np.argsort(-self.counts[ids], kind='stable')]
+        feat_counts = pd.DataFrame({'counts': self.counts[ids]},
+                                   index=self.vocabulary.decode(ids))
+        feat_counts['proportion'] = feat_counts['counts'] / self.n_samples
         if self.idx_names:
             feat_counts.index.names = self.idx_names
         feat_counts.reset_index(inplace=True)
@@ -309,6 +663,7 @@ class FeatureCounter():
 
     def plot_counts(self, df_counts: pd.DataFrame = None, ax=None, prop_feat=0.25, min_feat_prop=.01):
         """Plot counts based on get_df_counts."""
+        from hela_data.plotting import plot_feat_counts
         if df_counts is None:
             df_counts = self.get_df_counts()
         ax = plot_feat_counts(df_counts,
@@ -337,24 +692,94 @@ class FeatureCounter():
         """Save state
 
         {
-         'counter': Counter,
          'based_on': list,
          'dumps: dict,
          }
+
+        and the vocabulary and counts, see `get_state_fpaths`. All files are replaced
+        atomically, afterwards the journal is cleared.
         """
-        d = {'counter': self.counter,
-             'based_on': list(self.loaded),
+        self.fp.parent.mkdir(exist_ok=True, parents=True)
+        fpaths = self.get_state_fpaths()
+        samples = list(self.samples)
+        ids = [self.samples[sample] for sample in samples]
+        # vocabulary is append-only, i.e. it is consistent with previously saved counts
+        with atomic_write(fpaths['vocabulary']) as fp_tmp:
+            self.vocabulary.save(fp_tmp)
+        with atomic_write(fpaths['counts']) as fp_tmp, open(fp_tmp, 'wb') as f:
+            np.savez(f,
+                     counts=self.counts,
+                     based_on=np.array(sorted(self.loaded), dtype=str),
+                     sample_names=np.array(samples, dtype=str),
+                     sample_offsets=np.cumsum([0] + [len(x) for x in ids]),
+                     sample_ids=np.concatenate(ids) if ids else np.zeros(0, dtype=ID_DTYPE))
+        d = {'based_on': list(self.loaded),
              'dumps': {k: str(v) for k, v in self.dumps.items()}}
         logger.info(f"Save to: {self.fp}")
-        dump_json(d, filename=self.fp)
+        with atomic_write(self.fp) as fp_tmp:
+            dump_json(d, filename=fp_tmp)
+        self.clear_journal()
 
     def load(self, fp):
         with open(self.fp) as f:
             d = json.load(f)
-        d['counter'] = Counter(d['counter'])
         d['dumps'] = {k: Path(v) for k, v in d['dumps'].items()}
+        fpaths = self.get_state_fpaths()
+        if 'counter' in d:
+            # previous format: counter stored in JSON
+            self.add({'counter': self._load_counter(d['counter'])})
+        else:
+            missing = [str(fpath) for fpath in fpaths.values() if not fpath.exists()]
+            if missing:
+                # the processed samples in the JSON would be skipped without being counted
+                raise FileNotFoundError(f"Missing state of counter {self.fp}: {', '.join(missing)}. "
+                                        "Restore the files or recount using overwrite=True.")
+            self.vocabulary = FeatureVocabulary.load(fpaths['vocabulary'])
+            with np.load(fpaths['counts']) as arrays:
+                self.counts = arrays['counts']
+                offsets = arrays['sample_offsets']
+                self.samples = dict(zip(arrays['sample_names'].tolist(),
+                                        np.split(arrays['sample_ids'], offsets[1:-1])))
+                if 'based_on' in arrays:
+                    # samples consistent with counts
+                    d['based_on'] = arrays['based_on'].tolist()
         return d
 
+    def write_checkpoint(self, d: dict):
+        """Write result of a chunk of folders atomically to the journal."""
+        self.fp_journal.mkdir(exist_ok=True, parents=True)
+        fname = self.fp_journal / f'{time.time_ns()}_{os.getpid()}.pkl'
+        with atomic_write(fname) as fp_tmp, open(fp_tmp, 'wb') as f:
+            pickle.dump(d, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def replay_journal(self) -> int:
+        """Add checkpoints of an interrupted count. Samples already loaded are skipped.
+
+        Returns
+        -------
+        int
+            Number of replayed checkpoints.
+        """
+        if not self.fp_journal.exists():
+            return 0
+        fnames = sorted(self.fp_journal.glob('*.pkl'))
+        for fname in fnames:
+            with open(fname, 'rb') as f:
+                d = pickle.load(f)
+            self.update(d, save=False)
+        if fnames:
+            logger.info(f"Replayed {len(fnames)} checkpoints from: {self.fp_journal}")
+        return len(fnames)
+
+    def clear_journal(self):
+        """Remove checkpoints."""
+        if self.fp_journal.exists():
+            shutil.rmtree(self.fp_journal)
+
+    @staticmethod
+    def _load_counter(counter: dict) -> Counter:
+        return Counter(counter)
+
     def load_dump(self, fpath, fct=pd.read_csv, use_cols=None):
         return fct(fpath, index=self.idx_names, usecols=None)
 
@@ -366,29 +791,34 @@ class Count():
                  use_cols=None,
                  parent_folder_fct: Callable = create_parent_folder_name,
                  outfolder=FOLDER_PROCESSED / 'dumps',
-                 dump=False):
-        self.outfolder = Path(outfolder)
-        self.outfolder.mkdir(exist_ok=True, parents=True)
+                 dump=False,
+                 dump_format: str = 'csv',
+                 dtypes: dict = None):
+        self.outfolder = Path(outfolder)  # created by first dump
         self.use_cols = use_cols
         self.process_folder_fct = process_folder_fct
         self.parent_folder_fct = parent_folder_fct
         self.dump = dump
+        self.dump_format = dump_format
+        self.dtypes = dtypes
 
     def __call__(self, folders,
                  **fct_args):
         logging.debug(
             f"Passed function arguments for process_folder_fct Callable: {fct_args}")
-        c = Counter()
+        features = {}
         fpath_dict = {}
         for folder in tqdm(folders):
             folder = Path(folder)
             df = self.process_folder_fct(
                 folder=folder, use_cols=self.use_cols, **fct_args)
-            c.update(df.index)
+            features[folder.stem] = df.index
             if self.dump:
-                fpath_dict[folder.stem] = dump_to_csv(df, folder=folder, outfolder=self.outfolder,
-                                                      parent_folder_fct=self.parent_folder_fct)
-        ret = {'counter': c, 'dumps': fpath_dict}
+                fpath_dict[folder.stem] = dump_table(df, folder=folder, outfolder=self.outfolder,
+                                                     parent_folder_fct=self.parent_folder_fct,
+                                                     dump_format=self.dump_format,
+                                                     dtypes=self.dtypes)
+        ret = {**encode_samples(features), 'dumps': fpath_dict}
         return ret
 
 # aggregated peptides
@@ -408,11 +838,12 @@ def select_peptides(peptides: pd.DataFrame) -> pd.DataFrame:
     return peptides
 
 
-def load_process_peptides(folder: Path, use_cols):
-    peptides = pd.read_table(folder / 'peptides.txt',
-                             usecols=use_cols,
-                             index_col=0,
-                             low_memory=False)
+def load_process_peptides(folder: Path, use_cols, engine: str = None):
+    peptides = read_table(folder / 'peptides.txt',
+                          usecols=use_cols,
+                          index_col=0,
+                          low_memory=False,
+                          engine=engine)
     peptides = select_peptides(peptides)
     return peptides.drop(['Potential contaminant', 'Reverse'], axis=1)
 
@@ -420,17 +851,20 @@ def load_process_peptides(folder: Path, use_cols):
 def count_peptides(folders: List[Path], dump=True,
                    usecols=usecols,
                    parent_folder_fct: Callable = create_parent_folder_name,
-                   outfolder=FOLDER_PROCESSED / 'agg_peptides_dumps'):
-    c = Counter()
+                   outfolder=FOLDER_PROCESSED / 'agg_peptides_dumps',
+                   dump_format: str = 'csv'):
+    features = {}
     fpath_dict = {}
     for folder in folders:
         peptides = load_process_peptides(folder, usecols)
-        c.update(peptides.index)
+        features[folder.stem] = peptides.index
         if dump:
-            fpath_dict[folder.stem] = dump_to_csv(peptides,
-                                                  folder=folder, outfolder=outfolder,
-                                                  parent_folder_fct=parent_folder_fct)
-    ret = {'counter': c, 'dumps': fpath_dict}
+            fpath_dict[folder.stem] = dump_table(peptides,
+                                                 folder=folder, outfolder=Path(outfolder),
+                                                 parent_folder_fct=parent_folder_fct,
+                                                 dump_format=dump_format,
+                                                 dtypes=d_dtypes_training_sample)
+    ret = {**encode_samples(features), 'dumps': fpath_dict}
     return ret
 
 
@@ -444,9 +878,9 @@ d_dtypes_training_sample = {
 }
 
 
-def load_agg_peptide_dump(fpath):
+def load_agg_peptide_dump(fpath, columns: List[str] = None):
     fpath = Path(fpath)
-    peptides = pd.read_csv(fpath, index_col=0, dtype=d_dtypes_training_sample)
+    peptides = read_dump(fpath, index_col='Sequence', columns=columns, dtype=d_dtypes_training_sample)
     return peptides
 
 
@@ -455,7 +889,7 @@ class PeptideCounter(FeatureCounter):
 
     def __init__(self,
                  fp_counter: str,
-                 counting_fct: Callable[[List], Counter] = count_peptides,
+                 counting_fct: Callable[[List], dict] = count_peptides,
                  idx_names=['Sequence'],
                  feature_name='aggregated peptide',
                  **kwargs):
@@ -485,12 +919,27 @@ def select_evidence(df_evidence: pd.DataFrame) -> pd.DataFrame:
 
 
 idx_columns_evidence = [evidence_cols.Sequence, evidence_cols.Charge]
-
-
-def load_process_evidence(folder: Path, use_cols, select_by):
-    evidence = pd.read_table(folder / 'evidence.txt',
-                             usecols=idx_columns_evidence + use_cols,
-                             low_memory=False)
+d_dtypes_evidence = {
+    evidence_cols.Sequence: pd.StringDtype(),
+    evidence_cols.Protein_group_IDs: pd.StringDtype(),
+    evidence_cols.Intensity: pd.Int64Dtype(),
+}
+usecols_evidence = [evidence_cols.mz,
+                    evidence_cols.id,
+                    evidence_cols.Peptide_ID,
+                    evidence_cols.Protein_group_IDs,
+                    evidence_cols.Intensity,
+                    evidence_cols.Score,
+                    evidence_cols.Potential_contaminant,
+                    evidence_cols.Reverse,
+                    ]
+
+
+def load_process_evidence(folder: Path, use_cols, select_by, engine: str = None):
+    evidence = read_table(folder / 'evidence.txt',
+                          usecols=idx_columns_evidence + use_cols,
+                          low_memory=False,
+                          engine=engine)
     evidence = select_evidence(evidence)
     evidence = hela_data.pandas.select_max_by(
         evidence, grouping_columns=idx_columns_evidence, selection_column=select_by)
@@ -501,31 +950,25 @@ def load_process_evidence(folder: Path, use_cols, select_by):
 def count_evidence(folders: List[Path],
                    select_by: str = 'Score',
                    dump=True,
-                   use_cols=[evidence_cols.mz,
-                             evidence_cols.id,
-                             evidence_cols.Peptide_ID,
-                             evidence_cols.Protein_group_IDs,
-                             evidence_cols.Intensity,
-                             evidence_cols.Score,
-                             evidence_cols.Potential_contaminant,
-                             evidence_cols.Reverse,
-                             ],
+                   use_cols=usecols_evidence,
                    parent_folder_fct: Callable = create_parent_folder_name,
-                   outfolder=FOLDER_PROCESSED / 'evidence_dumps'):
+                   outfolder=FOLDER_PROCESSED / 'evidence_dumps',
+                   dump_format: str = 'csv'):
     outfolder = Path(outfolder)
     outfolder.mkdir(exist_ok=True, parents=True)
-    c = Counter()
-    if dump:
-        fpath_dict = {}
+    features = {}
+    fpath_dict = {}
     for folder in tqdm(folders):
         folder = Path(folder)
         evidence = load_process_evidence(
             folder=folder, use_cols=use_cols, select_by=select_by)
-        c.update(evidence.index)
+        features[folder.stem] = evidence.index
         if dump:
-            fpath_dict[folder.stem] = dump_to_csv(evidence, folder=folder, outfolder=outfolder,
-                                                  parent_folder_fct=parent_folder_fct)
-    ret = {'counter': c, 'dumps': fpath_dict}
+            fpath_dict[folder.stem] = dump_table(evidence, folder=folder, outfolder=outfolder,
+                                                 parent_folder_fct=parent_folder_fct,
+                                                 dump_format=dump_format,
+                                                 dtypes=d_dtypes_evidence)
+    ret = {**encode_samples(features), 'dumps': fpath_dict}
     return ret
 
 
@@ -533,45 +976,36 @@ def count_evidence(folders: List[Path],
 class EvidenceCounter(FeatureCounter):
 
     def __init__(self, fp_counter: str,
-                 counting_fct: Callable[[List], Counter] = count_evidence,
+                 counting_fct: Callable[[List], dict] = count_evidence,
                  idx_names=['Sequence', 'Charge'],
                  feature_name='charged peptide',
                  **kwargs):
         super().__init__(fp_counter, counting_fct,
                          idx_names=idx_names, feature_name=feature_name, **kwargs)
 
-    # Methods should use super, otherwise non-specific duplication is needed.
-    def save(self):
-        """Save state
-
-        {
-         'counter': Counter with tuple keys,
-         'based_on': list
-         }
-        """
-        d = {'counter': hela_data.pandas.create_dict_of_dicts(self.counter),
-             'based_on': list(self.loaded),
-             'dumps': {k: str(v) for k, v in self.dumps.items()}}
-        print(f"Save to: {self.fp}")
-        dump_json(d, filename=self.fp)
-
-    def load(self, fp):
-        with open(self.fp) as f:
-            d = json.load(f)
-        d['counter'] = Counter(
-            hela_data.pandas.flatten_dict_of_dicts(d['counter']))
-        d['dumps'] = {k: Path(v) for k, v in d['dumps'].items()}
-        return d
+    @staticmethod
+    def _load_counter(counter: dict) -> Counter:
+        # previous format: nested dict of Sequence and Charge
+        counter = hela_data.pandas.flatten_dict_of_dicts(counter)
+        return Counter({(seq, int(charge)): count for (seq, charge), count in counter.items()})
 
 
-def load_evidence_dump(fpath, index_col=['Sequence', 'Charge']):
-    df = pd.read_csv(fpath, index_col=index_col)
+def load_evidence_dump(fpath, index_col=['Sequence', 'Charge'], columns: List[str] = None):
+    df = read_dump(fpath, index_col=index_col, columns=columns)
     return df
 
 # Protein Groups
 
 
 pg_cols = mq.mq_protein_groups_cols
+d_dtypes_pg = {
+    pg_cols.Protein_IDs: pd.StringDtype(),
+    pg_cols.Majority_protein_IDs: pd.StringDtype(),
+    pg_cols.Gene_names: pd.StringDtype(),
+    pg_cols.Peptide_IDs: pd.StringDtype(),
+    pg_cols.Evidence_IDs: pd.StringDtype(),
+    pg_cols.Intensity: pd.Int64Dtype(),
+}
 
 # def load_process_evidence(folder: Path, use_cols, select_by):
 
@@ -591,11 +1025,13 @@ def load_and_process_proteinGroups(folder: Union[str, Path],
                                        pg_cols.Reverse,
                                        pg_cols.Potential_contaminant,
                                        pg_cols.Intensity,
-]):
+],
+        engine: str = None):
     folder = Path(folder)
-    pg = pd.read_table(folder / 'proteinGroups.txt',
-                       usecols=use_cols,
-                       low_memory=False)
+    pg = read_table(folder / 'proteinGroups.txt',
+                    usecols=use_cols,
+                    low_memory=False,
+                    engine=engine)
     mask = pg[[pg_cols.Only_identified_by_site, pg_cols.Reverse,
                pg_cols.Potential_contaminant]].notna().any(axis=1)
     pg = pg.loc[~mask]
@@ -611,6 +1047,8 @@ def load_and_process_proteinGroups(folder: Union[str, Path],
     pg = hela_data.pandas.select_max_by(df=pg.loc[~mask_no_gene],
                                         grouping_columns=[pg_cols.Gene_names],
                                         selection_column=pg_cols.Score)
+    # keep order of dumps: by gene names in descending order
+    pg = pg.sort_values(by=pg_cols.Gene_names, ascending=False)
     pg = pd.concat([pg, pg_no_gene])
     pg = pg.set_index(pg_cols.Protein_IDs)
     pg = pg.drop([pg_cols.Only_identified_by_site,
@@ -636,7 +1074,8 @@ count_protein_groups = Count(load_and_process_proteinGroups,
                                  pg_cols.Intensity,
                              ],
                              outfolder=FOLDER_PROCESSED / 'proteinGroups_dumps',
-                             dump=True)
+                             dump=True,
+                             dtypes=d_dtypes_pg)
 
 
 @delegates()
@@ -644,7 +1083,7 @@ class ProteinGroupsCounter(FeatureCounter):
 
     def __init__(self, fp_counter: str,
                  counting_fct: Callable[[List],
-                                        Counter] = count_protein_groups,
+                                        dict] = count_protein_groups,
                  idx_names=[pg_cols.Protein_IDs],  # mq_specfic
                  feature_name='protein group',
                  **kwargs):
@@ -652,9 +1091,15 @@ class ProteinGroupsCounter(FeatureCounter):
                          feature_name=feature_name, **kwargs)
 
 
+def _columns_without(use_cols: List[str], index_col: str) -> List[str]:
+    # use_cols include the index column as for pandas.read_csv
+    return [col for col in use_cols if col != index_col] if use_cols is not None else None
+
+
 def load_pg_dump(folder, use_cols=None):
     logger.debug(f"Load: {folder}")
-    df = pd.read_csv(folder, index_col=pg_cols.Protein_IDs, usecols=use_cols)
+    df = read_dump(folder, index_col=pg_cols.Protein_IDs,
+                   columns=_columns_without(use_cols, pg_cols.Protein_IDs))
     return df
 
 # Gene Counter
@@ -663,7 +1108,8 @@ def load_pg_dump(folder, use_cols=None):
 def pg_idx_gene_fct(folder: Union[str, Path], use_cols=None):
     folder = Path(folder)
     logger.debug(f"Load: {folder}")
-    df = pd.read_csv(folder, index_col=pg_cols.Gene_names, usecols=use_cols)
+    df = read_dump(folder, index_col=pg_cols.Gene_names,
+                   columns=_columns_without(use_cols, pg_cols.Gene_names))
     return df
 
 
@@ -683,8 +1129,160 @@ class GeneCounter(FeatureCounter):
     """Gene Counter to count gene in dumped proteinGroups."""
 
     def __init__(self, fp_counter: str,
-                 counting_fct: Callable[[List], Counter] = count_genes,
+                 counting_fct: Callable[[List], dict] = count_genes,
                  feature_name='gene',
                  idx_names=['Gene names'], **kwargs):
         super().__init__(fp_counter, counting_fct, idx_names=idx_names,
                          feature_name=feature_name, **kwargs)
+
+
+# All levels
+
+PEPTIDES, EVIDENCE, PROTEIN_GROUPS, GENES = LEVELS = ('peptides', 'evidence', 'proteinGroups', 'genes')
+
+DUMP_FOLDERS = {PEPTIDES: FOLDER_PROCESSED / 'agg_peptides_dumps',
+                EVIDENCE: FOLDER_PROCESSED / 'evidence_dumps',
+                PROTEIN_GROUPS: FOLDER_PROCESSED / 'proteinGroups_dumps'}
+DUMP_DTYPES = {PEPTIDES: d_dtypes_training_sample,
+               EVIDENCE: d_dtypes_evidence,
+               PROTEIN_GROUPS: d_dtypes_pg}
+
+
+def count_all_levels(folders: List[Path],
+                     select_by: str = 'Score',
+                     dump=True,
+                     parent_folder_fct: Callable = create_parent_folder_name,
+                     outfolders: dict = DUMP_FOLDERS,
+                     dump_format: str = 'csv') -> dict:
+    """Count peptides, precursors, protein groups and genes reading each folder once.
+
+    Genes are counted from the processed protein groups, the gene level uses the dumps
+    of the protein groups.
+
+    Parameters
+    ----------
+    folders : List[Path]
+        MaxQuant output folders.
+    select_by : str, optional
+        column to select precursors by, see `load_process_evidence`, by default 'Score'
+    dump : bool, optional
+        dump processed tables, by default True
+    parent_folder_fct : Callable, optional
+        Callable creating the name of the parent folder of a dump, by default create_parent_folder_name
+    outfolders : dict, optional
+        folders of dumps per level, by default DUMP_FOLDERS
+    dump_format : str, optional
+        format of dumps, one of `DUMP_FORMATS`, by default 'csv'
+
+    Returns
+    -------
+    dict
+        Result as returned by the counting functions of `FeatureCounter` per level
+        under key 'levels'.
+    """
+    features = {level: {} for level in LEVELS}
+    fpath_dicts = {level: {} for level in LEVELS}
+    for folder in folders:
+        folder = Path(folder)
+        tables = {PEPTIDES: load_process_peptides(folder, usecols),
+                  EVIDENCE: load_process_evidence(folder, use_cols=usecols_evidence, select_by=select_by),
+                  PROTEIN_GROUPS: load_and_process_proteinGroups(folder)}
+        for level, df in tables.items():
+            features[level][folder.stem] = df.index
+            if dump:
+                fpath_dicts[level][folder.stem] = dump_table(df, folder=folder, outfolder=Path(outfolders[level]),
+                                                             parent_folder_fct=parent_folder_fct,
+                                                             dump_format=dump_format,
+                                                             dtypes=DUMP_DTYPES[level])
+        features[GENES][folder.stem] = pd.Index(tables[PROTEIN_GROUPS][pg_cols.Gene_names])
+        if dump:
+            fpath_dicts[GENES][folder.stem] = fpath_dicts[PROTEIN_GROUPS][folder.stem]
+    return {'levels': {level: {**encode_samples(features[level]), 'dumps': fpath_dicts[level]}
+                       for level in LEVELS}}
+
+
+def merge_level_results(a: dict, b: dict) -> dict:
+    """Merge two results of `count_all_levels`."""
+    return {'levels': {level: merge_counting_results(a['levels'][level], b['levels'][level])
+                       for level in a['levels']},
+            'folders': a.get('folders', []) + b.get('folders', [])}
+
+
+def _share_level_results(d: dict) -> dict:
+    return {**d, 'levels': {level: _share_counting_result(result) for level, result in d['levels'].items()}}
+
+
+class MultiLevelCounter():
+    """Count peptides, precursors, protein groups and genes in one pass over folders,
+    see `count_all_levels`. The counters of the levels are updated together.
+
+    Parameters
+    ----------
+    fp_counters : dict
+        Filepath of the counter of each level in `LEVELS`.
+    counting_fct : Callable[[List], dict], optional
+        Callable counting all levels of a chunk of folders, by default count_all_levels
+    overwrite : bool, optional
+        Start counting from scratch, by default False
+    """
+
+    def __init__(self, fp_counters: dict,
+                 counting_fct: Callable[[List], dict] = count_all_levels,
+                 overwrite: bool = False):
+        self.counting_fct = counting_fct
+        self.counters = {PEPTIDES: PeptideCounter(fp_counters[PEPTIDES], overwrite=overwrite),
+                         EVIDENCE: EvidenceCounter(fp_counters[EVIDENCE], overwrite=overwrite),
+                         PROTEIN_GROUPS: ProteinGroupsCounter(fp_counters[PROTEIN_GROUPS], overwrite=overwrite),
+                         GENES: GeneCounter(fp_counters[GENES], overwrite=overwrite)}
+
+    def __getitem__(self, level: str) -> FeatureCounter:
+        return self.counters[level]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in self.counters.items())})"
+
+    def get_new_folders(self, folders: List[Path]) -> set:
+        """Names of folders not loaded by at least one of the counters."""
+        return set().union(*(counter.get_new_folders(folders) for counter in self.counters.values()))
+
+    def sum_over_files(self, folders: List[Path], n_workers=N_WORKERS_DEFAULT, save=True,
+                       chunks_per_task: int = 1, executor: Union[str, Executor] = 'process',
+                       shared_memory: bool = None) -> dict:
+        """Count features of all levels of new folders, see `FeatureCounter.sum_over_files`.
+
+        Returns
+        -------
+        dict
+            Counts of features (`collections.Counter`) per level.
+        """
+        new_folder_names = self.get_new_folders(folders)
+        logger.info(f'{len(new_folder_names)} new folders to process.')
+        folders = [folder for folder in folders if Path(folder).stem in new_folder_names]
+        if folders:
+            shared_memory = _use_shared_memory(executor, n_workers, shared_memory)
+
+            def combine(d):
+                for level, result in d['levels'].items():
+                    with _receive_counting_result(result) as result:
+                        self.counters[level].update({**result, 'folders': d['folders']}, save=save)
+
+            collect_in_chuncks(folders,
+                               process_chunk_fct=partial(_count_folders, counting_fct=self.counting_fct),
+                               n_workers=n_workers,
+                               chunks=n_workers * 3 * chunks_per_task,
+                               desc='Count features of all levels in chunks',
+                               combine_fct=combine,
+                               merge_fct=merge_level_results,
+                               chunks_per_task=chunks_per_task,
+                               executor=executor,
+                               transport_fct=_share_level_results if shared_memory else None)
+            if save:
+                self.save()
+        else:
+            logger.info('Nothing to process.')
+        return {level: counter.counter for level, counter in self.counters.items()}
+
+    def save(self):
+        """Save state of all counters."""
+        for counter in self.counters.values():
+            counter.save()
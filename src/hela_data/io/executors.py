@@ -0,0 +1,497 @@
+"""Executor backends to map a function over tasks, e.g. chunks of MaxQuant folders.
+
+Stages only use `Executor.imap`, so the backend can be chosen by the caller:
+
+- 'serial': run in the main process (debugging, small inputs)
+- 'thread': thread pool, for I/O-bound tasks as loading small files
+- 'process': process pool, for CPU-bound tasks as parsing tables
+- 'cluster': workers connected to a task board served over a local socket.
+  Further workers, e.g. on other nodes, can join using `run_worker`.
+
+Use `get_executor` to create an executor by name or `executor_context` in stages which
+accept either a name or an already running executor.
+"""
+import abc
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from multiprocessing.managers import BaseManager
+from typing import Callable, Iterable, Iterator, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ('serial', 'thread', 'process', 'cluster')
+
+
+def _chunked(iterable: Iterable, chunksize: int) -> Iterator[list]:
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Executor(abc.ABC):
+    """Base class of executors. Executors are context managers shutting down
+    their workers on exit.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        number of workers, by default 1
+    """
+
+    def __init__(self, n_workers: int = 1):
+        self.n_workers = n_workers
+
+    @abc.abstractmethod
+    def imap(self, fct: Callable, iterable: Iterable, chunksize: int = 1, ordered: bool = True) -> Iterator:
+        """Apply `fct` to each item of `iterable`.
+
+        Parameters
+        ----------
+        fct : Callable
+            Function to apply. Has to be picklable for the 'process' and 'cluster' backends.
+        iterable : Iterable
+            Items passed to `fct`.
+        chunksize : int, optional
+            number of items sent together to a worker, by default 1
+        ordered : bool, optional
+            yield results in order of items, otherwise as soon as they are available.
+            By default True
+
+        Yields
+        ------
+        Iterator
+            Results of `fct`.
+        """
+
+    def shutdown(self):
+        """Stop workers."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(n_workers={self.n_workers})"
+
+
+class SerialExecutor(Executor):
+    """Run all tasks in the main process."""
+
+    def imap(self, fct, iterable, chunksize=1, ordered=True):
+        return map(fct, iterable)
+
+
+class ThreadExecutor(Executor):
+    """Run tasks in a pool of threads."""
+
+    def __init__(self, n_workers: int = 1):
+        super().__init__(n_workers)
+        self._pool = ThreadPoolExecutor(max_workers=n_workers)
+
+    def imap(self, fct, iterable, chunksize=1, ordered=True):
+        if ordered:
+            return self._pool.map(fct, iterable)
+        futures = [self._pool.submit(fct, item) for item in iterable]
+        return (future.result() for future in as_completed(futures))
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+class ProcessExecutor(Executor):
+    """Run tasks in a `multiprocessing.Pool`.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        number of processes, by default 1
+    initializer : Callable, optional
+        called with `initargs` in each process on start, by default None
+    initargs : tuple, optional
+        arguments of `initializer`, by default ()
+    """
+
+    def __init__(self, n_workers: int = 1, initializer: Callable = None, initargs: tuple = ()):
+        super().__init__(n_workers)
+        self._pool = multiprocessing.Pool(n_workers, initializer=initializer, initargs=initargs)
+
+    def imap(self, fct, iterable, chunksize=1, ordered=True):
+        if ordered:
+            return self._pool.imap(fct, iterable, chunksize=chunksize)
+        return self._pool.imap_unordered(fct, iterable, chunksize=chunksize)
+
+    def shutdown(self):
+        self._pool.close()
+        self._pool.join()
+
+
+class _TaskBoard():
+    """Tasks and results of a `ClusterExecutor`, kept in its server process.
+
+    Workers take tasks with `get` and return results with `done`. A task stays assigned
+    to its worker until the result arrives, so tasks of lost workers can be requeued
+    (`requeue_lost`). Workers report with `beat` while busy.
+
+    Parameters
+    ----------
+    heartbeat : float
+        interval of worker heartbeats in seconds
+    max_retries : int
+        number of times a lost task is requeued before it fails
+    """
+
+    def __init__(self, heartbeat: float, max_retries: int):
+        self._heartbeat = heartbeat
+        self._max_retries = max_retries
+        self._cond = threading.Condition()
+        self._todo = OrderedDict()  # task id -> task
+        self._running = {}  # task id -> (worker, task)
+        self._results = {}  # task id -> (success, result)
+        self._open = set()  # ids of tasks not yet collected or cancelled
+        self._attempts = Counter()
+        self._last_seen = {}  # worker -> time of last message
+        self._closed = False
+
+    def heartbeat_interval(self) -> float:
+        return self._heartbeat
+
+    def put(self, task: tuple):
+        with self._cond:
+            self._todo[task[0]] = task
+            self._open.add(task[0])
+            self._cond.notify_all()
+
+    def get(self, worker: str) -> Union[tuple, None]:
+        """Wait for next task. None if the executor shuts down."""
+        with self._cond:
+            self._last_seen[worker] = time.monotonic()
+            self._cond.wait_for(lambda: self._todo or self._closed)
+            if self._closed:
+                return None
+            i, task = self._todo.popitem(last=False)
+            self._running[i] = (worker, task)
+            self._last_seen[worker] = time.monotonic()
+            return task
+
+    def beat(self, worker: str):
+        with self._cond:
+            self._last_seen[worker] = time.monotonic()
+
+    def done(self, worker: str, i: int, success: bool, result):
+        """Store result of task. The first result of a requeued task is used."""
+        with self._cond:
+            self._last_seen[worker] = time.monotonic()
+            if i not in self._open or i in self._results:
+                return
+            self._running.pop(i, None)
+            self._todo.pop(i, None)
+            self._results[i] = (success, result)
+            self._cond.notify_all()
+
+    def wait(self, ids: list, timeout: float) -> dict:
+        """Wait up to `timeout` seconds for results of tasks `ids` and return the available ones."""
+        with self._cond:
+            self._cond.wait_for(lambda: any(i in self._results for i in ids), timeout)
+            results = {i: self._results.pop(i) for i in ids if i in self._results}
+            self._open.difference_update(results)
+            return results
+
+    def requeue_lost(self, timeout: float, workers: Iterable[str] = ()) -> list:
+        """Requeue tasks of `workers` and of workers not seen for `timeout` seconds.
+        Tasks lost more than `max_retries` times fail with a `RuntimeError`.
+
+        Returns
+        -------
+        list
+            (task id, worker) of lost tasks.
+        """
+        with self._cond:
+            now = time.monotonic()
+            lost = {worker for worker, last_seen in self._last_seen.items() if now - last_seen > timeout}
+            lost.update(workers)
+            lost_tasks = []
+            for i, (worker, task) in list(self._running.items()):
+                if worker not in lost:
+                    continue
+                del self._running[i]
+                self._attempts[i] += 1
+                if self._attempts[i] > self._max_retries:
+                    self._results[i] = (False, RuntimeError(
+                        f"Task {i} was lost {self._attempts[i]} times, last on worker {worker}"))
+                else:
+                    self._todo[i] = task
+                    self._todo.move_to_end(i, last=False)
+                lost_tasks.append((i, worker))
+            for worker in lost:
+                self._last_seen.pop(worker, None)
+            if lost_tasks:
+                self._cond.notify_all()
+            return lost_tasks
+
+    def cancel(self, ids: Iterable[int]):
+        """Drop tasks and their results, e.g. of an iteration stopped early."""
+        with self._cond:
+            for i in ids:
+                self._open.discard(i)
+                self._todo.pop(i, None)
+                self._running.pop(i, None)
+                self._results.pop(i, None)
+                self._attempts.pop(i, None)
+
+    def close(self):
+        """Stop waiting workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def _new_manager_class() -> type:
+    # registering types changes the registry of the class, so each executor or worker
+    # uses its own subclass
+    return type('_ClusterManager', (BaseManager,), {})
+
+
+def _worker_id(pid: int = None) -> str:
+    return f"{socket.gethostname()}:{pid if pid is not None else os.getpid()}"
+
+
+def _send_heartbeats(board, worker: str, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            board.beat(worker)
+        except (EOFError, ConnectionError):
+            return
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes):
+    """Process tasks of a `ClusterExecutor` until it shuts down.
+
+    Parameters
+    ----------
+    address : Tuple[str, int]
+        host and port of the executor, see `ClusterExecutor.address`.
+    authkey : bytes
+        authentication key of the executor, see `ClusterExecutor.authkey`.
+    """
+    manager_cls = _new_manager_class()
+    manager_cls.register('board')
+    manager = manager_cls(address=address, authkey=authkey)
+    manager.connect()
+    board = manager.board()
+    worker = _worker_id()
+    stop = threading.Event()
+    threading.Thread(target=_send_heartbeats,
+                     args=(board, worker, board.heartbeat_interval(), stop),
+                     daemon=True).start()
+    try:
+        while True:
+            try:
+                task = board.get(worker)
+            except (EOFError, ConnectionError):
+                break  # executor shut down
+            if task is None:
+                break
+            i, fct, chunk = task
+            try:
+                result = (True, [fct(item) for item in chunk])
+            except Exception as e:
+                result = (False, e)
+            try:
+                board.done(worker, i, *result)
+            except (EOFError, ConnectionError):
+                break
+    finally:
+        stop.set()
+
+
+class ClusterExecutor(Executor):
+    """Run tasks on workers fetching them from a task board served over a socket.
+
+    Starts `n_workers` local worker processes. Additional workers, e.g. on other
+    nodes, can connect using `run_worker(executor.address, executor.authkey)`
+    if the executor listens on a reachable `address`.
+
+    Workers send a heartbeat every `heartbeat` seconds. Tasks of workers which are
+    not heard of for `timeout` seconds or, for local workers, whose process died are
+    requeued. Dead local workers are replaced.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        number of local worker processes, by default 1
+    address : Tuple[str, int], optional
+        host and port to listen on, by default ('127.0.0.1', 0), i.e. a free local port
+    authkey : bytes, optional
+        authentication key for workers, by default None, i.e. random
+    max_pending : int, optional
+        maximum number of tasks submitted by `imap` and not yet returned,
+        by default None, i.e. four per local worker
+    heartbeat : float, optional
+        interval of worker heartbeats in seconds, by default 5.0
+    timeout : float, optional
+        seconds without heartbeat after which a worker is considered lost, by default 60.0
+    max_retries : int, optional
+        number of times a lost task is requeued before `imap` raises a `RuntimeError`,
+        by default 1
+    """
+
+    def __init__(self,
+                 n_workers: int = 1,
+                 address: Tuple[str, int] = ('127.0.0.1', 0),
+                 authkey: bytes = None,
+                 max_pending: int = None,
+                 heartbeat: float = 5.0,
+                 timeout: float = 60.0,
+                 max_retries: int = 1):
+        super().__init__(n_workers)
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.max_pending = max_pending if max_pending is not None else 4 * max(n_workers, 1)
+        self.heartbeat = heartbeat
+        self.timeout = timeout
+        # the server process uses its own copy of the board
+        board = _TaskBoard(heartbeat=heartbeat, max_retries=max_retries)
+        manager_cls = _new_manager_class()
+        manager_cls.register('board', callable=lambda: board)
+        self._manager = manager_cls(address=address, authkey=self.authkey)
+        self._manager.start()
+        self.address = self._manager.address
+        self._board = self._manager.board()
+        self._n_submitted = 0
+        self._last_check = time.monotonic()
+        self._is_shutdown = False
+        self._workers = {}
+        for _ in range(n_workers):
+            self._start_worker()
+        logger.info(f"Started {n_workers} workers connected to {self.address}")
+
+    def _start_worker(self):
+        worker = multiprocessing.Process(target=run_worker, args=(self.address, self.authkey), daemon=True)
+        worker.start()
+        self._workers[_worker_id(worker.pid)] = worker
+
+    def _check_workers(self):
+        """Replace dead local workers and requeue tasks of lost workers."""
+        dead = [worker for worker, process in self._workers.items() if not process.is_alive()]
+        for worker in dead:
+            exitcode = self._workers.pop(worker).exitcode
+            logger.warning(f"Worker {worker} died (exit code {exitcode}), starting a new one")
+            self._start_worker()
+        if not dead and time.monotonic() - self._last_check < self.heartbeat:
+            return
+        self._last_check = time.monotonic()
+        for i, worker in self._board.requeue_lost(self.timeout, dead):
+            logger.warning(f"Lost task {i} on worker {worker}")
+
+    def imap(self, fct, iterable, chunksize=1, ordered=True):
+        chunks = _chunked(iterable, chunksize)
+        in_flight = deque()  # submitted task ids in order
+        finished = {}  # results of tasks in flight
+        try:
+            while True:
+                while len(in_flight) < self.max_pending:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    self._board.put((self._n_submitted, fct, chunk))
+                    in_flight.append(self._n_submitted)
+                    self._n_submitted += 1
+                if not in_flight:
+                    return
+                finished.update(self._board.wait([i for i in in_flight if i not in finished], self.heartbeat))
+                self._check_workers()
+                if ordered:
+                    while in_flight and in_flight[0] in finished:
+                        yield from _unpack(finished.pop(in_flight.popleft()))
+                    continue
+                for i in list(finished):
+                    in_flight.remove(i)
+                    yield from _unpack(finished.pop(i))
+        finally:
+            # tasks of an iteration stopped early should not keep workers busy
+            if in_flight and not self._is_shutdown:
+                self._board.cancel(list(in_flight))
+
+    def shutdown(self):
+        self._is_shutdown = True
+        self._board.close()
+        for worker in self._workers.values():
+            worker.join(self.timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._manager.shutdown()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(n_workers={self.n_workers}, address={self.address})"
+
+
+def _unpack(result: tuple) -> list:
+    success, result = result
+    if not success:
+        raise result
+    return result
+
+
+def get_executor(kind: str = 'process', n_workers: int = 1, **kwargs) -> Executor:
+    """Create executor.
+
+    Parameters
+    ----------
+    kind : str, optional
+        backend, one of `EXECUTORS`, by default 'process'
+    n_workers : int, optional
+        number of workers, by default 1. A single worker runs serially.
+    **kwargs
+        passed to the executor class, e.g. `initializer` of `ProcessExecutor`.
+
+    Returns
+    -------
+    Executor
+        Executor of `kind`.
+    """
+    if kind not in EXECUTORS:
+        raise ValueError(f"Unknown executor {kind!r}, choose one of {EXECUTORS}")
+    if kind == 'serial' or n_workers <= 1:
+        return SerialExecutor()
+    if kind == 'thread':
+        return ThreadExecutor(n_workers, **kwargs)
+    if kind == 'process':
+        return ProcessExecutor(n_workers, **kwargs)
+    return ClusterExecutor(n_workers, **kwargs)
+
+
+@contextmanager
+def executor_context(executor: Union[str, Executor] = 'process', n_workers: int = 1, **kwargs):
+    """Use a running executor or create one by name, which is shut down on exit.
+
+    Parameters
+    ----------
+    executor : Union[str, Executor], optional
+        Executor or name of backend, see `get_executor`. By default 'process'
+    n_workers : int, optional
+        number of workers of a created executor, by default 1
+
+    Yields
+    ------
+    Executor
+        Executor to use.
+    """
+    if isinstance(executor, Executor):
+        yield executor
+        return
+    with get_executor(executor, n_workers, **kwargs) as executor:
+        yield executor
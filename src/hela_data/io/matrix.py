@@ -0,0 +1,838 @@
+"""Assemble and store wide feature x sample matrices.
+
+`collect_wide` assembles a wide matrix from dumps of single samples. The matrix is
+preallocated for the selected features and all samples. Each column is filled by
+looking up the positions of the features of a sample in the selected features, instead
+of joining the samples one by one to a growing DataFrame. Blocks of columns are loaded
+in parallel using an executor (see `hela_data.io.executors`).
+
+Matrices larger than memory are stored in a folder with
+
+- `values.npy`: values in row-major order, which can be memory-mapped
+- `index.parquet` and `columns.parquet`: labels of rows and columns
+- `meta.json`: names of the label levels
+
+`transpose_memmap` transposes a stored matrix tile by tile, so that at most
+`max_memory` bytes of values are held in memory.
+
+`ChunkedMatrix` stores a matrix tiled in both dimensions, so that rows (e.g. all
+features of a sample), columns (e.g. a feature across all samples) and sub-blocks
+are read from the same store, reading only the tiles overlapping the request.
+
+`SparseMatrix` keeps only the observed values of a mostly missing matrix (e.g. peptides
+or precursors x samples) in a CSR or CSC matrix, so that memory scales with the number
+of observed values instead of the number of entries.
+"""
+import json
+import logging
+from collections import namedtuple
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from tqdm.auto import tqdm
+
+from hela_data.io import dump_json
+from hela_data.io.executors import Executor, executor_context
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ('float32', 'float64', 'Int64')
+
+MAX_MEMORY = 2**30  # bytes, default budget of values held in memory
+# tiles span at least a page of float64 values per row of the transposed matrix
+_MIN_TILE_ROWS = 512
+
+MemmapMatrix = namedtuple('MemmapMatrix', ['values', 'index', 'columns'])
+
+CHUNKS = (256, 256)  # default number of rows and columns of a tile of a ChunkedMatrix
+
+
+def _fill_block(block: Tuple[int, list],
+                index: pd.Index,
+                load_fct: Callable[[Path], pd.Series],
+                dtype: str,
+                sparse: bool = False) -> Tuple[int, np.ndarray, np.ndarray, list]:
+    start, dumps = block
+    shape = (len(index), len(dumps))
+    if sparse:
+        # observed values as (row, column, value) triplets
+        values = ([], [], [])
+        observed = None
+    elif dtype == 'Int64':
+        values = np.zeros(shape, dtype=np.int64, order='F')
+        observed = np.zeros(shape, dtype=bool, order='F')
+    else:
+        values = np.full(shape, np.nan, dtype=dtype, order='F')
+        observed = None
+    failed = []
+    for j, (sample, path) in enumerate(dumps):
+        try:
+            s = load_fct(path)
+        except (FileNotFoundError, pd.errors.EmptyDataError) as e:
+            logger.warning(f"Could not load {sample} from {path}: {e}")
+            failed.append(sample)
+            continue
+        positions = index.get_indexer(s.index)
+        selected = positions >= 0
+        if sparse:
+            selected &= s.notna().to_numpy()
+            values[0].append(positions[selected])
+            values[1].append(np.full(selected.sum(), j))
+            values[2].append(s.to_numpy(dtype=_sparse_dtype(dtype), na_value=0)[selected])
+            continue
+        positions = positions[selected]
+        if dtype == 'Int64':
+            values[positions, j] = s.to_numpy(dtype=np.int64, na_value=0)[selected]
+            observed[positions, j] = s.notna().to_numpy()[selected]
+        else:
+            values[positions, j] = s.to_numpy(dtype=dtype, na_value=np.nan)[selected]
+    if sparse:
+        values = tuple(np.concatenate(v) if v else np.zeros(0, dtype=np.intp) for v in values)
+    return start, values, observed, failed
+
+
+def _sparse_dtype(dtype: str) -> np.dtype:
+    return np.dtype(np.int64) if dtype == 'Int64' else np.dtype(dtype)
+
+
+def _assemble_sparse(blocks: Iterator[tuple], index: pd.Index, samples: list, dtype: str) -> 'SparseMatrix':
+    rows, columns, data, failed = [], [], [], []
+    for start, (block_rows, block_columns, block_data), _, block_failed in blocks:
+        rows.append(block_rows)
+        columns.append(block_columns + start)
+        data.append(block_data.astype(_sparse_dtype(dtype), copy=False))
+        failed.extend(block_failed)
+    data = np.concatenate(data) if data else np.zeros(0, dtype=_sparse_dtype(dtype))
+    matrix = scipy.sparse.csc_matrix(
+        (data, (np.concatenate(rows) if rows else [], np.concatenate(columns) if columns else [])),
+        shape=(len(index), len(samples)), dtype=data.dtype)
+    matrix = SparseMatrix(matrix, index, pd.Index(samples))
+    if failed:
+        logger.warning(f"Left out {len(failed):,d} samples which could not be loaded.")
+        matrix = matrix.select(columns=~matrix.columns.isin(failed))
+    return matrix
+
+
+def collect_wide(index: pd.Index,
+                 dumps: List[Tuple[str, Union[str, Path]]],
+                 load_fct: Callable[[Path], pd.Series],
+                 dtype: str = 'float32',
+                 block_size: int = 64,
+                 n_workers: int = 1,
+                 executor: Union[str, Executor] = 'process',
+                 sparse: bool = False) -> Union[pd.DataFrame, 'SparseMatrix']:
+    """Collect the values of selected features of samples in a wide DataFrame.
+
+    Parameters
+    ----------
+    index : pd.Index
+        Unique selected features, the rows of the wide DataFrame. Features of a
+        sample not in `index` are ignored.
+    dumps : List[Tuple[str, Union[str, Path]]]
+        Pairs of sample name and filepath of its dump, the columns of the wide DataFrame.
+    load_fct : Callable[[Path], pd.Series]
+        Function loading the values of a sample from a dump, indexed by
+        unique features as `index`. Has to be picklable for the 'process'
+        and 'cluster' executors.
+    dtype : str, optional
+        dtype of the values, one of `DTYPES`, by default 'float32'
+    block_size : int, optional
+        number of samples loaded in one task, by default 64
+    n_workers : int, optional
+        number of workers, by default 1
+    executor : Union[str, Executor], optional
+        Executor or name of backend, see `hela_data.io.executors.get_executor`.
+        By default 'process'
+    sparse : bool, optional
+        collect only observed values in a `SparseMatrix` (CSC), by default False.
+        Memory scales with the number of observed values.
+
+    Returns
+    -------
+    Union[pd.DataFrame, SparseMatrix]
+        Values of features (rows) by sample (columns). Samples whose dumps were not
+        found or empty are left out.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype {dtype!r}, choose one of {DTYPES}")
+    if not index.is_unique:
+        raise ValueError("Selected features have to be unique.")
+    dumps = [(sample, Path(path)) for sample, path in dumps]
+    samples = [sample for sample, _ in dumps]
+    blocks = [(start, dumps[start:start + block_size]) for start in range(0, len(dumps), block_size)]
+    fill_block = partial(_fill_block, index=index, load_fct=load_fct, dtype=dtype, sparse=sparse)
+    if sparse:
+        with executor_context(executor, n_workers) as ex:
+            return _assemble_sparse(tqdm(ex.imap(fill_block, blocks, ordered=False), total=len(blocks)),
+                                    index, samples, dtype)
+
+    shape = (len(index), len(dumps))
+    # column-major: each sample is a contiguous column, as in a DataFrame block
+    if dtype == 'Int64':
+        values = np.zeros(shape, dtype=np.int64, order='F')
+        observed = np.zeros(shape, dtype=bool, order='F')
+    else:
+        values = np.empty(shape, dtype=dtype, order='F')
+        observed = None
+    logger.info(f"Allocated {values.nbytes / 2**20:,.1f} MiB for {shape[0]:,d} features"
+                f" of {shape[1]:,d} samples.")
+
+    failed = []
+    with executor_context(executor, n_workers) as ex:
+        for start, block, block_observed, block_failed in tqdm(
+                ex.imap(fill_block, blocks, ordered=False), total=len(blocks)):
+            values[:, start:start + block.shape[1]] = block
+            if observed is not None:
+                observed[:, start:start + block.shape[1]] = block_observed
+            failed.extend(block_failed)
+
+    if observed is None:
+        df = pd.DataFrame(values, index=index, columns=samples, copy=False)
+    else:
+        df = pd.DataFrame({j: pd.arrays.IntegerArray(values[:, j], ~observed[:, j])
+                           for j in range(shape[1])}, index=index)
+        df.columns = samples
+    if failed:
+        logger.warning(f"Left out {len(failed):,d} samples which could not be loaded.")
+        df = df.drop(columns=failed)
+    return df
+
+
+def _save_labels(labels: pd.Index, fname: Path):
+    df = labels.to_frame(index=False)
+    df.columns = [f'level_{i}' for i in range(df.shape[1])]
+    df.to_parquet(fname, index=False)
+
+
+def _load_labels(fname: Path, names: list) -> pd.Index:
+    df = pd.read_parquet(fname)
+    if len(names) > 1:
+        return pd.MultiIndex.from_frame(df, names=names)
+    return pd.Index(df.iloc[:, 0], name=names[0])
+
+
+def _create_memmap(folder: Path, index: pd.Index, columns: pd.Index, dtype) -> Path:
+    folder.mkdir(exist_ok=True, parents=True)
+    _save_labels(index, folder / 'index.parquet')
+    _save_labels(columns, folder / 'columns.parquet')
+    dump_json({'index_names': list(index.names), 'columns_names': list(columns.names)},
+              folder / 'meta.json')
+    fname = folder / 'values.npy'
+    values = np.lib.format.open_memmap(fname, mode='w+', dtype=dtype, shape=(len(index), len(columns)))
+    del values
+    return fname
+
+
+def _map_rows(fname: Path, start: int, stop: int, mode: str = 'r') -> np.memmap:
+    # map only the rows in use: pages of a mapping count to the memory of the
+    # process until it is closed, i.e. the returned array is deleted
+    values = np.load(fname, mmap_mode='r')
+    (n_rows, n_cols), dtype, offset = values.shape, values.dtype, values.offset
+    del values
+    stop = min(stop, n_rows)
+    return np.memmap(fname, dtype=dtype, mode=mode, offset=offset + start * n_cols * dtype.itemsize,
+                     shape=(stop - start, n_cols))
+
+
+def _tile_shape(shape: Tuple[int, int], itemsize: int, max_memory: int) -> Tuple[int, int]:
+    n_rows, n_cols = shape
+    n_items = max(1, max_memory // itemsize)
+    cols = max(1, min(n_cols, n_items // max(1, min(n_rows, _MIN_TILE_ROWS))))
+    rows = max(1, min(n_rows, n_items // cols))
+    return rows, cols
+
+
+def _rows_per_block(n_cols: int, itemsize: int, max_memory: int) -> int:
+    return max(1, max_memory // (itemsize * max(1, n_cols)))
+
+
+def to_memmap(df: pd.DataFrame,
+              folder: Union[str, Path],
+              dtype: str = 'float64',
+              max_memory: int = MAX_MEMORY) -> Path:
+    """Store DataFrame as memory-mappable matrix in `folder`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Numeric DataFrame, missing values are stored as NaN.
+    folder : Union[str, Path]
+        Folder to store the matrix in.
+    dtype : str, optional
+        NumPy float dtype of the stored values, by default 'float64'
+    max_memory : int, optional
+        maximum number of bytes of values converted at once, by default `MAX_MEMORY`
+
+    Returns
+    -------
+    Path
+        Folder of the stored matrix.
+    """
+    folder = Path(folder)
+    fname = _create_memmap(folder, df.index, df.columns, dtype)
+    rows = _rows_per_block(df.shape[1], np.dtype(dtype).itemsize, max_memory)
+    for start in range(0, df.shape[0], rows):
+        values = _map_rows(fname, start, start + rows, mode='r+')
+        values[:] = df.iloc[start:start + rows].to_numpy(dtype=dtype, na_value=np.nan)
+        values.flush()
+        del values
+    return folder
+
+
+def open_memmap(folder: Union[str, Path], mode: str = 'r') -> MemmapMatrix:
+    """Open a matrix stored by `to_memmap` without loading its values.
+
+    Parameters
+    ----------
+    folder : Union[str, Path]
+        Folder of the stored matrix.
+    mode : str, optional
+        mode of `numpy.load`, by default 'r', i.e. read-only
+
+    Returns
+    -------
+    MemmapMatrix
+        Memory-mapped values and the labels of rows (index) and columns.
+    """
+    folder = Path(folder)
+    with open(folder / 'meta.json') as f:
+        meta = json.load(f)
+    return MemmapMatrix(values=np.load(folder / 'values.npy', mmap_mode=mode),
+                        index=_load_labels(folder / 'index.parquet', meta['index_names']),
+                        columns=_load_labels(folder / 'columns.parquet', meta['columns_names']))
+
+
+def read_memmap(folder: Union[str, Path], dtype: str = None) -> pd.DataFrame:
+    """Load a matrix stored by `to_memmap` as DataFrame.
+
+    Parameters
+    ----------
+    folder : Union[str, Path]
+        Folder of the stored matrix.
+    dtype : str, optional
+        dtype to cast the values to, e.g. 'Int64', by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        Matrix with labels.
+    """
+    matrix = open_memmap(folder)
+    shape, offset = matrix.values.shape, matrix.values.offset
+    values = np.fromfile(Path(folder) / 'values.npy', dtype=matrix.values.dtype,
+                         count=shape[0] * shape[1], offset=offset).reshape(shape)
+    df = pd.DataFrame(values, index=matrix.index, columns=matrix.columns, copy=False)
+    if dtype is not None:
+        df = df.astype(dtype)
+    return df
+
+
+def iter_row_blocks(folder: Union[str, Path], max_memory: int = MAX_MEMORY) -> Iterator[pd.DataFrame]:
+    """Iterate over blocks of consecutive rows of a matrix stored by `to_memmap`.
+
+    Parameters
+    ----------
+    folder : Union[str, Path]
+        Folder of the stored matrix.
+    max_memory : int, optional
+        maximum number of bytes of values in a block, by default `MAX_MEMORY`
+
+    Yields
+    ------
+    pd.DataFrame
+        Block of rows with all columns.
+    """
+    matrix = open_memmap(folder)
+    fname = Path(folder) / 'values.npy'
+    n_rows, n_cols = matrix.values.shape
+    rows = _rows_per_block(n_cols, matrix.values.itemsize, max_memory)
+    for start in range(0, n_rows, rows):
+        values = _map_rows(fname, start, start + rows)
+        block = pd.DataFrame(np.array(values),
+                             index=matrix.index[start:start + rows],
+                             columns=matrix.columns,
+                             copy=False)
+        del values
+        yield block
+
+
+def transpose_memmap(folder: Union[str, Path],
+                     folder_out: Union[str, Path],
+                     max_memory: int = MAX_MEMORY) -> Path:
+    """Transpose a matrix stored by `to_memmap` into a new folder.
+
+    The matrix is copied in tiles of at most `max_memory` bytes. Only the rows of a
+    tile are mapped into memory, written tiles are flushed to disk. The peak memory
+    is about three times `max_memory`: the tile and the mapped pages of both files.
+
+    Parameters
+    ----------
+    folder : Union[str, Path]
+        Folder of the stored matrix.
+    folder_out : Union[str, Path]
+        Folder to store the transposed matrix in.
+    max_memory : int, optional
+        maximum number of bytes of values in a tile, by default `MAX_MEMORY`
+
+    Returns
+    -------
+    Path
+        Folder of the transposed matrix.
+    """
+    folder = Path(folder)
+    matrix = open_memmap(folder)
+    fname_out = _create_memmap(Path(folder_out), matrix.columns, matrix.index, matrix.values.dtype)
+    n_rows, n_cols = matrix.values.shape
+    rows, cols = _tile_shape((n_rows, n_cols), matrix.values.itemsize, max_memory)
+    logger.info(f"Transpose {n_rows:,d} x {n_cols:,d} matrix in tiles of {rows:,d} x {cols:,d}.")
+    tiles = [(r, c) for r in range(0, n_rows, rows) for c in range(0, n_cols, cols)]
+    for r, c in tqdm(tiles):
+        values = _map_rows(folder / 'values.npy', r, r + rows)
+        tile = np.array(values[:, c:c + cols])
+        del values
+        out = _map_rows(fname_out, c, c + cols, mode='r+')
+        out[:, r:r + rows] = tile.T
+        out.flush()
+        del out, tile
+    return Path(folder_out)
+
+
+def _as_positions(key, n: int) -> np.ndarray:
+    if key is None:
+        return np.arange(n)
+    if isinstance(key, slice):
+        return np.arange(n)[key]
+    positions = np.asarray(key, dtype=np.intp)
+    positions = np.where(positions < 0, positions + n, positions)
+    if len(positions) and (positions.min() < 0 or positions.max() >= n):
+        raise IndexError(f"Positions out of bounds for axis of length {n:,d}.")
+    return positions
+
+
+def _get_positions(labels: pd.Index, key) -> np.ndarray:
+    if key is None:
+        return np.arange(len(labels))
+    if isinstance(key, slice):
+        return np.arange(len(labels))[labels.slice_indexer(key.start, key.stop, key.step)]
+    mask = np.asarray(key)
+    if pd.api.types.is_bool_dtype(mask) and len(mask) == len(labels):
+        # boolean mask, e.g. a list or a Series aligned to the labels
+        return np.flatnonzero(mask)
+    key = key if isinstance(key, pd.Index) else pd.Index(key, tupleize_cols=True)
+    positions = labels.get_indexer(key)
+    if (positions == -1).any():
+        raise KeyError(f"Labels not found: {key[positions == -1].tolist()}")
+    return positions
+
+
+def _local(positions: np.ndarray):
+    # consecutive positions are read as slice
+    if len(positions) and (np.diff(positions) == 1).all():
+        return slice(positions[0], positions[-1] + 1)
+    return positions
+
+
+class ChunkedMatrix():
+    """Matrix stored in tiles of `chunks` rows and columns, e.g. samples x features.
+
+    The float32 values are stored padded with NaN in `values.npy` with shape
+    (row chunks, column chunks, rows per chunk, columns per chunk), i.e. each tile
+    is contiguous on disk. Reading maps only the tiles overlapping the requested
+    rows and columns. The labels are stored as for `to_memmap`.
+
+    Parameters
+    ----------
+    folder : Union[str, Path]
+        Folder of the store.
+    """
+
+    def __init__(self, folder: Union[str, Path]):
+        self.folder = Path(folder)
+        with open(self.folder / 'meta.json') as f:
+            meta = json.load(f)
+        self.chunks = tuple(meta['chunks'])
+        self.index = _load_labels(self.folder / 'index.parquet', meta['index_names'])
+        self.columns = _load_labels(self.folder / 'columns.parquet', meta['columns_names'])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.index), len(self.columns)
+
+    @classmethod
+    def _create(cls, folder: Union[str, Path], index: pd.Index, columns: pd.Index,
+                chunks: Tuple[int, int], fill_fct: Callable[[int, int], np.ndarray]) -> 'ChunkedMatrix':
+        folder = Path(folder)
+        folder.mkdir(exist_ok=True, parents=True)
+        _save_labels(index, folder / 'index.parquet')
+        _save_labels(columns, folder / 'columns.parquet')
+        rows, cols = chunks
+        n_chunks = (-(-len(index) // rows), -(-len(columns) // cols))
+        values = np.lib.format.open_memmap(folder / 'values.npy', mode='w+', dtype=np.float32,
+                                           shape=(*n_chunks, rows, cols))
+        del values
+        for i in tqdm(range(n_chunks[0])):
+            band = np.full((rows, n_chunks[1] * cols), np.nan, dtype=np.float32)
+            start, stop = i * rows, min((i + 1) * rows, len(index))
+            band[:stop - start, :len(columns)] = fill_fct(start, stop)
+            values = np.load(folder / 'values.npy', mmap_mode='r+')
+            # tiles of a band of rows are stored consecutively
+            values[i] = band.reshape(rows, n_chunks[1], cols).transpose(1, 0, 2)
+            values.flush()
+            del values
+        # written last: a store is complete once its meta data exists
+        dump_json({'index_names': list(index.names), 'columns_names': list(columns.names),
+                   'chunks': [rows, cols]},
+                  folder / 'meta.json')
+        return cls(folder)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, folder: Union[str, Path],
+                   chunks: Tuple[int, int] = CHUNKS) -> 'ChunkedMatrix':
+        """Store a numeric DataFrame, missing values are stored as NaN.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Numeric DataFrame, e.g. samples x features.
+        folder : Union[str, Path]
+            Folder of the store.
+        chunks : Tuple[int, int], optional
+            number of rows and columns of a tile, by default `CHUNKS`
+
+        Returns
+        -------
+        ChunkedMatrix
+            Opened store.
+        """
+        def fill_fct(start, stop):
+            return df.iloc[start:stop].to_numpy(dtype=np.float32, na_value=np.nan)
+        return cls._create(folder, df.index, df.columns, chunks, fill_fct)
+
+    @classmethod
+    def from_pickle(cls, fname: Union[str, Path], folder: Union[str, Path] = None,
+                    chunks: Tuple[int, int] = CHUNKS) -> 'ChunkedMatrix':
+        """Convert a pickled DataFrame, e.g. `intensities_wide_selected_N*_M*.pkl`.
+
+        Parameters
+        ----------
+        fname : Union[str, Path]
+            Filepath of pickled DataFrame.
+        folder : Union[str, Path], optional
+            Folder of the store, by default None, i.e. `fname` without suffix
+        chunks : Tuple[int, int], optional
+            number of rows and columns of a tile, by default `CHUNKS`
+
+        Returns
+        -------
+        ChunkedMatrix
+            Opened store.
+        """
+        fname = Path(fname)
+        folder = folder if folder is not None else fname.with_suffix('')
+        return cls.from_frame(pd.read_pickle(fname), folder, chunks=chunks)
+
+    @classmethod
+    def from_memmap(cls, folder_memmap: Union[str, Path], folder: Union[str, Path],
+                    chunks: Tuple[int, int] = CHUNKS) -> 'ChunkedMatrix':
+        """Convert a matrix stored by `to_memmap` band by band of rows.
+
+        Parameters
+        ----------
+        folder_memmap : Union[str, Path]
+            Folder of matrix stored by `to_memmap`.
+        folder : Union[str, Path]
+            Folder of the store.
+        chunks : Tuple[int, int], optional
+            number of rows and columns of a tile, by default `CHUNKS`
+
+        Returns
+        -------
+        ChunkedMatrix
+            Opened store.
+        """
+        matrix = open_memmap(folder_memmap)
+        fname = Path(folder_memmap) / 'values.npy'
+
+        def fill_fct(start, stop):
+            values = _map_rows(fname, start, stop)
+            band = values.astype(np.float32)
+            del values
+            return band
+        return cls._create(folder, matrix.index, matrix.columns, chunks, fill_fct)
+
+    def iread(self, rows=None, columns=None) -> pd.DataFrame:
+        """Read rows and columns by position.
+
+        Parameters
+        ----------
+        rows : slice or array-like of int, optional
+            positions of rows, by default None, i.e. all rows
+        columns : slice or array-like of int, optional
+            positions of columns, by default None, i.e. all columns
+
+        Returns
+        -------
+        pd.DataFrame
+            Selected values in the requested order.
+        """
+        rows = _as_positions(rows, self.shape[0])
+        columns = _as_positions(columns, self.shape[1])
+        return self._read(rows, columns)
+
+    def read(self, rows=None, columns=None) -> pd.DataFrame:
+        """Read rows and columns by label.
+
+        Parameters
+        ----------
+        rows : slice or list-like, optional
+            labels of rows or slice of labels (including the stop label),
+            by default None, i.e. all rows
+        columns : slice or list-like, optional
+            labels of columns or slice of labels, by default None, i.e. all columns
+
+        Returns
+        -------
+        pd.DataFrame
+            Selected values in the requested order.
+        """
+        return self._read(_get_positions(self.index, rows), _get_positions(self.columns, columns))
+
+    def _read(self, rows: np.ndarray, columns: np.ndarray) -> pd.DataFrame:
+        chunk_rows, chunk_cols = self.chunks
+        out = np.empty((len(rows), len(columns)), dtype=np.float32)
+        if out.size:
+            values = np.load(self.folder / 'values.npy', mmap_mode='r')
+            for i in np.unique(rows // chunk_rows):
+                out_rows = np.flatnonzero(rows // chunk_rows == i)
+                local_rows = _local(rows[out_rows] - i * chunk_rows)
+                for j in np.unique(columns // chunk_cols):
+                    out_cols = np.flatnonzero(columns // chunk_cols == j)
+                    local_cols = _local(columns[out_cols] - j * chunk_cols)
+                    tile = values[i, j, local_rows]
+                    out[np.ix_(out_rows, out_cols)] = tile[:, local_cols]
+            del values
+        return pd.DataFrame(out, index=self.index[rows], columns=self.columns[columns], copy=False)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(folder={str(self.folder)!r}, "
+                f"shape={self.shape}, chunks={self.chunks})")
+
+
+def _rename_labels(labels: pd.Index, mapper) -> pd.Index:
+    if mapper is None:
+        return labels
+    if callable(mapper):
+        return labels.map(mapper)
+    mapping = dict(mapper)
+    return labels.map(lambda label: mapping.get(label, label))
+
+
+class _SparseLocIndexer():
+
+    def __init__(self, matrix: 'SparseMatrix'):
+        self.matrix = matrix
+
+    def __getitem__(self, key) -> 'SparseMatrix':
+        rows, columns = key if isinstance(key, tuple) and len(key) == 2 else (key, None)
+        return self.matrix.select(rows=rows, columns=columns)
+
+
+class SparseMatrix():
+    """Matrix of observed values, e.g. samples x features, without storing missing values.
+
+    All stored entries of the sparse matrix are observed values, also stored zeros.
+    Counts of observed values, selections and transposition work on the sparse
+    matrix. `to_dense` returns a DataFrame with NaN for missing values.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.spmatrix
+        Sparse matrix of observed values, stored in CSR or CSC format.
+    index : pd.Index
+        Labels of rows.
+    columns : pd.Index
+        Labels of columns.
+    """
+
+    def __init__(self, matrix: scipy.sparse.spmatrix, index: pd.Index, columns: pd.Index):
+        if matrix.shape != (len(index), len(columns)):
+            raise ValueError(f"Shape of matrix {matrix.shape} does not match labels "
+                             f"{(len(index), len(columns))}.")
+        self.matrix = matrix if matrix.format in ('csr', 'csc') else matrix.tocsr()
+        self.index = index
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype: str = 'float64', format: str = 'csr',
+                   max_memory: int = MAX_MEMORY) -> 'SparseMatrix':
+        """Keep the observed (not missing) values of a DataFrame.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Numeric DataFrame.
+        dtype : str, optional
+            NumPy dtype of the stored values, by default 'float64'
+        format : str, optional
+            'csr' (fast row access) or 'csc' (fast column access), by default 'csr'
+        max_memory : int, optional
+            maximum number of bytes of values converted to a dense array at once,
+            by default `MAX_MEMORY`
+
+        Returns
+        -------
+        SparseMatrix
+            Observed values of `df`.
+        """
+        cols = max(1, max_memory // (8 * max(1, df.shape[0])))
+        rows, columns, data = [], [], []
+        for start in range(0, df.shape[1], cols):
+            band = df.iloc[:, start:start + cols]
+            observed = band.notna().to_numpy()
+            values = band.to_numpy(dtype=dtype, na_value=0)
+            r, c = np.nonzero(observed)
+            rows.append(r)
+            columns.append(c + start)
+            data.append(values[r, c])
+        matrix = scipy.sparse.coo_matrix((np.concatenate(data) if data else np.zeros(0, dtype=dtype),
+                                          (np.concatenate(rows) if rows else [],
+                                           np.concatenate(columns) if columns else [])),
+                                         shape=df.shape, dtype=dtype).asformat(format)
+        return cls(matrix, df.index, df.columns)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.matrix.dtype
+
+    @property
+    def nnz(self) -> int:
+        """Number of observed values."""
+        return self.matrix.nnz
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the sparse matrix (without labels)."""
+        m = self.matrix
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+
+    @property
+    def T(self) -> 'SparseMatrix':
+        """Transposed matrix, a CSR matrix becomes a CSC matrix without copying."""
+        return SparseMatrix(self.matrix.T, self.columns, self.index)
+
+    @property
+    def loc(self) -> _SparseLocIndexer:
+        """Select rows or (rows, columns) by labels, slices of labels or boolean masks."""
+        return _SparseLocIndexer(self)
+
+    def select(self, rows=None, columns=None) -> 'SparseMatrix':
+        """Select rows and columns by labels, slices of labels or boolean masks."""
+        return self.iselect(_get_positions(self.index, rows), _get_positions(self.columns, columns))
+
+    def iselect(self, rows=None, columns=None) -> 'SparseMatrix':
+        """Select rows and columns by position."""
+        rows = _as_positions(rows, self.shape[0])
+        columns = _as_positions(columns, self.shape[1])
+        # select along the compressed axis first
+        if self.matrix.format == 'csr':
+            matrix = self.matrix[rows][:, columns]
+        else:
+            matrix = self.matrix[:, columns][rows]
+        return SparseMatrix(matrix.asformat(self.matrix.format), self.index[rows], self.columns[columns])
+
+    def rename(self, mapper=None, index=None, columns=None) -> 'SparseMatrix':
+        """Rename labels of rows (`mapper` or `index`) or columns using a dict-like or function."""
+        return SparseMatrix(self.matrix,
+                            _rename_labels(self.index, index if index is not None else mapper),
+                            _rename_labels(self.columns, columns))
+
+    def sort_index(self, inplace: bool = False):
+        """Sort rows by label."""
+        result = self.iselect(rows=self.index.argsort())
+        if not inplace:
+            return result
+        self.matrix, self.index = result.matrix, result.index
+
+    def count(self, axis: int = 0) -> pd.Series:
+        """Number of observed values per column (axis=0) or per row (axis=1)."""
+        return pd.Series(self.matrix.getnnz(axis=axis).astype(np.int64),
+                         index=self.columns if axis == 0 else self.index)
+
+    def notna(self) -> 'SparseMatrix':
+        """Boolean matrix of observed values, e.g. to `sum` them."""
+        matrix = self.matrix.copy()
+        matrix.data = np.ones(matrix.nnz, dtype=bool)
+        return SparseMatrix(matrix, self.index, self.columns)
+
+    def sum(self, axis: int = 0) -> pd.Series:
+        """Sum of observed values per column (axis=0) or per row (axis=1)."""
+        return pd.Series(np.asarray(self.matrix.sum(axis=axis)).ravel(),
+                         index=self.columns if axis == 0 else self.index)
+
+    def to_dense(self, dtype: str = 'float64') -> pd.DataFrame:
+        """DataFrame with NaN for missing values."""
+        values = np.full(self.shape, np.nan, dtype=dtype)
+        coo = self.matrix.tocoo()
+        values[coo.row, coo.col] = coo.data
+        return pd.DataFrame(values, index=self.index, columns=self.columns, copy=False)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """First `n` rows as DataFrame."""
+        return self.iselect(rows=slice(0, n)).to_dense()
+
+    def stack(self, level=None) -> pd.Series:
+        """Observed values in long format indexed by the row and column labels.
+        All column levels are stacked, `level` is accepted for compatibility with `DataFrame.stack`."""
+        matrix = self.matrix.tocsr(copy=True)
+        matrix.sort_indices()
+        coo = matrix.tocoo()
+        rows, columns = self.index[coo.row], self.columns[coo.col]
+        index = pd.MultiIndex.from_arrays(
+            [rows.get_level_values(i) for i in range(rows.nlevels)]
+            + [columns.get_level_values(i) for i in range(columns.nlevels)],
+            names=[*self.index.names, *self.columns.names])
+        return pd.Series(coo.data, index=index)
+
+    def save(self, folder: Union[str, Path]) -> Path:
+        """Save matrix as `values.npz` and labels as for `to_memmap`."""
+        folder = Path(folder)
+        folder.mkdir(exist_ok=True, parents=True)
+        scipy.sparse.save_npz(folder / 'values.npz', self.matrix)
+        _save_labels(self.index, folder / 'index.parquet')
+        _save_labels(self.columns, folder / 'columns.parquet')
+        dump_json({'index_names': list(self.index.names), 'columns_names': list(self.columns.names)},
+                  folder / 'meta.json')
+        return folder
+
+    @classmethod
+    def load(cls, folder: Union[str, Path]) -> 'SparseMatrix':
+        """Load matrix saved by `save`."""
+        folder = Path(folder)
+        with open(folder / 'meta.json') as f:
+            meta = json.load(f)
+        return cls(scipy.sparse.load_npz(folder / 'values.npz'),
+                   index=_load_labels(folder / 'index.parquet', meta['index_names']),
+                   columns=_load_labels(folder / 'columns.parquet', meta['columns_names']))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        # unary ufuncs, e.g. np.log2, are applied to the observed values
+        if method != '__call__' or len(inputs) != 1 or kwargs:
+            return NotImplemented
+        matrix = self.matrix.copy()
+        matrix.data = ufunc(matrix.data)
+        return SparseMatrix(matrix, self.index, self.columns)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(shape={self.shape}, nnz={self.nnz:,d}, "
+                f"format={self.matrix.format!r}, dtype={self.dtype})")
@@ -1,13 +1,29 @@
+import contextlib
+import gc
+import json
 import logging
+import multiprocessing
+import time
+import zipfile
 from collections import Counter, namedtuple
-from pathlib import Path
-from typing import Iterable
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterable, Iterator, Union
 import omegaconf
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import scipy.sparse
 from pandas import Int64Dtype, StringDtype, Float64Dtype
+from pandas.api.types import is_extension_array_dtype, is_integer_dtype
+from tqdm import tqdm
 
+import hela_data.file_utils
 import hela_data.io
+import hela_data.io.cache
+import hela_data.io.parsers
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -96,21 +112,22 @@ mq_evidence_cols = omegaconf.OmegaConf.create(mq_evidence_cols)
 
 
 mq_evidence_dtypes = {'Length': Int64Dtype(),
-                      'Modifications': StringDtype,
-                      'Modified sequence': StringDtype,
-                      'Oxidation (M) Probabilities': StringDtype,
-                      'Oxidation (M) Score Diffs': StringDtype,
+                      'Modifications': StringDtype(),
+                      'Modified sequence': StringDtype(),
+                      'Oxidation (M) Probabilities': StringDtype(),
+                      'Oxidation (M) Score Diffs': StringDtype(),
                       'Acetyl (Protein N-term)': Int64Dtype(),
                       'Oxidation (M)': Int64Dtype(),
                       'Missed cleavages': Int64Dtype(),
-                      'Proteins': StringDtype,
-                      'Leading proteins': StringDtype,
-                      'Leading razor protein': StringDtype,
-                      'Gene names': StringDtype,
-                      'Protein names': StringDtype,
-                      'Type': StringDtype,
-                      'Raw file': StringDtype,
+                      'Proteins': StringDtype(),
+                      'Leading proteins': StringDtype(),
+                      'Leading razor protein': StringDtype(),
+                      'Gene names': StringDtype(),
+                      'Protein names': StringDtype(),
+                      'Type': StringDtype(),
+                      'Raw file': StringDtype(),
                       'MS/MS m/z': Float64Dtype(),
+                      'Charge': Int64Dtype(),
                       'm/z': Float64Dtype(),
                       'Mass': Float64Dtype(),
                       'Uncalibrated - Calibrated m/z [ppm]': Float64Dtype(),
@@ -126,16 +143,16 @@ mq_evidence_dtypes = {'Length': Int64Dtype(),
                       'Calibrated retention time start': Float64Dtype(),
                       'Calibrated retention time finish': Float64Dtype(),
                       'Retention time calibration': Float64Dtype(),
-                      'Match time difference': Int64Dtype(),
-                      'Match m/z difference': Int64Dtype(),
-                      'Match q-value': Int64Dtype(),
-                      'Match score': Int64Dtype(),
+                      'Match time difference': Float64Dtype(),
+                      'Match m/z difference': Float64Dtype(),
+                      'Match q-value': Float64Dtype(),
+                      'Match score': Float64Dtype(),
                       'Number of data points': Int64Dtype(),
                       'Number of scans': Int64Dtype(),
                       'Number of isotopic peaks': Int64Dtype(),
-                      'PIF': Int64Dtype(),
-                      'Fraction of total spectrum': Int64Dtype(),
-                      'Base peak fraction': Int64Dtype(),
+                      'PIF': Float64Dtype(),
+                      'Fraction of total spectrum': Float64Dtype(),
+                      'Base peak fraction': Float64Dtype(),
                       'PEP': Float64Dtype(),
                       'MS/MS count': Int64Dtype(),
                       'MS/MS scan number': Int64Dtype(),
@@ -143,16 +160,16 @@ mq_evidence_dtypes = {'Length': Int64Dtype(),
                       'Delta score': Float64Dtype(),
                       'Combinatorics': Int64Dtype(),
                       'Intensity': Int64Dtype(),
-                      'Reverse': Int64Dtype(),
-                      'Potential contaminant': Int64Dtype(),
+                      'Reverse': StringDtype(),
+                      'Potential contaminant': StringDtype(),
                       'id': Int64Dtype(),
-                      'Protein group IDs': StringDtype,
+                      'Protein group IDs': StringDtype(),
                       'Peptide ID': Int64Dtype(),
                       'Mod. peptide ID': Int64Dtype(),
-                      'MS/MS IDs': StringDtype,
+                      'MS/MS IDs': StringDtype(),
                       'Best MS/MS': Int64Dtype(),
-                      'Oxidation (M) site IDs': StringDtype,
-                      'Taxonomy IDs': StringDtype,
+                      'Oxidation (M) site IDs': StringDtype(),
+                      'Taxonomy IDs': StringDtype(),
                       }
 
 
@@ -194,6 +211,73 @@ mq_protein_groups_cols = {'Protein_IDs': 'Protein IDs',
 
 mq_protein_groups_cols = omegaconf.OmegaConf.create(mq_protein_groups_cols)
 
+# known dtypes of MaxQuant tables for typed loading
+MQ_DTYPES = {'evidence': mq_evidence_dtypes,
+             'peptides': hela_data.file_utils.types_peptides,
+             'proteinGroups': hela_data.file_utils.dtypes_proteins}
+
+# columns with few unique values compared to the number of rows
+CATEGORICAL_COLUMNS = [mq_col.PROTEINS, mq_col.GENE_NAMES, 'Raw file']
+
+
+def get_dtypes(file: str, columns: Iterable[str]) -> dict:
+    """Get dtypes to parse selected columns of a MaxQuant table.
+
+    Columns in `CATEGORICAL_COLUMNS` are parsed as categories, integer columns as
+    nullable integers as MaxQuant leaves some entries empty. Columns without a
+    known dtype are inferred by the parser.
+
+    Parameters
+    ----------
+    file : str
+        Key of MaxQuant table, e.g. 'evidence'.
+    columns : Iterable[str]
+        Columns to parse.
+
+    Returns
+    -------
+    dict
+        Mapping of column names to dtypes.
+    """
+    known_dtypes = MQ_DTYPES.get(file, {})
+    dtypes = {}
+    for col in columns:
+        if col in CATEGORICAL_COLUMNS:
+            dtypes[col] = 'category'
+            continue
+        dtype = known_dtypes.get(col)
+        if dtype is None:
+            continue
+        if is_integer_dtype(dtype) and not is_extension_array_dtype(dtype):
+            dtype = Int64Dtype()
+        dtypes[col] = dtype
+    return dtypes
+
+
+# columns flagging rows with '+' which are removed from quantified data
+FLAG_COLUMNS = ['Reverse', 'Potential contaminant']
+
+
+def get_selection_mask(df: pd.DataFrame) -> pd.Series:
+    """Mask of rows which are neither flagged as reverse hit or potential contaminant
+    nor have a missing or zero intensity. Only columns present in `df` are checked.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        MaxQuant table, e.g. evidence.txt or peptides.txt.
+
+    Returns
+    -------
+    pd.Series
+        Boolean mask of rows to keep.
+    """
+    flag_columns = [col for col in FLAG_COLUMNS if col in df.columns]
+    mask = ~df[flag_columns].notna().any(axis=1)
+    if mq_col.INTENSITY in df.columns:
+        mask &= df[mq_col.INTENSITY].notna() & (df[mq_col.INTENSITY] != 0)
+    return mask.astype(bool)
+
 ##########################################################################################
 ##########################################################################################
 # import abc # abc.ABCMeta ?
@@ -205,7 +289,16 @@ class MaxQuantOutput():
     Parameters
     ----------
     folder: pathlib.Path, str
-        Path to Maxquant `txt` output folder.
+        Path to Maxquant `txt` output folder or to a zip archive of it. Tables in
+        a zip archive are read from the archive members without extracting them.
+    cache: bool, pathlib.Path, str
+        Cache parsed tables as Parquet files. If True, the cache is stored next to the
+        text files (or the zip archive), if a path is given it is used as cache root folder.
+        A cached table is re-used as long as the size and modification time of the text
+        file are unchanged. By default False.
+    catalog: hela_data.io.catalog.FolderCatalog, optional
+        Catalog to look up the files of `folder` instead of searching the folder. Folders
+        not in the catalog are searched. By default None.
 
 
     Attributes
@@ -231,18 +324,30 @@ class MaxQuantOutput():
                      'proteinGroups': 'proteinGroups.txt',
                      'summary': 'summary.txt'}
 
-    def __init__(self, folder):
+    def __init__(self, folder, cache: Union[bool, str, Path] = False, catalog=None):
         self.folder = Path(folder)
+        self.cache = cache
+        self.catalog = catalog
+        self.is_zip = self.folder.suffix == '.zip'
         self.files = self.get_files()
 
     def get_files(self):
-        """Get all txt files in output folder
+        """Get all txt files in output folder. For a zip archive the files are
+        listed from its central directory, for a folder in `catalog` from the catalog.
 
         Attributes
         ---------
         paths: NamedTuple
         """
-        self.paths = hela_data.io.search_files(path=self.folder, query='.txt')
+        if self.is_zip:
+            with zipfile.ZipFile(self.folder) as z:
+                self._zip_infos = {info.filename: info for info in z.infolist()
+                                   if not info.is_dir() and '.txt' in PurePosixPath(info.filename).name}
+            self.paths = hela_data.io.PathsList(files=list(self._zip_infos), folder=self.folder)
+        elif self.catalog is not None and self.folder in self.catalog:
+            self.paths = self.catalog.get_files(self.folder, query='.txt')
+        else:
+            self.paths = hela_data.io.search_files(path=self.folder, query='.txt')
         return self.paths.files
 
     @classmethod
@@ -255,21 +360,195 @@ class MaxQuantOutput():
         return fct
 
     def find_attribute(self, filename):
-        """Look up or load attribute."""
+        """Look up or load attribute. A loaded table is kept on the instance, so
+        successive lookups return the same table, see `load`."""
         if not hasattr(self, filename):
             df = self.load(filename[1:])
             setattr(self, filename, df)
         return getattr(self, filename)
 
-    def load(self, file):
-        """Load a specified file into memory and return it.
-        Can be used """
-        filepath = self.folder / self.NAME_FILE_MAP[file]
-        if not Path(filepath).exists():
+    def get_filepath(self, file):
+        """Get filepath of a specified file key."""
+        fname = self.NAME_FILE_MAP[file]
+        if self.is_zip:
+            # use the least nested archive member with matching file name
+            members = sorted((member for member in self._zip_infos
+                              if PurePosixPath(member).name == fname),
+                             key=lambda member: member.count('/'))
+            if members:
+                fname = members[0]
+        return self.folder / fname
+
+    def _get_member(self, filepath) -> str:
+        """Name of zip archive member for a filepath."""
+        return PurePosixPath(Path(filepath).relative_to(self.folder)).as_posix()
+
+    def _check_exists(self, file, filepath):
+        if self.is_zip:
+            exists = self._get_member(filepath) in self._zip_infos
+        else:
+            exists = Path(filepath).exists()
+        if not exists:
             raise FileNotFoundError(
                 f"No such file: {file}.txt: Choose one of the following {', '.join(self.files)}")
 
-        return pd.read_table(filepath, index_col=0)
+    @contextlib.contextmanager
+    def _open(self, filepath):
+        """Open file in folder or zip archive for parsing."""
+        if not self.is_zip:
+            yield filepath
+            return
+        with zipfile.ZipFile(self.folder) as z:
+            with z.open(self._get_member(filepath)) as f:
+                yield f
+
+    def _read_table(self, filepath, **kwargs) -> pd.DataFrame:
+        with self._open(filepath) as f:
+            return hela_data.io.parsers.read_table(f, **kwargs)
+
+    def load(self, file, columns: Iterable[str] = None):
+        """Load a specified file into memory and return it. In contrast to the
+        attribute lookup (e.g. `mq_output.peptides`) the table is not kept on the instance.
+        Tables are looked up in the process-wide table cache
+        `hela_data.io.cache.TABLE_CACHE` first (if enabled), which is shared between
+        instances. A copy of the cached table is returned.
+        Uses a cached version of the table on disk if `cache` is set.
+
+        Parameters
+        ----------
+        file : str
+            Key of file, e.g. 'evidence'.
+        columns : Iterable[str], optional
+            Only load the selected columns using the known dtypes of the table, see
+            `get_dtypes`. The first column of the table is always used as index.
+            By default None, i.e. all columns with inferred dtypes.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Loaded table.
+        """
+        filepath = self.get_filepath(file)
+        self._check_exists(file, filepath)
+        if columns is not None:
+            columns = tuple(dict.fromkeys(columns))
+
+        # changed source files are not looked up
+        key = (str(Path(filepath).absolute()),
+               columns,
+               json.dumps(self._get_source_stats(filepath), sort_keys=True))
+        df = hela_data.io.cache.TABLE_CACHE.get(key)
+        if df is None:
+            df = self._load(file, filepath, columns)
+            hela_data.io.cache.TABLE_CACHE.put(key, df)
+        return df
+
+    def _load(self, file, filepath, columns):
+        if columns is not None:
+            return self._load_columns(file, filepath, columns)
+
+        if not self.cache:
+            return self._read_table(filepath, index_col=0)
+
+        fpath_cache, source_stats = self._get_cache_info(filepath)
+        df = hela_data.io.cache.read_cached_table(fpath_cache, source_stats)
+        if df is None:
+            df = self._read_table(filepath, index_col=0)
+            hela_data.io.cache.write_cached_table(df, fpath_cache, source_stats)
+        return df
+
+    def _get_source_stats(self, filepath) -> dict:
+        if not self.is_zip:
+            return hela_data.io.cache.get_source_stats(filepath)
+        info = self._zip_infos[self._get_member(filepath)]
+        return {'size': info.file_size,
+                'crc': info.CRC,
+                'date_time': list(info.date_time)}
+
+    def _get_cache_info(self, filepath):
+        cache_root = None if self.cache is True else self.cache
+        if not self.is_zip:
+            fpath_cache = hela_data.io.cache.get_cache_fpath(filepath, cache_root=cache_root)
+            return fpath_cache, self._get_source_stats(filepath)
+        # cache of archive members is stored in a folder named after the archive
+        if cache_root is None:
+            cache_root = self.folder.parent / hela_data.io.cache.CACHE_FOLDER_NAME
+        fpath_cache = hela_data.io.cache.get_cache_fpath(
+            self.folder.with_suffix('') / Path(filepath).name, cache_root=cache_root)
+        return fpath_cache, self._get_source_stats(filepath)
+
+    def _load_columns(self, file, filepath, columns):
+        """Load selected columns with known dtypes."""
+        columns = list(dict.fromkeys(columns))
+        if self.cache:
+            fpath_cache, source_stats = self._get_cache_info(filepath)
+            df = hela_data.io.cache.read_cached_table(fpath_cache, source_stats, columns=columns)
+            if df is not None:
+                columns = [col for col in columns if col != df.index.name]
+                return df[columns].astype(get_dtypes(file, columns))
+
+        index_col = self._read_table(filepath, nrows=0).columns[0]
+        columns = [col for col in columns if col != index_col]
+        return self._read_table(filepath,
+                                usecols=[index_col, *columns],
+                                index_col=index_col,
+                                dtype=get_dtypes(file, columns),
+                                low_memory=False)[columns]
+
+    def iter_table(self,
+                   file: str,
+                   chunksize: int = 100_000,
+                   columns: Iterable[str] = None,
+                   predicate: Callable[[pd.DataFrame], pd.Series] = None,
+                   select: bool = True) -> Iterator[pd.DataFrame]:
+        """Iterate over chunks of a table, e.g. of evidence.txt or allPeptides.txt,
+        to process large tables in bounded memory.
+
+        Parameters
+        ----------
+        file : str
+            Key of file, e.g. 'evidence'.
+        chunksize : int, optional
+            Number of rows parsed per chunk, by default 100_000
+        columns : Iterable[str], optional
+            Columns to return using the known dtypes of the table, see `get_dtypes`. The
+            first column of the table is used as index. By default None, i.e. all columns.
+        predicate : Callable[[pd.DataFrame], pd.Series], optional
+            Function returning a boolean mask of rows to keep for a chunk, by default None
+        select : bool, optional
+            Remove reverse hits, potential contaminants and rows without intensity,
+            see `get_selection_mask`. By default True.
+
+        Yields
+        ------
+        pd.DataFrame
+            Filtered chunk of the table. Categories of categorical columns are
+            specific to each chunk.
+        """
+        filepath = self.get_filepath(file)
+        self._check_exists(file, filepath)
+
+        header = self._read_table(filepath, nrows=0).columns
+        index_col = header[0]
+        if columns is None:
+            columns = header[1:]
+        columns = [col for col in dict.fromkeys(columns) if col != index_col]
+        usecols = list(columns)
+        if select:
+            usecols += [col for col in [*FLAG_COLUMNS, mq_col.INTENSITY]
+                        if col in header and col not in usecols]
+
+        with self._open(filepath) as f, pd.read_table(f,
+                                                      usecols=[index_col, *usecols],
+                                                      index_col=index_col,
+                                                      dtype=get_dtypes(file, usecols),
+                                                      chunksize=chunksize) as reader:
+            for chunk in reader:
+                if select:
+                    chunk = chunk.loc[get_selection_mask(chunk)]
+                if predicate is not None:
+                    chunk = chunk.loc[predicate(chunk)]
+                yield chunk[columns]
 
     # def dump_training_data(self, )
 
@@ -278,6 +557,8 @@ class MaxQuantOutput():
         return [x for x in dir(self) if not x.startswith('__')]
 
     def __repr__(self):
+        if self.cache:
+            return f'{self.__class__.__name__}({self.folder!r}, cache={self.cache!r})'
         return f'{self.__class__.__name__}({self.folder!r})'
 
     def dump_intensity(self, folder='.'):
@@ -308,7 +589,11 @@ class MaxQuantOutputDynamic(MaxQuantOutput):
     Parameters
     ----------
     folder: pathlib.Path, str
-        Path to Maxquant `txt` output folder.
+        Path to Maxquant `txt` output folder or to a zip archive of it.
+    cache: bool, pathlib.Path, str
+        Cache parsed tables as Parquet files, see `MaxQuantOutput`. By default False.
+    catalog: hela_data.io.catalog.FolderCatalog, optional
+        Catalog to look up the files of `folder`, see `MaxQuantOutput`. By default None.
 
     Attributes
     ---------
@@ -322,8 +607,8 @@ class MaxQuantOutputDynamic(MaxQuantOutput):
         Initial set of non-magic attributes
     """
 
-    def __init__(self, folder):
-        super().__init__(folder)
+    def __init__(self, folder, cache: Union[bool, str, Path] = False, catalog=None):
+        super().__init__(folder, cache=cache, catalog=catalog)
 
         # patch properties at instance creation?
         self.name_file_map = {}
@@ -334,6 +619,12 @@ class MaxQuantOutputDynamic(MaxQuantOutput):
             self.name_file_map[file_key] = file
         self.file_keys = list(self.name_file_map)
 
+    def get_filepath(self, file):
+        """Get filepath of a specified file key of the files found on disk."""
+        if file in self.name_file_map:
+            return self.folder / self.name_file_map[file]
+        return super().get_filepath(file)
+
     def __getattr__(self, filename):
         if filename in self.name_file_map:
             df = self.load(filename)
@@ -403,22 +694,68 @@ def get_peptides_with_single_gene(peptides, keep_columns=COLS_, gene_column=mq_c
             len(peptides) - len(peptides_with_single_gene),
             len(peptides)
         ))
-    peptides_with_single_gene[gene_column] = peptides_with_single_gene[gene_column].str.split(
-        ';')
-    peptides_with_single_gene = peptides_with_single_gene.explode(
-        column=gene_column)
+    rows, genes = explode_gene_sets(peptides_with_single_gene[gene_column])
+    peptides_with_single_gene = peptides_with_single_gene.iloc[rows].copy()
+    peptides_with_single_gene[gene_column] = genes
     return peptides_with_single_gene
 
 
+def _split_gene_sets(gene_sets: Iterable[str], sep: str = ';') -> tuple:
+    """Split each unique gene set only once.
+
+    Returns
+    -------
+    tuple
+        codes of gene sets per entry (-1 for missing and non-string entries),
+        concatenated genes of all unique gene sets and the offsets of the
+        genes of each gene set, i.e. genes of set k are in `genes[offsets[k]:offsets[k+1]]`
+    """
+    codes, uniques = pd.factorize(pd.Series(gene_sets))
+    split = pd.Series(uniques).str.split(sep)
+    is_str = split.notna().to_numpy()
+    valid = codes >= 0
+    valid[valid] = is_str[codes[valid]]
+    codes = np.where(valid, codes, -1)
+    n_per_set = split.str.len().fillna(0).to_numpy(dtype=np.int64)
+    genes = split[is_str].explode().to_numpy(dtype=object)
+    offsets = np.concatenate([[0], np.cumsum(n_per_set)])
+    return codes, genes, offsets
+
+
+def explode_gene_sets(gene_sets: Iterable[str], sep: str = ';') -> tuple:
+    """Vectorized version of `pd.Series(gene_sets).str.split(sep).explode()`.
+
+    Parameters
+    ----------
+    gene_sets : Iterable[str]
+        Iterable of gene sets which entries are separated with `sep`
+    sep : str, optional
+        Seperator of gene sets, by default ';'
+
+    Returns
+    -------
+    tuple
+        Positions of entries in `gene_sets` (repeated for each gene in a set)
+        and the single genes. Missing entries are kept as NaN.
+    """
+    codes, genes, offsets = _split_gene_sets(gene_sets, sep=sep)
+    valid = codes >= 0
+    repeats = np.ones(len(codes), dtype=np.int64)
+    repeats[valid] = np.diff(offsets)[codes[valid]]
+    rows = np.repeat(np.arange(len(codes)), repeats)
+    starts = np.repeat(offsets[np.where(valid, codes, 0)], repeats)
+    # position of gene in its set
+    pos = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    is_valid = np.repeat(valid, repeats)
+    exploded = np.full(len(rows), np.nan, dtype=object)
+    exploded[is_valid] = genes[(starts + pos)[is_valid]]
+    return rows, exploded
+
+
 def get_set_of_genes(iterable, sep_in_str: str = ';'):
     "Return the set of unique strings for an Iterable of strings (gene names)."
-    genes_single_unique = set()
-    for gene_iterable in pd.Series(iterable).str.split(sep_in_str):
-        try:
-            genes_single_unique.update(gene_iterable)
-        except TypeError:
-            pass
-    return genes_single_unique
+    _, genes, _ = _split_gene_sets(iterable, sep=sep_in_str)
+    return set(genes)
 
 
 def validate_gene_set(n_gene_single_unique, n_gene_sets):
@@ -461,16 +798,46 @@ def count_genes_in_sets(gene_sets, sep=';'):
     collections.Counter
         Counter with keys as genes and counts as value.
     """
-    genes_counted_each_in_unique_sets = Counter()
+    codes, genes, offsets = _split_gene_sets(gene_sets, sep=sep)
+    n_sets = len(offsets) - 1
+    # count gene sets, then add counts of sets to their genes
+    counts_sets = np.bincount(codes[codes >= 0], minlength=n_sets)
+    gene_codes, genes_unique = pd.factorize(genes)
+    counts = np.bincount(gene_codes,
+                         weights=np.repeat(counts_sets, np.diff(offsets)),
+                         minlength=len(genes_unique))
+    return Counter({gene: int(count) for gene, count in zip(genes_unique, counts) if count})
 
-    for gene in pd.Series(gene_sets).dropna():
-        try:
-            gene_iterable = gene.split(sep)
-            genes_counted_each_in_unique_sets.update(gene_iterable)
-        except TypeError:
-            print(f"Error on: {gene}")
 
-    return genes_counted_each_in_unique_sets
+GeneIncidence = namedtuple('GeneIncidence', ['matrix', 'index', 'genes'])
+
+
+def get_gene_incidence(gene_sets: Union[pd.Series, Iterable[str]], sep: str = ';') -> GeneIncidence:
+    """Sparse incidence matrix of entries (e.g. peptides) and single genes.
+
+    Parameters
+    ----------
+    gene_sets : Union[pd.Series, Iterable[str]]
+        Gene sets which entries are separated with `sep`, e.g. the gene names
+        column of peptides.txt
+    sep : str, optional
+        Seperator of gene sets, by default ';'
+
+    Returns
+    -------
+    GeneIncidence
+        Sparse matrix in CSR format of shape (entries, genes) with the number of times
+        a gene is in the set of an entry, the index of `gene_sets` and the genes.
+        The column sums are the counts of `count_genes_in_sets`.
+    """
+    gene_sets = pd.Series(gene_sets)
+    rows, genes = explode_gene_sets(gene_sets, sep=sep)
+    gene_codes, genes_unique = pd.factorize(genes)
+    mask = gene_codes >= 0
+    matrix = scipy.sparse.csr_matrix(
+        (np.ones(mask.sum(), dtype=np.int32), (rows[mask], gene_codes[mask])),
+        shape=(len(gene_sets), len(genes_unique)))
+    return GeneIncidence(matrix=matrix, index=gene_sets.index, genes=pd.Index(genes_unique))
 
 
 def get_identifier_from_column(df: pd.DataFrame, identifier_col: str):
@@ -596,6 +963,72 @@ def find_exact_cleaved_peptides_for_razor_protein(gene_data, fasta_db, gene_id:
     return peps_exact_cleaved
 
 
+class PeptideMatcher():
+    """Index of observed peptides to find exact peptides contained in any of them.
+
+    The observed peptides of a run are compiled once into a single separated string.
+    Each lookup is then one (C-level) substring search, which can be restricted to a
+    consecutive range of the observed peptides, e.g. the peptides of one gene.
+
+    This is not a single-pass multi-pattern (Aho-Corasick) matcher: `completeness`
+    still loops over the exact peptides in Python, one `str.find` per peptide. For
+    gene-sized ranges this is faster than a pure-Python automaton, which has to step
+    through the text character by character (about 0.1 s vs. 14 s for a simulated
+    run of 4,000 genes). Compared to the previous double loop it is about 7x faster,
+    see `project/misc_benchmark_completeness`.
+
+    Parameters
+    ----------
+    peps_in_data : Iterable[str]
+        Peptides found during a run / in a sample.
+    """
+    sep = '\n'
+
+    def __init__(self, peps_in_data: Iterable[str]):
+        self.peptides = list(peps_in_data)
+        if any(self.sep in pep for pep in self.peptides):
+            raise ValueError(f"Peptides must not contain the separator: {self.sep!r}")
+        self._text = self.sep.join(self.peptides) + self.sep
+        # start of each peptide in text, last entry is the length of the text
+        self._offsets = [0]
+        for pep in self.peptides:
+            self._offsets.append(self._offsets[-1] + len(pep) + len(self.sep))
+
+    def is_contained(self, pep: str, start: int = 0, stop: int = None) -> bool:
+        """Check if `pep` is contained in any of the observed peptides `start:stop`."""
+        start, stop, _ = slice(start, stop).indices(len(self.peptides))
+        if start >= stop:
+            return False
+        return self._text.find(pep, self._offsets[start], self._offsets[stop] - len(self.sep)) != -1
+
+    def completeness(self,
+                     peps_exact_cleaved: Iterable[str],
+                     start: int = 0,
+                     stop: int = None) -> float:
+        """Calculate completeness for set of exact peptides, see
+        `calculate_completness_for_sample`. Only the observed peptides
+        `start:stop` are considered."""
+        if not peps_exact_cleaved:
+            return 0  # no exact peptides
+        start, stop, _ = slice(start, stop).indices(len(self.peptides))
+        n_in_data = max(stop - start, 0)
+        c = 0
+        if n_in_data:
+            find, lo, hi = self._text.find, self._offsets[start], self._offsets[stop] - len(self.sep)
+            for _pep in peps_exact_cleaved:
+                if find(_pep, lo, hi) != -1:
+                    c += 1
+                    if c == n_in_data:
+                        break
+        return c / len(peps_exact_cleaved)
+
+    def __len__(self):
+        return len(self.peptides)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(n_peptides={len(self)})"
+
+
 def calculate_completness_for_sample(
         peps_exact_cleaved: Iterable[str],
         peps_in_data: Iterable[str]):
@@ -612,75 +1045,197 @@ def calculate_completness_for_sample(
     Returns
     -------
     float
-        proportion of exact peptides for which some evidence was found.
+        proportion of exact peptides for which some evidence was found. The count
+        of exact peptides found is capped at the number of peptides in the data.
+    """
+    return PeptideMatcher(peps_in_data).completeness(peps_exact_cleaved)
+
+
+SAMPLE_ID = 'Sample ID'
+GENE_DATASET_ROW_GROUP_SIZE = 2_000
+# all partitions share this schema, also empty ones (no column types to infer)
+GENE_DATASET_SCHEMA = pa.schema([(mq_col.SEQUENCE, pa.string()),
+                                 (mq_col.INTENSITY, pa.int64()),
+                                 *((col, pa.string()) for col in dict.fromkeys(
+                                     [mq_col.LEADING_RAZOR_PROTEIN, *FASTA_KEYS, mq_col.GENE_NAMES])),
+                                 (SAMPLE_ID, pa.string())])
+
+
+def write_gene_dataset(data: pd.DataFrame,
+                       out_folder: Union[str, Path],
+                       name: str,
+                       row_group_size: int = GENE_DATASET_ROW_GROUP_SIZE) -> Path:
+    """Write peptides of genes of one or a batch of samples as one file (partition)
+    of a Parquet dataset. Rows are sorted by gene, so the row group statistics allow
+    to skip row groups of other genes when reading a single gene, see `read_gene_dataset`.
+    Partitions are written with `GENE_DATASET_SCHEMA`, so that partitions without
+    any selected gene can be read together with the others.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Peptides in long format with peptide sequences as index and the columns of
+        `GENE_DATASET_SCHEMA`, i.e. `mq_col.GENE_NAMES` (a single gene) and `SAMPLE_ID`.
+        Further columns are not written.
+    out_folder : Union[str, Path]
+        Folder of Parquet dataset.
+    name : str
+        Name of partition, e.g. the sample or batch name.
+    row_group_size : int, optional
+        Maximum number of rows per row group, by default GENE_DATASET_ROW_GROUP_SIZE
+
+    Returns
+    -------
+    Path
+        Filepath of written partition.
+    """
+    out_folder = Path(out_folder)
+    out_folder.mkdir(exist_ok=True, parents=True)
+    fname = out_folder / f'{name}.parquet'
+    data = data.reset_index().sort_values(
+        [mq_col.GENE_NAMES, SAMPLE_ID], kind='stable', ignore_index=True)
+    pq.write_table(pa.Table.from_pandas(data, schema=GENE_DATASET_SCHEMA, preserve_index=False), fname,
+                   row_group_size=row_group_size)
+    logger.info(f"Dumped {data[mq_col.GENE_NAMES].nunique():,d} genes to: {fname}")
+    return fname
+
+
+def read_gene_dataset(folder: Union[str, Path],
+                      gene: str = None,
+                      columns: Iterable[str] = None) -> pd.DataFrame:
+    """Read peptides of a gene across all samples from a Parquet dataset, see
+    `write_gene_dataset`. The gene is selected using predicate pushdown.
+
+    Parameters
+    ----------
+    folder : Union[str, Path]
+        Folder of Parquet dataset.
+    gene : str, optional
+        Gene to select, by default None, i.e. all genes are read.
+    columns : Iterable[str], optional
+        Columns to read, by default None, i.e. all columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        Peptides of gene with sequences as index.
     """
-    c = 0
-    if not peps_exact_cleaved:
-        return 0  # no exact peptides
-    for i, _pep in enumerate(peps_exact_cleaved):
-        logger.debug(f"Check if exact peptide matches: {_pep}")
-        for _found_pep in peps_in_data:
-            logger.debug(f"Check for peptide: {_found_pep}")
-            if _pep in _found_pep:
-                c += 1
-                break
-        if c == len(peps_in_data):
-            logger.debug(f"Last checked peptides in position {i:2}: {_pep}")
-            logger.debug(
-                f"Searched therfore {i+1:2} out of {len(peps_exact_cleaved)} peptides, "
-                f"i.e. a share of {(i+1)/len(peps_exact_cleaved):.3f}")
-            break
-    return c / len(peps_exact_cleaved)
+    # partitions written without a fixed schema might have null-typed columns
+    dataset = ds.dataset(folder, format='parquet', schema=GENE_DATASET_SCHEMA)
+    if columns is not None:
+        columns = list(dict.fromkeys([mq_col.SEQUENCE, *columns]))
+    _filter = ds.field(mq_col.GENE_NAMES) == gene if gene is not None else None
+    df = dataset.to_table(columns=columns, filter=_filter).to_pandas()
+    return df.set_index(mq_col.SEQUENCE)
 
 
 class ExtractFromPeptidesTxt():
     """Strategy to extract Intensity measurements from MaxQuant txt output peptides.txt.
     Creates dump of Training Data.
+
+    Parameters
+    ----------
+    out_folder : Union[str, Path]
+        Output folder.
+    mq_output_object : MaxQuantOutput
+        MaxQuant output of a sample.
+    fasta_db : dict
+        Fasta database with exactly cleaved peptides of proteins.
+    out_format : str, optional
+        'json' dumps one file per selected gene into a folder per sample. 'parquet'
+        writes all selected genes of the sample as one partition to the Parquet dataset
+        `out_folder`, see `write_gene_dataset`. By default 'json'.
     """
+    out_formats = ('json', 'parquet')
 
     def __init__(self,
                  out_folder,
                  mq_output_object: MaxQuantOutput,
                  # Could be made a certain type -> ensure schema is met.
-                 fasta_db: dict
+                 fasta_db: dict,
+                 out_format: str = 'json'
                  ):
         # # ToDo: make this check work
         assert isinstance(mq_output_object, MaxQuantOutput)
+        if out_format not in self.out_formats:
+            raise ValueError(f"Unknown out_format {out_format!r}, choose one of {self.out_formats}")
         self._mq_output = mq_output_object
-        self.out_folder = Path(out_folder) / mq_output_object.folder.stem
+        self.out_format = out_format
+        if out_format == 'json':
+            self.out_folder = Path(out_folder) / mq_output_object.folder.stem
+        else:
+            self.out_folder = Path(out_folder)
         self.out_folder.mkdir(exist_ok=True, parents=True)
         self.fname_template = '{gene}.json'
         self.fasta_db = fasta_db
 
-    def __call__(self):
-        """Dump valid cases to file.
+    def extract(self, min_completeness: float = .6) -> tuple:
+        """Calculate completeness of genes and select genes with a sufficient completeness.
 
-        Returns:
-        collections.Counter
-            Counter with gene IDs as key and completeness as value.
+        Parameters
+        ----------
+        min_completeness : float, optional
+            Minimum completeness of selected genes, by default .6
+
+        Returns
+        -------
+        tuple
+            Dictionary with gene IDs as key and completeness as value, and
+            peptides of selected genes with `SAMPLE_ID` column in long format
+            (e.g. to be written in batches using `write_gene_dataset`).
         """
-        _counter = 0
         _genes = dict()
+        _selected = []
         peptides_with_single_gene = get_peptides_with_single_gene(
             peptides=self._mq_output.peptides)
-        for gene_names, data_gene in peptides_with_single_gene.groupby(mq_col.GENE_NAMES):
+        groups = list(peptides_with_single_gene.groupby(mq_col.GENE_NAMES))
+        # compile observed peptides of run once, ordered by gene
+        matcher = PeptideMatcher(pep for _, data_gene in groups for pep in data_gene.index)
+        start = 0
+        for gene_names, data_gene in groups:
             data_gene.columns.name = gene_names  # ToDo: Find better solution
             peps_exact_cleaved = find_exact_cleaved_peptides_for_razor_protein(
                 data_gene, fasta_db=self.fasta_db)
-            c = calculate_completness_for_sample(peps_exact_cleaved=peps_exact_cleaved,
-                                                 peps_in_data=data_gene.index)
+            stop = start + len(data_gene)
+            c = matcher.completeness(peps_exact_cleaved, start=start, stop=stop)
+            start = stop
             assert gene_names not in _genes
             _genes[gene_names] = c
             # ToDo check completeness for each shared protein in list
-            if c >= .6:
+            if c >= min_completeness:
+                _selected.append(data_gene)
+        if _selected:
+            data = pd.concat(_selected)
+        else:
+            data = peptides_with_single_gene.iloc[:0]
+        data = data.assign(**{SAMPLE_ID: self._mq_output.folder.stem})
+        data.columns.name = None
+        return _genes, data
+
+    def __call__(self):
+        """Dump valid cases to file.
+
+        Returns:
+        collections.Counter
+            Counter with gene IDs as key and completeness as value.
+        """
+        _genes, data = self.extract()
+        sample = self._mq_output.folder.stem
+        if self.out_format == 'parquet':
+            write_gene_dataset(data, self.out_folder, name=sample)
+            # files starting with an underscore are ignored in Parquet datasets
+            fname = self.out_folder / f'_{sample}_completeness_all_genes.json'
+        else:
+            for gene_names, data_gene in data.groupby(mq_col.GENE_NAMES, sort=False):
+                data_gene = data_gene.drop(columns=SAMPLE_ID)
+                data_gene.columns.name = gene_names
                 fname = self.out_folder / \
                     self.fname_template.format(gene=gene_names)
                 with open(fname, 'w') as f:
                     data_gene.to_json(f)
-                _counter += 1
+            fname = self.out_folder / '0_completeness_all_genes.json'
         logger.info(
-            f'Dumped {_counter} genes from {self._mq_output.folder.stem}')
-        fname = self.out_folder / '0_completeness_all_genes.json'
+            f'Dumped {data[mq_col.GENE_NAMES].nunique()} genes from {sample}')
         hela_data.io.dump_json(_genes, fname)
         logger.info(f'Dumped files to: {str(self.out_folder)}')
         return _genes
@@ -689,6 +1244,106 @@ class ExtractFromPeptidesTxt():
         return f"{self.__class__.__name__}(out_folder={self.out_folder}, mq_output_object={repr(self._mq_output)}, fasta_db)"
 
 
+# fasta database shared read-only by worker processes of `extract_from_folders`
+_FASTA_DB = None
+
+ExtractionResults = namedtuple('ExtractionResults', ['completeness', 'report'])
+
+
+def _init_extract_worker(fasta_db: Union[dict, str, Path]):
+    global _FASTA_DB
+    if not isinstance(fasta_db, dict):
+        fasta_db = hela_data.io.load_json(fasta_db)
+    _FASTA_DB = fasta_db
+
+
+def _extract_folder(args) -> tuple:
+    folder, out_folder, out_format = args
+    start = time.perf_counter()
+    try:
+        mq_output = MaxQuantOutput(folder)
+        completeness = ExtractFromPeptidesTxt(out_folder=out_folder,
+                                              mq_output_object=mq_output,
+                                              fasta_db=_FASTA_DB,
+                                              out_format=out_format)()
+        error = None
+    except Exception as e:
+        completeness, error = None, f"{type(e).__name__}: {e}"
+    return Path(folder).stem, completeness, time.perf_counter() - start, error
+
+
+def extract_from_folders(folders: Iterable[Union[str, Path]],
+                         out_folder: Union[str, Path],
+                         fasta_db: Union[dict, str, Path],
+                         n_workers: int = 1,
+                         out_format: str = 'json') -> ExtractionResults:
+    """Run `ExtractFromPeptidesTxt` for several MaxQuant output folders in parallel.
+
+    The fasta database is loaded once and shared read-only with the worker processes:
+    Using the 'fork' start method the workers inherit it from the main process (copy-on-write),
+    otherwise it is passed (or loaded from file) once per worker, not per folder.
+
+    Parameters
+    ----------
+    folders : Iterable[Union[str, Path]]
+        MaxQuant output folders.
+    out_folder : Union[str, Path]
+        Output folder, see `ExtractFromPeptidesTxt`.
+    fasta_db : Union[dict, str, Path]
+        Fasta database or path to its json dump.
+    n_workers : int, optional
+        Number of processes, by default 1, i.e. the folders are processed
+        in the main process.
+    out_format : str, optional
+        Output format, see `ExtractFromPeptidesTxt`, by default 'json'
+
+    Returns
+    -------
+    ExtractionResults
+        Completeness of genes (rows) in samples (columns) and a report with the
+        processing time and error (if any) per sample.
+    """
+    global _FASTA_DB
+    folders = list(folders)
+    tasks = [(folder, out_folder, out_format) for folder in folders]
+    try:
+        if n_workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            _init_extract_worker(fasta_db)
+            # avoid copying shared objects in workers on garbage collection
+            gc.freeze()
+            with multiprocessing.get_context('fork').Pool(n_workers) as p:
+                results = list(tqdm(p.imap_unordered(_extract_folder, tasks),
+                                    total=len(tasks), desc='Extract from folders'))
+        elif n_workers > 1:
+            with multiprocessing.Pool(n_workers, initializer=_init_extract_worker,
+                                      initargs=(fasta_db,)) as p:
+                results = list(tqdm(p.imap_unordered(_extract_folder, tasks),
+                                    total=len(tasks), desc='Extract from folders'))
+        else:
+            _init_extract_worker(fasta_db)
+            results = [_extract_folder(task) for task in tqdm(tasks, desc='Extract from folders')]
+    finally:
+        gc.unfreeze()
+        _FASTA_DB = None
+
+    completeness, report = {}, {}
+    for sample, completeness_sample, elapsed, error in results:
+        report[sample] = {'time': elapsed, 'error': error}
+        if error is not None:
+            logger.error(f"Failed to extract from {sample} ({elapsed:.2f}s): {error}")
+            continue
+        logger.info(f"Extracted {len(completeness_sample):,d} genes from {sample} in {elapsed:.2f}s")
+        completeness[sample] = completeness_sample
+    samples = [Path(folder).stem for folder in folders]
+    completeness = pd.DataFrame(completeness, columns=[sample for sample in samples if sample in completeness])
+    report = pd.DataFrame.from_dict(report, orient='index').reindex(samples)
+    report.index.name = 'Sample ID'
+    n_failed = report['error'].notna().sum()
+    if n_failed:
+        logger.warning(f"Extraction failed for {n_failed} of {len(report)} folders.")
+    return ExtractionResults(completeness=completeness, report=report)
+
+
 # so MaxQuantOutput could know which strategy to apply for which file-type?
 STRATEGIES = {'peptides.txt': '',
               'evidence.txt': ''}
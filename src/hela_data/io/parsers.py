@@ -0,0 +1,182 @@
+"""Parse engines for tab-separated MaxQuant text tables.
+
+The default 'c' engine is the single-threaded pandas parser. The 'pyarrow' engine uses
+the multithreaded CSV reader of pyarrow and converts the result to the same DataFrame
+as the pandas parser would return. Arguments not supported by the 'pyarrow' engine
+(e.g. `nrows` or `chunksize`) fall back to the 'c' engine.
+
+The engine can be selected per call or globally using `set_parse_engine`.
+"""
+import io
+import logging
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('c', 'pyarrow')
+PYARROW_KWARGS = {'usecols', 'index_col', 'dtype', 'low_memory', 'sep'}
+
+# default values of pandas parser
+TRUE_VALUES = ['True', 'TRUE', 'true']
+FALSE_VALUES = ['False', 'FALSE', 'false']
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+             '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+_parse_engine = 'c'
+
+
+def set_parse_engine(engine: str):
+    """Set default parse engine, one of `ENGINES`."""
+    global _parse_engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, choose one of {ENGINES}")
+    _parse_engine = engine
+
+
+def get_parse_engine() -> str:
+    """Get default parse engine."""
+    return _parse_engine
+
+
+def read_table(filepath_or_buffer, engine: str = None, **kwargs) -> pd.DataFrame:
+    """Read tab-separated table, see `pandas.read_table`.
+
+    Parameters
+    ----------
+    filepath_or_buffer : Union[str, Path, IO]
+        Filepath or file object of text table.
+    engine : str, optional
+        Parse engine, one of `ENGINES`, by default None, i.e. the global default
+        set by `set_parse_engine`.
+    **kwargs
+        Keyword arguments passed to `pandas.read_table`. The 'pyarrow' engine supports
+        `usecols` (list of column names), `index_col`, `dtype` and `sep`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Parsed table.
+    """
+    engine = engine or _parse_engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, choose one of {ENGINES}")
+    unsupported = set(kwargs) - PYARROW_KWARGS
+    usecols = kwargs.get('usecols')
+    if engine == 'pyarrow' and usecols is not None and (
+            callable(usecols) or not all(isinstance(col, str) for col in usecols)):
+        unsupported.add('usecols')
+    if engine == 'pyarrow' and unsupported:
+        logger.debug(f"Use 'c' engine for unsupported argument(s): {', '.join(unsupported)}")
+        engine = 'c'
+    if engine == 'c':
+        return pd.read_table(filepath_or_buffer, **kwargs)
+    if not isinstance(filepath_or_buffer, (str, Path)):
+        filepath_or_buffer = io.BytesIO(_read_bytes(filepath_or_buffer))
+    try:
+        return _read_table_pyarrow(filepath_or_buffer, **kwargs)
+    except pa.ArrowInvalid as e:
+        logger.warning(f"Use 'c' engine as pyarrow could not parse table: {e}")
+        if isinstance(filepath_or_buffer, io.BytesIO):
+            filepath_or_buffer.seek(0)
+        return pd.read_table(filepath_or_buffer, **kwargs)
+
+
+def _read_bytes(buffer) -> bytes:
+    data = buffer.read()
+    if isinstance(data, str):
+        data = data.encode()
+    return data
+
+
+def _read_header(source: Union[str, Path, io.BytesIO], sep: str) -> list:
+    if isinstance(source, io.BytesIO):
+        line = source.getvalue().split(b'\n', 1)[0].decode()
+    else:
+        with open(source, encoding='utf-8') as f:
+            line = f.readline()
+    return line.rstrip('\r\n').split(sep)
+
+
+def _get_dtype(dtype, col: str):
+    if isinstance(dtype, dict):
+        return dtype.get(col)
+    return dtype
+
+
+def _is_numpy_string_dtype(dtype) -> bool:
+    dtype = pd.api.types.pandas_dtype(dtype)
+    return isinstance(dtype, np.dtype) and dtype.kind in 'OSU'
+
+
+def _is_string_dtype(dtype) -> bool:
+    if dtype is None:
+        return False
+    return (isinstance(pd.api.types.pandas_dtype(dtype), (pd.StringDtype, pd.CategoricalDtype))
+            or _is_numpy_string_dtype(dtype))
+
+
+def _read_table_pyarrow(source: Union[str, Path, io.BytesIO],
+                        usecols=None,
+                        index_col=None,
+                        dtype=None,
+                        sep: str = '\t',
+                        low_memory: bool = True) -> pd.DataFrame:
+    header = _read_header(source, sep)
+    if usecols is not None:
+        usecols = set(usecols)
+        missing = usecols - set(header)
+        if missing:
+            raise ValueError(f"Usecols do not match columns, columns expected but not found: {sorted(missing)}")
+        header = [col for col in header if col in usecols]
+
+    # pandas keeps values of string and categorical columns as strings, e.g. '1'
+    column_types = {col: pa.string() for col in header if _is_string_dtype(_get_dtype(dtype, col))}
+
+    def read(include_columns, column_types=None):
+        if isinstance(source, io.BytesIO):
+            source.seek(0)
+        return pa.csv.read_csv(
+            source,
+            read_options=pa.csv.ReadOptions(use_threads=True),
+            parse_options=pa.csv.ParseOptions(delimiter=sep),
+            convert_options=pa.csv.ConvertOptions(include_columns=include_columns,
+                                                  column_types=column_types,
+                                                  null_values=NA_VALUES,
+                                                  strings_can_be_null=True,
+                                                  true_values=TRUE_VALUES,
+                                                  false_values=FALSE_VALUES))
+
+    table = read(header, column_types)
+    # pandas does not infer dates and times: re-read these columns as strings
+    temporal = [field.name for field in table.schema if pa.types.is_temporal(field.type)]
+    if temporal:
+        strings = read(temporal, column_types={col: pa.string() for col in temporal})
+        for col in temporal:
+            table = table.set_column(table.schema.get_field_index(col), col, strings[col])
+
+    df = table.to_pandas()
+    for field in table.schema:
+        col = field.name
+        if pa.types.is_null(field.type):
+            # empty columns: float (object for tables without rows)
+            df[col] = df[col].astype(object if table.num_rows == 0 else float)
+        elif df[col].dtype == object:
+            # missing values are None, pandas parser uses NaN
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    # columns with numpy string dtypes are already read as strings (object)
+    dtype = {col: _get_dtype(dtype, col) for col in df.columns
+             if _get_dtype(dtype, col) is not None and not _is_numpy_string_dtype(_get_dtype(dtype, col))}
+    if dtype:
+        df = df.astype(dtype)
+    if index_col is not None and index_col is not False:
+        if not isinstance(index_col, (list, tuple)):
+            index_col = [index_col]
+        index_col = [df.columns[col] if isinstance(col, int) else col for col in index_col]
+        df = df.set_index(index_col)
+    return df
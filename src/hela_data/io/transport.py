@@ -0,0 +1,134 @@
+"""Transport encoded features of samples from worker processes using shared memory.
+
+A worker writes the result of `hela_data.io.vocabulary.encode_samples` into a
+`multiprocessing.shared_memory` block: the unique features as Arrow IPC stream followed
+by the int32 codes of all samples. Only a small handle with the name of the block is
+pickled and sent to the main process, which reads the codes without copying them.
+
+The main process owns the block after receiving the handle and has to release it
+using `attach_encoded_samples`. Start the resource tracker of the main process before
+starting the workers (see `prepare_transport`), so that blocks created by workers are
+tracked by it.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from hela_data.io.vocabulary import ID_DTYPE, _as_index
+
+SharedSamples = namedtuple('SharedSamples',
+                           ['name', 'n_bytes_features', 'offset_codes', 'index_names', 'samples', 'lengths'])
+
+_ALIGNMENT = 64
+
+
+def prepare_transport():
+    """Start resource tracker of the main process, which is inherited by forked workers."""
+    resource_tracker.ensure_running()
+
+
+def _features_to_table(features: pd.Index) -> pa.Table:
+    df = features.to_frame(index=False)
+    df.columns = [f'level_{i}' for i in range(df.shape[1])]
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _table_to_features(table: pa.Table, index_names: list) -> pd.Index:
+    df = table.to_pandas()
+    if len(index_names) > 1:
+        return pd.MultiIndex.from_frame(df, names=index_names)
+    return pd.Index(df.iloc[:, 0].to_numpy(), name=index_names[0])
+
+
+def share_encoded_samples(d: dict) -> dict:
+    """Move features and codes of a result of `encode_samples` to shared memory.
+
+    Parameters
+    ----------
+    d : dict
+        Result of `encode_samples`, further keys (e.g. 'dumps') are kept.
+
+    Returns
+    -------
+    dict
+        `d` with a `SharedSamples` handle under key 'shared' instead of
+        the keys 'features' and 'samples'.
+    """
+    d = dict(d)
+    features, samples = _as_index(d.pop('features')), d.pop('samples')
+    table = _features_to_table(features)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    n_bytes_features = sink.size()
+    offset_codes = -(-n_bytes_features // _ALIGNMENT) * _ALIGNMENT
+    lengths = [len(codes) for codes in samples.values()]
+    n_codes = sum(lengths)
+    shm = SharedMemory(create=True, size=max(1, offset_codes + n_codes * np.dtype(ID_DTYPE).itemsize))
+    try:
+        stream = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+        with pa.ipc.new_stream(stream, table.schema) as writer:
+            writer.write_table(table)
+        stream.close()
+        del writer, stream
+        codes = np.ndarray(n_codes, dtype=ID_DTYPE, buffer=shm.buf, offset=offset_codes)
+        if samples:
+            np.concatenate(list(samples.values()), out=codes)
+        del codes
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    d['shared'] = SharedSamples(name=shm.name,
+                                n_bytes_features=n_bytes_features,
+                                offset_codes=offset_codes,
+                                index_names=list(features.names),
+                                samples=list(samples),
+                                lengths=lengths)
+    return d
+
+
+@contextmanager
+def attach_encoded_samples(d: dict):
+    """Read result of `share_encoded_samples` and release the shared memory on exit.
+
+    Parameters
+    ----------
+    d : dict
+        Result with `SharedSamples` handle under key 'shared'.
+
+    Yields
+    ------
+    dict
+        `d` with keys 'features' and 'samples' as returned by `encode_samples`.
+        The codes of the samples are views on the shared memory, which are
+        only valid inside the with-block.
+    """
+    handle = d['shared']
+    shm = SharedMemory(name=handle.name)
+    try:
+        # features are converted to Python objects anyway, the codes are not copied
+        table = pa.ipc.open_stream(bytes(shm.buf[:handle.n_bytes_features])).read_all()
+        features = _table_to_features(table, handle.index_names)
+        del table
+        codes = np.ndarray(sum(handle.lengths), dtype=ID_DTYPE, buffer=shm.buf, offset=handle.offset_codes)
+        splits = np.cumsum(handle.lengths)[:-1]
+        result = {k: v for k, v in d.items() if k != 'shared'}
+        result.update(features=features, samples=dict(zip(handle.samples, np.split(codes, splits))))
+        del codes
+        yield result
+        result.clear()
+    finally:
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            # views on the block are still referenced, e.g. by a traceback,
+            # the block is unmapped once they are garbage collected
+            pass
@@ -0,0 +1,148 @@
+"""Vocabulary of features (e.g. peptides, precursors or protein groups) with int32 ids.
+
+Features are mapped to stable int32 ids in the order they were first added. Counts
+of features and the features of samples can then be stored as NumPy arrays indexed
+by these ids instead of dictionaries keyed by strings or tuples.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ID_DTYPE = np.int32
+
+
+def _as_index(features: Iterable) -> pd.Index:
+    # pd.Index would flatten a MultiIndex to tuples
+    return features if isinstance(features, pd.Index) else pd.Index(features)
+
+
+class FeatureVocabulary():
+    """Append-only mapping of features to stable int32 ids.
+
+    Parameters
+    ----------
+    names : List[str], optional
+        Names of the feature levels, e.g. ['Sequence', 'Charge'], by default None
+    index : pd.Index, optional
+        Unique features, the position of a feature is its id, by default None
+    """
+
+    def __init__(self, names: List[str] = None, index: pd.Index = None):
+        self.names = list(names) if names is not None else None
+        self._index = None
+        if index is not None:
+            if not index.is_unique:
+                raise ValueError("Features of vocabulary have to be unique.")
+            self._set_index(index)
+
+    def _set_index(self, index: pd.Index):
+        if len(index) > np.iinfo(ID_DTYPE).max:
+            raise OverflowError(f"Too many features for {np.dtype(ID_DTYPE)} ids: {len(index):,d}")
+        if self.names is not None:
+            index = index.set_names(self.names)
+        self._index = index
+
+    @property
+    def index(self) -> pd.Index:
+        """Features ordered by id."""
+        if self._index is not None:
+            return self._index
+        if self.names is not None and len(self.names) > 1:
+            return pd.MultiIndex.from_arrays([[]] * len(self.names), names=self.names)
+        return pd.Index([], name=self.names[0] if self.names else None)
+
+    def encode(self, features: Iterable) -> np.ndarray:
+        """Get ids of features. Unknown features are added to the vocabulary,
+        missing values get the id -1."""
+        features = _as_index(features)
+        if self._index is None:
+            self._set_index(features.unique().dropna())
+            return self.lookup(features)
+        ids = self._index.get_indexer(features)
+        unknown = ids == -1
+        if unknown.any():
+            new = features[unknown].unique().dropna()
+            if len(new):
+                logger.debug(f"Add {len(new):,d} features to vocabulary.")
+                self._set_index(self._index.append(new))
+                ids = self._index.get_indexer(features)
+        return ids.astype(ID_DTYPE)
+
+    def lookup(self, features: Iterable) -> np.ndarray:
+        """Get ids of features without adding unknown features, which get the id -1."""
+        if self._index is None:
+            return np.full(len(features), -1, dtype=ID_DTYPE)
+        return self._index.get_indexer(_as_index(features)).astype(ID_DTYPE)
+
+    def decode(self, ids: Iterable[int]) -> pd.Index:
+        """Get features of ids."""
+        return self.index[np.asarray(ids, dtype=np.intp)]
+
+    def save(self, fp: Union[str, Path]):
+        """Save vocabulary as Parquet file, the row number is the id."""
+        self.index.to_frame(index=False).to_parquet(fp, index=False)
+
+    @classmethod
+    def load(cls, fp: Union[str, Path]) -> 'FeatureVocabulary':
+        """Load vocabulary saved by `save`."""
+        df = pd.read_parquet(fp)
+        if df.shape[1] > 1:
+            index = pd.MultiIndex.from_frame(df)
+        else:
+            index = pd.Index(df.iloc[:, 0], name=df.columns[0])
+        return cls(names=list(df.columns), index=index)
+
+    def __len__(self) -> int:
+        return 0 if self._index is None else len(self._index)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(names={self.names}, n_features={len(self):,d})"
+
+
+def encode_samples(indices: Dict[str, Iterable]) -> dict:
+    """Encode features of several samples using a shared local vocabulary,
+    e.g. to return them compactly from a worker process.
+
+    Parameters
+    ----------
+    indices : Dict[str, Iterable]
+        Features (e.g. the index of a dump) by sample name.
+
+    Returns
+    -------
+    dict
+        Unique features under key 'features' and the int32 codes of the features
+        of each sample (positions in 'features', -1 for missing values) under key 'samples'.
+    """
+    indices = {sample: _as_index(index) for sample, index in indices.items()}
+    if not indices:
+        return {'features': pd.Index([]), 'samples': {}}
+    first = next(iter(indices.values()))
+    features = first.append(list(indices.values())[1:])
+    codes, uniques = pd.factorize(features)
+    uniques = uniques.set_names(first.names)
+    codes = codes.astype(ID_DTYPE)
+    splits = np.cumsum([len(index) for index in indices.values()])[:-1]
+    return {'features': uniques,
+            'samples': dict(zip(indices.keys(), np.split(codes, splits)))}
+
+
+def merge_encoded_samples(a: dict, b: dict) -> dict:
+    """Merge two results of `encode_samples` into one with a shared local vocabulary."""
+    codes, uniques = pd.factorize(a['features'].append(b['features']))
+    uniques = uniques.set_names(a['features'].names)
+    codes = codes.astype(ID_DTYPE)
+    n_a = len(a['features'])
+    samples = {}
+    for mapping, encoded in [(codes[:n_a], a), (codes[n_a:], b)]:
+        for sample, sample_codes in encoded['samples'].items():
+            remapped = np.full(len(sample_codes), -1, dtype=ID_DTYPE)
+            mask = sample_codes >= 0
+            remapped[mask] = mapping[sample_codes[mask]]
+            samples[sample] = remapped
+    return {'features': uniques, 'samples': samples}
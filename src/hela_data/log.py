@@ -5,7 +5,6 @@ import logging
 import sys
 
 LOG_FOLDER = Path('logs')
-LOG_FOLDER.mkdir(exist_ok=True)
 
 
 def setup_nb_logger(level: int = logging.INFO,
@@ -59,6 +58,7 @@ def setup_logger_w_file(logger, level=logging.INFO, fname_base=None):
     logger.addHandler(c_handler)
 
     if fname_base:
+        LOG_FOLDER.mkdir(exist_ok=True)
         date_log_file = "{:%y%m%d_%H%M}".format(datetime.now())
         f_handler = logging.FileHandler(
             LOG_FOLDER / f"{fname_base}_{date_log_file}.txt")
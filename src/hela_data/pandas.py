@@ -192,10 +192,44 @@ def get_columns_accessor_from_iterable(cols: Iterable[str],
 
 
 def select_max_by(df: pd.DataFrame, grouping_columns: list, selection_column: str) -> pd.DataFrame:
-    df = df.sort_values(by=[*grouping_columns, selection_column], ascending=False)
-    df = df.drop_duplicates(subset=grouping_columns,
-                            keep='first')
-    return df
+    """Select the row with the maximum value in `selection_column` for each group.
+
+    Rows are assigned to groups by hashing (`groupby`) and the maximum per group is
+    broadcast to its rows (`groupby.transform`), i.e. the table is not sorted.
+
+    - ties: the first row with the maximum value of a group is selected
+    - missing values in `selection_column` are only selected if all values of
+      a group are missing (first row of the group)
+    - missing values in `grouping_columns` form a group
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table with rows to select.
+    grouping_columns : list
+        Columns defining the groups.
+    selection_column : str
+        Numeric column to select the maximum of.
+
+    Returns
+    -------
+    pd.DataFrame
+        Selected rows in their original order. Sort them explicitly if the order
+        matters, the previous sort-based implementation returned them sorted by
+        `grouping_columns` in descending order.
+    """
+    grouping_columns = list(grouping_columns)
+    if df.empty:
+        return df
+    grouped = df.groupby(grouping_columns, sort=False, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    values = df[selection_column].to_numpy(dtype=float, na_value=np.nan)
+    # maximum ignores missing values, it is missing if all values of a group are
+    max_of_rows = grouped[selection_column].transform('max').to_numpy(dtype=float, na_value=np.nan)
+    positions = np.flatnonzero((values == max_of_rows) | np.isnan(max_of_rows))
+    # first row with the maximum of each group
+    positions = positions[~pd.Index(codes[positions]).duplicated(keep='first')]
+    return df.iloc[positions]
 
 
 def length(x):
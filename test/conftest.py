@@ -0,0 +1,68 @@
+import pytest
+
+import hela_data.io.cache
+
+EVIDENCE = """\
+Sequence\tLength\tModifications\tModified sequence\tMissed cleavages\tProteins\tLeading razor protein\tGene names\tType\tRaw file\tCharge\tm/z\tRetention time\tPEP\tScore\tIntensity\tReverse\tPotential contaminant\tid\tProtein group IDs\tPeptide ID
+AAAAAK\t6\tUnmodified\t_AAAAAK_\t0\tP12345\tP12345\tGENE1\tMULTI-MSMS\tsample_1\t2\t272.66\t10.5\t0.001\t120.5\t1000000\t\t\t0\t0\t0
+AAAAAK\t6\tUnmodified\t_AAAAAK_\t0\tP12345\tP12345\tGENE1\tMULTI-MSMS\tsample_1\t2\t272.66\t10.7\t0.002\t98.1\t800000\t\t\t1\t0\t0
+AAAAAK\t6\tUnmodified\t_AAAAAK_\t0\tP12345\tP12345\tGENE1\tMULTI-MSMS\tsample_1\t3\t182.11\t10.6\t0.003\t80.0\t500000\t\t\t2\t0\t0
+CCDDEEK\t7\tUnmodified\t_CCDDEEK_\t0\tP12345;Q67890\tP12345\tGENE1;GENE2\tMULTI-MSMS\tsample_1\t2\t420.16\t20.1\t0.01\t75.2\t0\t\t\t3\t0;1\t1
+LLMMNNR\t7\tOxidation (M)\t_LLM(Oxidation (M))MNNR_\t0\tQ67890\tQ67890\tGENE2\tMULTI-MSMS\tsample_1\t2\t440.21\t30.3\t0.02\t60.4\t2500000\t\t\t4\t1\t2
+PPQQRSK\t7\tUnmodified\t_PPQQRSK_\t1\tCON__P00001\tCON__P00001\t\tMULTI-MSMS\tsample_1\t2\t414.72\t15.0\t0.05\t50.3\t300000\t\t+\t5\t2\t3
+TTVVWWK\t7\tUnmodified\t_TTVVWWK_\t0\tREV__P99999\tREV__P99999\t\tMULTI-MSMS\tsample_1\t2\t453.24\t25.0\t0.5\t10.1\t200000\t+\t\t6\t3\t4
+YYAACDK\t7\tUnmodified\t_YYAACDK_\t0\tQ67890\tQ67890\tGENE2\tMSMS\tsample_1\t2\t417.68\t35.0\t0.03\t45.0\t\t\t\t7\t1\t5
+"""
+
+PEPTIDES = """\
+Sequence\tProteins\tLeading razor protein\tGene names\tPEP\tScore\tIntensity\tReverse\tPotential contaminant\tid\tProtein group IDs\tEvidence IDs
+AAAAAK\tP12345\tP12345\tGENE1\t0.001\t120.5\t2300000\t\t\t0\t0\t0;1;2
+CCDDEEK\tP12345;Q67890\tP12345\tGENE1;GENE2\t0.01\t75.2\t0\t\t\t1\t0;1\t3
+LLMMNNR\tQ67890\tQ67890\tGENE2\t0.02\t60.4\t2500000\t\t\t2\t1\t4
+PPQQRSK\tCON__P00001\tCON__P00001\t\t0.05\t50.3\t300000\t\t+\t3\t2\t5
+TTVVWWK\tREV__P99999\tREV__P99999\t\t0.5\t10.1\t200000\t+\t\t4\t3\t6
+YYAACDK\tQ67890\tQ67890\tGENE2\t0.03\t45.0\t100000\t\t\t5\t1\t7
+"""
+
+PROTEIN_GROUPS = """\
+Protein IDs\tMajority protein IDs\tGene names\tQ-value\tScore\tIntensity\tOnly identified by site\tReverse\tPotential contaminant\tid\tPeptide IDs\tEvidence IDs
+P12345\tP12345\tGENE1\t0\t150.2\t3100000\t\t\t\t0\t0;1\t0;1;2;3
+Q67890\tQ67890\tGENE2\t0\t110.7\t2600000\t\t\t\t1\t1;2;5\t3;4;7
+Q67890-2\tQ67890-2\tGENE2\t0\t20.3\t5000\t\t\t\t2\t2\t4
+CON__P00001\tCON__P00001\t\t0\t50.3\t300000\t\t\t+\t3\t3\t5
+REV__P99999\tREV__P99999\t\t1\t10.1\t200000\t\t+\t\t4\t4\t6
+P55555\tP55555\t\t0.01\t30.0\t40000\t\t\t\t5\t6\t8
+"""
+
+SUMMARY = """\
+Raw file\tExperiment\tEnzyme\tMS\tMS/MS\tMS/MS Identified\tPeptide Sequences Identified\tRecalibrated
+sample_1\t\tTrypsin/P\t12920\t80807\t44494\t34109\t+
+Total\t\t\t12920\t80807\t44494\t34109\t
+"""
+
+TABLES = {'evidence.txt': EVIDENCE,
+          'peptides.txt': PEPTIDES,
+          'proteinGroups.txt': PROTEIN_GROUPS,
+          'summary.txt': SUMMARY}
+
+
+def create_mq_txt_folder(folder):
+    """Write a small MaxQuant txt output folder."""
+    folder.mkdir(parents=True, exist_ok=True)
+    for fname, content in TABLES.items():
+        (folder / fname).write_text(content)
+    return folder
+
+
+@pytest.fixture
+def mq_txt_folder(tmp_path):
+    return create_mq_txt_folder(tmp_path / 'sample_1')
+
+
+@pytest.fixture(autouse=True)
+def clear_table_cache():
+    max_bytes = hela_data.io.cache.TABLE_CACHE.max_bytes
+    hela_data.io.cache.TABLE_CACHE.clear()
+    yield
+    hela_data.io.cache.TABLE_CACHE.clear()
+    hela_data.io.cache.TABLE_CACHE.resize(max_bytes)
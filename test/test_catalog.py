@@ -0,0 +1,66 @@
+import os
+
+from hela_data.io import mq
+from hela_data.io.catalog import FolderCatalog
+
+from conftest import create_mq_txt_folder
+
+
+def test_folder_catalog_refresh(tmp_path):
+    root = tmp_path / 'mq_out'
+    create_mq_txt_folder(root / 'sample_1')
+    create_mq_txt_folder(root / 'sample_2')
+    catalog = FolderCatalog(root)
+    changes = catalog.refresh()
+    assert changes == {'added': ['sample_1', 'sample_2'], 'updated': [], 'removed': []}
+    assert catalog.fp.exists()
+    assert sorted(catalog.get_files(root / 'sample_1').files) == sorted(os.listdir(root / 'sample_1'))
+
+    catalog = FolderCatalog(root)
+    assert len(catalog) == 2
+    assert catalog.refresh() == {'added': [], 'updated': [], 'removed': []}
+
+    (root / 'sample_2' / 'msms.txt').write_text('id\n0\n')
+    (root / 'sample_1' / 'evidence.txt').unlink()
+    os.rename(root / 'sample_1', root / 'sample_3')
+    changes = catalog.refresh()
+    assert changes == {'added': ['sample_3'], 'updated': ['sample_2'], 'removed': ['sample_1']}
+    assert 'msms.txt' in catalog.get_files('sample_2').files
+    assert 'evidence.txt' not in catalog.get_files('sample_3').files
+
+
+def test_folder_catalog_file_rewritten_in_place(tmp_path):
+    root = tmp_path / 'mq_out'
+    folder = create_mq_txt_folder(root / 'sample_1')
+    catalog = FolderCatalog(root)
+    catalog.refresh()
+
+    mtime_ns = os.stat(folder).st_mtime_ns
+    with open(folder / 'summary.txt', 'a') as f:
+        f.write('\n')
+    os.utime(folder, ns=(mtime_ns, mtime_ns))  # folder itself looks unchanged
+    assert catalog.refresh()['updated'] == []
+    assert catalog.refresh(check_files=['evidence.txt'])['updated'] == []
+    assert catalog.refresh(check_files=['summary.txt'])['updated'] == ['sample_1']
+    with open(folder / 'summary.txt', 'a') as f:
+        f.write('\n')
+    os.utime(folder, ns=(mtime_ns, mtime_ns))
+    assert catalog.refresh(check_files=True)['updated'] == ['sample_1']
+    assert catalog.folders['sample_1']['files']['summary.txt'][0] == os.stat(folder / 'summary.txt').st_size
+
+
+def test_maxquantoutput_catalog(tmp_path, monkeypatch):
+    root = tmp_path / 'mq_out'
+    folder = create_mq_txt_folder(root / 'sample_1')
+    catalog = FolderCatalog(root)
+    catalog.refresh()
+    assert folder in catalog
+    assert tmp_path / 'sample_1' not in catalog
+
+    def raise_on_search(*args, **kwargs):
+        raise AssertionError('folder searched despite catalog')
+
+    monkeypatch.setattr(mq.hela_data.io, 'search_files', raise_on_search)
+    mq_output = mq.MaxQuantOutputDynamic(folder, catalog=catalog)
+    assert 'evidence.txt' in mq_output.files
+    assert len(mq_output.peptides) == 6
@@ -0,0 +1,200 @@
+from functools import partial
+import importlib
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import create_mq_txt_folder
+
+
+@pytest.fixture
+def data_objects(tmp_path, monkeypatch):
+    # data_objects creates folders relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('hela_data.io.data_objects')
+
+
+def test_peptide_counter(data_objects, tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / sample) for sample in ['sample_1', 'sample_2']]
+    fp_counter = tmp_path / 'count_peptides.json'
+    counter = data_objects.PeptideCounter(fp_counter)
+    c = counter.sum_over_files(folders=folders[:1], n_workers=1)
+    assert c == {'AAAAAK': 1, 'LLMMNNR': 1, 'YYAACDK': 1}
+    c = counter.sum_over_files(folders=folders, n_workers=1)
+    assert c == {'AAAAAK': 2, 'LLMMNNR': 2, 'YYAACDK': 2}
+    assert counter.counts.tolist() == [2, 2, 2]
+    assert counter.vocabulary.decode(counter.samples['sample_2']).tolist() == ['AAAAAK', 'LLMMNNR', 'YYAACDK']
+    assert set(counter.dumps) == {'sample_1', 'sample_2'}
+
+    loaded = data_objects.PeptideCounter(fp_counter)
+    assert loaded.loaded == {'sample_1', 'sample_2'}
+    np.testing.assert_array_equal(loaded.counts, counter.counts)
+    assert loaded.samples['sample_1'].dtype == np.int32
+    assert loaded.get_df_counts().columns.tolist() == ['Sequence', 'counts', 'proportion']
+    assert loaded.get_features(min_proportion=1.0).tolist() == ['AAAAAK', 'LLMMNNR', 'YYAACDK']
+
+
+def test_peptide_counter_missing_vocabulary(data_objects, tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / 'sample_1')]
+    fp_counter = tmp_path / 'count_peptides.json'
+    counter = data_objects.PeptideCounter(fp_counter)
+    counter.sum_over_files(folders=folders, n_workers=1)
+    counter.get_state_fpaths()['vocabulary'].unlink()
+    with pytest.raises(FileNotFoundError, match='vocabulary'):
+        data_objects.PeptideCounter(fp_counter)
+    assert data_objects.PeptideCounter(fp_counter, overwrite=True).counter == {}
+
+
+def test_evidence_counter_previous_format(data_objects, tmp_path):
+    fp_counter = tmp_path / 'count_evidence.json'
+    fp_counter.write_text(json.dumps({'counter': {'AAAAAK': {'2': 3, '3': 1}, 'LLMMNNR': {'2': 2}},
+                                      'based_on': ['sample_1', 'sample_2', 'sample_3'],
+                                      'dumps': {}}))
+    counter = data_objects.EvidenceCounter(fp_counter)
+    assert counter.counter == {('AAAAAK', 2): 3, ('AAAAAK', 3): 1, ('LLMMNNR', 2): 2}
+    df_counts = counter.get_df_counts()
+    assert df_counts[['Sequence', 'Charge', 'counts']].values.tolist() == [
+        ['AAAAAK', 2, 3], ['LLMMNNR', 2, 2], ['AAAAAK', 3, 1]]
+    assert counter.get_features(min_count=2).tolist() == [('AAAAAK', 2), ('LLMMNNR', 2)]
+
+
+@pytest.mark.parametrize('n_workers,chunks_per_task,executor', [(1, 1, 'process'),
+                                                                 (2, 1, 'process'),
+                                                                 (2, 2, 'process'),
+                                                                 (2, 1, 'thread')])
+def test_peptide_counter_streaming(data_objects, tmp_path, n_workers, chunks_per_task, executor):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / f'sample_{i}') for i in range(5)]
+    counter = data_objects.PeptideCounter(tmp_path / 'count_peptides.json')
+    c = counter.sum_over_files(folders=folders, n_workers=n_workers, chunks_per_task=chunks_per_task,
+                               executor=executor)
+    assert c == {'AAAAAK': 5, 'LLMMNNR': 5, 'YYAACDK': 5}
+    assert len(counter.samples) == len(counter.dumps) == 5
+
+
+def test_collect_in_chuncks_tree_reduction(data_objects):
+    merged = []
+    data_objects.collect_in_chuncks(list(range(10)), process_chunk_fct=sum, n_workers=1, chunks=10,
+                                    combine_fct=merged.append, merge_fct=lambda a, b: a + b,
+                                    chunks_per_task=4)
+    assert merged == [0 + 1 + 2 + 3, 4 + 5 + 6 + 7, 8 + 9]
+    assert data_objects.collect_in_chuncks(list(range(4)), process_chunk_fct=len, n_workers=1,
+                                           chunks=2) == [2, 2]
+
+
+def test_peptide_counter_resume_from_journal(data_objects, tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / f'sample_{i}') for i in range(6)]
+    fp_counter = tmp_path / 'count_peptides.json'
+    processed = []
+
+    def count_until_crash(chunk):
+        if any(folder.stem == 'sample_4' for folder in chunk):
+            raise RuntimeError('Interrupted')
+        processed.extend(folder.stem for folder in chunk)
+        return data_objects.count_peptides(chunk)
+
+    counter = data_objects.PeptideCounter(fp_counter)
+    counter.counting_fct = count_until_crash
+    with pytest.raises(RuntimeError):
+        counter.sum_over_files(folders=folders, n_workers=1)
+    assert not fp_counter.exists()
+    assert processed == ['sample_0', 'sample_1', 'sample_2', 'sample_3']
+
+    # checkpoints of samples which are already loaded are not counted twice
+    checkpoint = next(counter.fp_journal.glob('*.pkl'))
+    (counter.fp_journal / f'0_{checkpoint.name}').write_bytes(checkpoint.read_bytes())
+
+    resumed = data_objects.PeptideCounter(fp_counter)
+    assert resumed.loaded == set(processed)
+    assert resumed.counter == {'AAAAAK': 4, 'LLMMNNR': 4, 'YYAACDK': 4}
+    processed.clear()
+    resumed.counting_fct = count_until_crash
+    resumed.sum_over_files(folders=folders[:4] + folders[5:], n_workers=1)
+    assert processed == ['sample_5']
+    resumed.counting_fct = data_objects.count_peptides
+    c = resumed.sum_over_files(folders=folders, n_workers=1)
+    assert c == {'AAAAAK': 6, 'LLMMNNR': 6, 'YYAACDK': 6}
+    assert set(resumed.dumps) == {f'sample_{i}' for i in range(6)}
+    assert not resumed.fp_journal.exists()
+    assert data_objects.PeptideCounter(fp_counter).counter == c
+
+
+def test_multi_level_counter(data_objects, tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / f'sample_{i}') for i in range(3)]
+    fp_counters = {level: tmp_path / f'count_{level}.json' for level in data_objects.LEVELS}
+    counter = data_objects.MultiLevelCounter(fp_counters)
+    counts = counter.sum_over_files(folders=folders[:2], n_workers=1)
+    counts = counter.sum_over_files(folders=folders, n_workers=1)
+
+    assert counts[data_objects.PEPTIDES] == data_objects.PeptideCounter(
+        tmp_path / 'peptides.json').sum_over_files(folders, n_workers=1)
+    assert counts[data_objects.EVIDENCE] == data_objects.EvidenceCounter(
+        tmp_path / 'evidence.json').sum_over_files(folders, n_workers=1)
+    pg_counter = data_objects.ProteinGroupsCounter(tmp_path / 'pg.json')
+    assert counts[data_objects.PROTEIN_GROUPS] == pg_counter.sum_over_files(folders, n_workers=1)
+    assert counts[data_objects.GENES] == data_objects.GeneCounter(
+        tmp_path / 'genes.json').sum_over_files(list(pg_counter.dumps.values()), n_workers=1)
+    assert counts[data_objects.GENES] == {'GENE1': 3, 'GENE2': 3}
+
+    loaded = data_objects.MultiLevelCounter(fp_counters)
+    assert all(c.loaded == {'sample_0', 'sample_1', 'sample_2'} for c in loaded.counters.values())
+    assert loaded[data_objects.GENES].dumps == loaded[data_objects.PROTEIN_GROUPS].dumps
+    assert not loaded.get_new_folders(folders)
+
+
+def test_parquet_dumps(data_objects, tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / f'sample_{i}') for i in range(2)]
+    counter = data_objects.PeptideCounter(tmp_path / 'count_peptides.json',
+                                          counting_fct=partial(data_objects.count_peptides, dump_format='parquet'))
+    counter.sum_over_files(folders=folders, n_workers=1)
+    fpath = counter.dumps['sample_1']
+    assert fpath.suffix == '.parquet' and fpath.parent.name == 'samp'
+    peptides = data_objects.load_agg_peptide_dump(fpath, columns=['Intensity'])
+    assert peptides.index.name == 'Sequence' and peptides.columns.tolist() == ['Intensity']
+    assert peptides['Intensity'].dtype == 'Int64'
+    assert peptides['Intensity'].tolist() == [2300000, 2500000, 100000]
+
+    pg = data_objects.load_and_process_proteinGroups(folders[0])
+    dumps = {fmt: data_objects.dump_table(pg, folder=folders[0], outfolder=tmp_path / fmt, dump_format=fmt,
+                                          dtypes=data_objects.d_dtypes_pg)
+             for fmt in data_objects.DUMP_FORMATS}
+    use_cols = ['Protein IDs', 'Gene names', 'Intensity']
+    genes = {fmt: data_objects.pg_idx_gene_fct(fpath, use_cols=use_cols) for fmt, fpath in dumps.items()}
+    assert genes['parquet'].index.isna().tolist() == genes['csv'].index.isna().tolist()
+    assert genes['parquet'].index.dropna().tolist() == genes['csv'].index.dropna().tolist()
+    assert genes['parquet'].columns.tolist() == genes['csv'].columns.tolist() == ['Protein IDs', 'Intensity']
+    assert data_objects.load_pg_dump(dumps['parquet']).shape == data_objects.load_pg_dump(dumps['csv']).shape
+
+
+def test_mq_all_summaries_append(data_objects, tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / f'sample_{i}') for i in range(3)]
+    (tmp_path / 'txt' / 'empty').mkdir()
+    fp_summaries = tmp_path / 'all_summaries.json'
+    summaries = data_objects.MqAllSummaries(fp_summaries)
+    df = summaries.load_new_samples(folders[:2] + [tmp_path / 'txt' / 'empty'])
+    assert df.index.tolist() == ['sample_0', 'sample_1']
+    assert summaries.empty_folders == ['empty\n'] and not (tmp_path / 'txt' / 'empty').exists()
+    expected = data_objects.MaxQuantOutputDynamic(folders[0]).summary.iloc[0]
+    assert df.loc['sample_0', expected.index].tolist() == [v if pd.notna(v) else pd.NA for v in expected]
+
+    summaries = data_objects.MqAllSummaries(fp_summaries)
+    assert len(summaries) == 2
+    summaries.load_new_samples(folders, workers=2, executor='thread', batch_size=1)
+    assert len(list(summaries.fp_state.glob('part-*.parquet'))) == 2
+    loaded = data_objects.MqAllSummaries(fp_summaries)
+    pd.testing.assert_frame_equal(loaded.df, summaries.df)
+    assert loaded.df[summaries.usecolumns.MS2].tolist() == [44494] * 3
+
+    assert summaries.save_state()
+    assert not loaded.save_state()  # export is up to date, not rewritten
+    pd.testing.assert_frame_equal(data_objects.MqAllSummaries(tmp_path / 'all_summaries.json').df, summaries.df)
+    summaries.load_new_samples([create_mq_txt_folder(tmp_path / 'txt' / 'sample_3')])
+    assert not summaries.is_exported()
+
+
+def test_load_and_process_protein_groups_order(data_objects, tmp_path):
+    folder = create_mq_txt_folder(tmp_path / 'txt' / 'sample_1')
+    pg = data_objects.load_and_process_proteinGroups(folder)
+    # best protein group per gene set sorted by gene names (descending), then groups without genes
+    assert pg.index.tolist() == ['Q67890', 'P12345', 'P55555']
@@ -0,0 +1,89 @@
+import itertools
+import operator
+import os
+
+import pytest
+
+from hela_data.io.executors import (EXECUTORS, ClusterExecutor, Executor, SerialExecutor, _TaskBoard,
+                                    executor_context, get_executor)
+
+
+def square(x):
+    return x * x
+
+
+def exit_once(item):
+    # the worker process exits on the first attempt of the task
+    fpath, x = item
+    if not os.path.exists(fpath):
+        open(fpath, 'w').close()
+        os._exit(1)
+    return x * x
+
+
+def exit_always(x):
+    os._exit(1)
+
+
+@pytest.mark.parametrize('kind', EXECUTORS)
+def test_executor_imap(kind):
+    with get_executor(kind, n_workers=2) as executor:
+        assert list(executor.imap(square, range(7), chunksize=2)) == [x * x for x in range(7)]
+        assert sorted(executor.imap(square, range(5), ordered=False)) == [0, 1, 4, 9, 16]
+        with pytest.raises(TypeError):
+            list(executor.imap(operator.truediv, [1, 0]))
+        # results of failed call are not returned by the next one
+        assert list(executor.imap(square, [3])) == [9]
+
+
+def test_executor_context():
+    executor = SerialExecutor()
+    with executor_context(executor, n_workers=4) as ex:
+        assert ex is executor
+    with executor_context('thread', n_workers=1) as ex:
+        assert isinstance(ex, SerialExecutor)
+    with pytest.raises(ValueError):
+        get_executor('dask')
+    with pytest.raises(TypeError):
+        Executor()  # imap is abstract
+
+
+def test_cluster_executor_requeues_task_of_dead_worker(tmp_path):
+    items = [(str(tmp_path / 'died'), x) for x in range(5)]
+    with ClusterExecutor(n_workers=2, heartbeat=0.1) as executor:
+        assert list(executor.imap(exit_once, items)) == [x * x for x in range(5)]
+        assert len(executor._workers) == 2
+        assert all(worker.is_alive() for worker in executor._workers.values())
+        with pytest.raises(RuntimeError, match='lost 2 times'):
+            list(executor.imap(exit_always, [1]))
+        assert list(executor.imap(square, [3])) == [9]
+
+
+def test_cluster_executor_imap_is_lazy():
+    with ClusterExecutor(n_workers=2, max_pending=3) as executor:
+        results = executor.imap(square, itertools.count(), chunksize=2)
+        assert list(itertools.islice(results, 10)) == [x * x for x in range(10)]
+        assert executor._n_submitted <= 5 + 3
+        results.close()
+        assert list(executor.imap(square, [4])) == [16]
+
+
+def test_task_board_requeue_lost():
+    board = _TaskBoard(heartbeat=1.0, max_retries=1)
+    board.put((0, square, [2]))
+    assert board.get('a') == (0, square, [2])
+    assert board.requeue_lost(timeout=60.0) == []
+    # worker 'a' is not heard of anymore
+    assert board.requeue_lost(timeout=0.0) == [(0, 'a')]
+    assert board.get('b') == (0, square, [2])
+    board.done('a', 0, True, [4])  # late result of the lost worker is used
+    board.done('b', 0, True, [4])
+    assert board.wait([0], timeout=0.0) == {0: (True, [4])}
+
+    board.put((1, square, [3]))
+    board.get('a')
+    board.requeue_lost(timeout=60.0, workers=['a'])
+    board.get('b')
+    board.requeue_lost(timeout=60.0, workers=['b'])
+    (success, error), = board.wait([1], timeout=0.0).values()
+    assert not success and isinstance(error, RuntimeError)
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from hela_data.file_utils import _parse_value, load_summary_row
+from hela_data.io.parsers import read_table
+
+VALUES = ['12', ' 12 ', '+3', '-0', '00012', '1_000', '1 000', '1,5', '0x10', '１２', '١٢',
+          '99999999999999999999', '1.0', '1.5', ' 1.5 ', '.5', '5.', '1e5', '1E+05', '1.5e-3', 'e5', '1e',
+          '.', '-', '--1', 'inf', 'INF', '-Inf', '+inf', 'infinity', '-Infinity', ' inf ', 'nan', 'NaN',
+          ' nan', 'NA', '', 'True', 'true', 'FALSE', 'n. def.']
+
+
+def test_parse_value_as_pandas(tmp_path):
+    fname = tmp_path / 'summary.txt'
+    fname.write_text('Raw file\t' + '\t'.join(f'col_{i}' for i in range(len(VALUES))) + '\n'
+                     + 'sample_1\t' + '\t'.join(VALUES) + '\n')
+    expected = read_table(fname).iloc[0, 1:].tolist()
+    actual = [_parse_value(value) for value in VALUES]
+    for value, a, e in zip(VALUES, actual, expected):
+        if pd.isna(e):
+            assert pd.isna(a), value
+        else:
+            assert a == e and type(a) is type(e.item() if hasattr(e, 'item') else e), value
+
+
+@pytest.mark.parametrize('value', ['1_000', '１２', ' nan', '0x10', '99999999999999999999'])
+def test_parse_value_strict(value):
+    assert _parse_value(value) == value
+
+
+def test_load_summary_row(tmp_path):
+    fname = tmp_path / 'summary.txt'
+    fname.write_text('Raw file\tMS\tMS/MS\tEnzyme\tFixed\n'
+                     'sample_1\t1_000\t12.5\tTrypsin/P\n'
+                     'Total\t1\t12.5\t\t\n')
+    assert load_summary_row(fname) == {'MS': '1_000', 'MS/MS': 12.5, 'Enzyme': 'Trypsin/P',
+                                       'Fixed': pytest.approx(float('nan'), nan_ok=True)}
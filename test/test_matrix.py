@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hela_data.io.matrix import (ChunkedMatrix, SparseMatrix, collect_wide, iter_row_blocks, read_memmap, to_memmap,
+                                 transpose_memmap)
+
+
+def load_intensities(path):
+    return pd.read_csv(path, index_col=0).squeeze(axis=1).astype(pd.Int64Dtype())
+
+
+@pytest.fixture
+def dumps(tmp_path):
+    samples = {'sample_1': pd.Series([1, 2, 3], index=['AAK', 'CCK', 'DDK']),
+               'sample_2': pd.Series([4, None, 6], index=['EEK', 'AAK', 'CCK'], dtype='Int64'),
+               'sample_3': pd.Series([7], index=['FFK'])}
+    dumps = []
+    for sample, s in samples.items():
+        s.rename('Intensity').rename_axis('Sequence').to_csv(tmp_path / f'{sample}.csv')
+        dumps.append((sample, tmp_path / f'{sample}.csv'))
+    dumps.append(('missing', tmp_path / 'missing.csv'))
+    return dumps
+
+
+def collect_by_join(index, dumps):
+    df = pd.DataFrame(index=index)
+    for sample, path in dumps:
+        if path.exists():
+            df = df.join(load_intensities(path).rename(sample), how='left')
+    return df
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread'])
+def test_collect_wide(dumps, executor):
+    index = pd.Index(['AAK', 'CCK', 'DDK', 'EEK', 'GGK'], name='Sequence')
+    expected = collect_by_join(index, dumps)
+
+    actual = collect_wide(index, dumps, load_intensities, dtype='Int64',
+                          block_size=2, n_workers=2, executor=executor)
+    pd.testing.assert_frame_equal(actual, expected)
+
+    actual = collect_wide(index, dumps, load_intensities, block_size=3, n_workers=2, executor=executor)
+    assert (actual.dtypes == np.float32).all()
+    pd.testing.assert_frame_equal(actual, expected.astype('float32'))
+
+
+def test_collect_wide_sparse(dumps):
+    index = pd.Index(['AAK', 'CCK', 'DDK', 'EEK', 'GGK'], name='Sequence')
+    expected = collect_by_join(index, dumps)
+
+    actual = collect_wide(index, dumps, load_intensities, dtype='Int64', block_size=2, sparse=True)
+    assert actual.matrix.format == 'csc'
+    assert actual.nnz == expected.notna().sum().sum()
+    pd.testing.assert_frame_equal(actual.to_dense(), expected.astype(float))
+
+
+def test_collect_wide_checks_index(dumps):
+    with pytest.raises(ValueError):
+        collect_wide(pd.Index(['AAK', 'AAK']), dumps, load_intensities)
+
+
+@pytest.mark.parametrize('max_memory', [8 * 5, 2**20])
+def test_transpose_memmap(tmp_path, max_memory):
+    index = pd.MultiIndex.from_product([['AAK', 'CCK', 'DDK'], [2, 3]], names=['Sequence', 'Charge'])
+    df = pd.DataFrame(np.arange(6 * 7).reshape(6, 7), index=index,
+                      columns=pd.Index([f'sample_{i}' for i in range(7)], name='Sample ID'),
+                      dtype='Int64')
+    df.iloc[1, 2] = pd.NA
+
+    folder = to_memmap(df, tmp_path / 'wide', max_memory=max_memory)
+    pd.testing.assert_frame_equal(read_memmap(folder, dtype='Int64'), df)
+
+    folder = transpose_memmap(folder, tmp_path / 'long', max_memory=max_memory)
+    pd.testing.assert_frame_equal(read_memmap(folder, dtype='Int64'), df.T)
+    blocks = list(iter_row_blocks(folder, max_memory=max_memory))
+    pd.testing.assert_frame_equal(pd.concat(blocks).astype('Int64'), df.T)
+
+
+def test_chunked_matrix(tmp_path):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(rng.integers(0, 100, size=(11, 7)).astype(float),
+                      index=pd.Index([f'sample_{i:02d}' for i in range(11)], name='Sample ID'),
+                      columns=pd.MultiIndex.from_product([['AAK', 'CCK', 'DDK', 'EEK', 'FFK', 'GGK', 'HHK'], [2]],
+                                                         names=['Sequence', 'Charge']))
+    df = df.mask(rng.random(df.shape) < 0.2).astype('float32')
+    df.to_pickle(tmp_path / 'wide.pkl')
+
+    matrix = ChunkedMatrix.from_pickle(tmp_path / 'wide.pkl', chunks=(4, 3))
+    assert matrix.shape == (11, 7)
+    matrix = ChunkedMatrix(tmp_path / 'wide')
+    pd.testing.assert_frame_equal(matrix.read(), df)
+    pd.testing.assert_frame_equal(matrix.read(rows=['sample_03']), df.loc[['sample_03']])
+    pd.testing.assert_frame_equal(matrix.read(columns=[('EEK', 2)]), df.loc[:, [('EEK', 2)]])
+    pd.testing.assert_frame_equal(matrix.read(rows=slice('sample_02', 'sample_09'), columns=[('HHK', 2), ('AAK', 2)]),
+                                  df.loc['sample_02':'sample_09', [('HHK', 2), ('AAK', 2)]])
+    pd.testing.assert_frame_equal(matrix.iread(rows=[10, 0, 5], columns=slice(2, 6)), df.iloc[[10, 0, 5], 2:6])
+    assert matrix.iread(rows=[]).shape == (0, 7)
+    with pytest.raises(KeyError):
+        matrix.read(rows=['sample_99'])
+
+    folder = to_memmap(df.T, tmp_path / 'long')
+    matrix = ChunkedMatrix.from_memmap(folder, tmp_path / 'long_chunked', chunks=(2, 5))
+    pd.testing.assert_frame_equal(matrix.read(), df.T)
+
+
+def test_sparse_matrix(tmp_path):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(rng.integers(0, 100, size=(11, 7)).astype(float),
+                      index=pd.Index([f'sample_{i:02d}' for i in range(11)][::-1], name='Sample ID'),
+                      columns=pd.Index(['AAK', 'CCK', 'DDK', 'EEK', 'FFK', 'GGK', 'HHK'], name='Sequence'))
+    df = df.mask(rng.random(df.shape) < 0.4)
+    df.iloc[0, 0] = 0.0  # observed zero
+
+    matrix = SparseMatrix.from_frame(df, max_memory=8 * 11 * 3)
+    assert matrix.nnz == df.notna().sum().sum()
+    pd.testing.assert_frame_equal(matrix.to_dense(), df)
+    pd.testing.assert_series_equal(matrix.count(), df.count())
+    pd.testing.assert_series_equal(matrix.count(axis=1), df.count(axis=1))
+    pd.testing.assert_series_equal(matrix.notna().sum(axis=1), df.notna().sum(axis=1))
+    pd.testing.assert_frame_equal(matrix.T.to_dense(), df.T)
+    pd.testing.assert_frame_equal(np.log2(matrix).to_dense(), np.log2(df))
+    pd.testing.assert_series_equal(matrix.stack(), df.stack())
+
+    mask = df.index.str.endswith(('1', '3'))
+    pd.testing.assert_frame_equal(matrix.loc[mask].to_dense(), df.loc[mask])
+    pd.testing.assert_frame_equal(matrix.loc[mask.tolist()].to_dense(), df.loc[mask.tolist()])
+    pd.testing.assert_frame_equal(matrix.loc[:, [True, False] * 3 + [True]].to_dense(),
+                                  df.loc[:, [True, False] * 3 + [True]])
+    pd.testing.assert_frame_equal(matrix.loc[pd.Series(mask, index=df.index), ['DDK', 'AAK']].to_dense(),
+                                  df.loc[mask, ['DDK', 'AAK']])
+    pd.testing.assert_frame_equal(matrix.sort_index().to_dense(), df.sort_index())
+    pd.testing.assert_frame_equal(matrix.rename(columns={'AAK': 'A'}).to_dense(), df.rename(columns={'AAK': 'A'}))
+
+    folder = matrix.T.save(tmp_path / 'sparse')
+    pd.testing.assert_frame_equal(SparseMatrix.load(folder).to_dense(), df.T)
+
+
+def test_analyze_peptides_from_sparse(tmp_path):
+    from hela_data.analyzers.analyzers import AnalyzePeptides
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(rng.lognormal(18, 2, size=(6, 5)),
+                      index=pd.Index([f'sample_{i}' for i in range(6)], name='Sample ID'),
+                      columns=pd.Index(['AAK', 'CCK', 'DDK', 'EEK', 'FFK'], name='Sequence'))
+    df = df.mask(rng.random(df.shape) < 0.3)
+    folder = SparseMatrix.from_frame(df.T, format='csc').save(tmp_path / 'sparse')  # features x samples
+
+    analysis = AnalyzePeptides.from_sparse(folder)
+    assert analysis.fname_stub == 'N00006_M00005'
+    pd.testing.assert_series_equal(analysis.get_prop_not_na(), AnalyzePeptides(df).get_prop_not_na())
+    pd.testing.assert_frame_equal(analysis.df_long, AnalyzePeptides(df).df_long)
+    analysis.log_transform(np.log2)
+    pd.testing.assert_frame_equal(analysis.df.to_dense(), np.log2(df))
@@ -0,0 +1,364 @@
+import multiprocessing
+import os
+import zipfile
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import hela_data.io.cache
+from hela_data.io import mq
+
+from conftest import create_mq_txt_folder
+
+
+def test_maxquantoutput_cache(mq_txt_folder, monkeypatch):
+    mq_output = mq.MaxQuantOutput(mq_txt_folder, cache=True)
+    expected = mq_output.evidence
+    fpath_cache = hela_data.io.cache.get_cache_fpath(mq_txt_folder / 'evidence.txt')
+    assert fpath_cache.exists()
+
+    def raise_on_parse(*args, **kwargs):
+        raise AssertionError('text file parsed despite valid cache')
+
+    hela_data.io.cache.TABLE_CACHE.clear()
+    with monkeypatch.context() as m:
+        m.setattr(pd, 'read_table', raise_on_parse)
+        actual = mq.MaxQuantOutput(mq_txt_folder, cache=True).evidence
+    pd.testing.assert_frame_equal(expected, actual)
+
+
+def test_maxquantoutput_cache_outdated(mq_txt_folder):
+    _ = mq.MaxQuantOutput(mq_txt_folder, cache=True).peptides
+    fpath = mq_txt_folder / 'peptides.txt'
+    lines = fpath.read_text().splitlines(keepends=True)
+    fpath.write_text(''.join(lines[:-1]))
+    stat = fpath.stat()
+    os.utime(fpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    actual = mq.MaxQuantOutput(mq_txt_folder, cache=True).peptides
+    assert len(actual) == len(lines) - 2
+
+
+def test_maxquantoutputdynamic_cache_root(mq_txt_folder, tmp_path):
+    cache_root = tmp_path / 'cache'
+    mq_output = mq.MaxQuantOutputDynamic(mq_txt_folder, cache=cache_root)
+    expected = mq_output.proteinGroups
+    fpath_cache = hela_data.io.cache.get_cache_fpath(mq_txt_folder / 'proteinGroups.txt', cache_root=cache_root)
+    assert fpath_cache.exists()
+    assert fpath_cache.parent.parent == cache_root
+    assert not (mq_txt_folder / hela_data.io.cache.CACHE_FOLDER_NAME).exists()
+
+    hela_data.io.cache.TABLE_CACHE.clear()
+    actual = mq.MaxQuantOutputDynamic(mq_txt_folder, cache=cache_root).proteinGroups
+    pd.testing.assert_frame_equal(expected, actual)
+
+
+def test_cache_root_same_folder_name(tmp_path):
+    cache_root = tmp_path / 'cache'
+    fpath_1 = hela_data.io.cache.get_cache_fpath(tmp_path / 'a' / 'txt' / 'summary.txt', cache_root=cache_root)
+    fpath_2 = hela_data.io.cache.get_cache_fpath(tmp_path / 'b' / 'txt' / 'summary.txt', cache_root=cache_root)
+    assert fpath_1 != fpath_2
+    assert fpath_1.parent.name.startswith('txt-')
+
+
+def test_maxquantoutputdynamic_unregistered_file(mq_txt_folder):
+    (mq_txt_folder / 'libraryMatch.txt').write_text('id\tScore\n0\t1.5\n')
+    mq_output = mq.MaxQuantOutputDynamic(mq_txt_folder, cache=True)
+    assert mq_output.libraryMatch.loc[0, 'Score'] == 1.5
+    with pytest.raises(AttributeError):
+        mq_output.notAFile
+
+
+def test_load_columns(mq_txt_folder):
+    columns = ['Charge', 'Gene names', 'Raw file', 'Intensity', 'Reverse']
+    mq_output = mq.MaxQuantOutput(mq_txt_folder)
+    evidence = mq_output.load('evidence', columns=columns)
+    assert evidence.index.name == 'Sequence'
+    assert list(evidence.columns) == columns
+    assert isinstance(evidence['Gene names'].dtype, pd.CategoricalDtype)
+    assert isinstance(evidence['Raw file'].dtype, pd.CategoricalDtype)
+    assert evidence['Intensity'].dtype == pd.Int64Dtype()
+    assert evidence['Intensity'].isna().sum() == 1
+    expected = mq_output.evidence
+    assert evidence['Charge'].tolist() == expected['Charge'].tolist()
+    pd.testing.assert_series_equal(evidence['Intensity'].astype(float), expected['Intensity'])
+
+
+def test_load_columns_from_cache(mq_txt_folder, monkeypatch):
+    columns = ['Proteins', 'Score', 'Intensity', 'Potential contaminant']
+    expected = mq.MaxQuantOutput(mq_txt_folder).load('peptides', columns=columns)
+    _ = mq.MaxQuantOutput(mq_txt_folder, cache=True).peptides
+
+    def raise_on_parse(*args, **kwargs):
+        raise AssertionError('text file parsed despite valid cache')
+
+    hela_data.io.cache.TABLE_CACHE.clear()
+    monkeypatch.setattr(pd, 'read_table', raise_on_parse)
+    actual = mq.MaxQuantOutput(mq_txt_folder, cache=True).load('peptides', columns=columns)
+    pd.testing.assert_frame_equal(expected, actual)
+
+
+def test_iter_table(mq_txt_folder):
+    mq_output = mq.MaxQuantOutput(mq_txt_folder)
+    columns = ['Charge', 'Score', 'Intensity']
+    chunks = list(mq_output.iter_table('evidence', chunksize=3, columns=columns))
+    assert len(chunks) == 3
+    evidence = pd.concat(chunks)
+    assert list(evidence.columns) == columns
+    assert evidence.index.tolist() == ['AAAAAK', 'AAAAAK', 'AAAAAK', 'LLMMNNR']
+    assert evidence['Intensity'].dtype == pd.Int64Dtype()
+
+    expected = mq_output.load('evidence', columns=columns + mq.FLAG_COLUMNS)
+    expected = expected.loc[mq.get_selection_mask(expected), columns]
+    pd.testing.assert_frame_equal(evidence, expected)
+
+
+def test_iter_table_predicate(mq_txt_folder):
+    mq_output = mq.MaxQuantOutput(mq_txt_folder)
+    chunks = mq_output.iter_table('evidence', chunksize=2, columns=['Charge'],
+                                  predicate=lambda df: df['Charge'] == 2)
+    evidence = pd.concat(chunks)
+    assert evidence.index.tolist() == ['AAAAAK', 'AAAAAK', 'LLMMNNR']
+
+    chunks = mq_output.iter_table('peptides', chunksize=10, select=False)
+    assert len(pd.concat(chunks)) == 6
+
+
+@pytest.fixture
+def mq_zip_archive(mq_txt_folder):
+    fpath = mq_txt_folder.parent / f'{mq_txt_folder.name}.zip'
+    with zipfile.ZipFile(fpath, 'w') as z:
+        for file in mq_txt_folder.iterdir():
+            z.write(file, arcname=f'{mq_txt_folder.name}/{file.name}')
+    return fpath
+
+
+def test_maxquantoutput_zip(mq_txt_folder, mq_zip_archive):
+    mq_output = mq.MaxQuantOutput(mq_zip_archive)
+    assert 'sample_1/evidence.txt' in mq_output.files
+    expected = mq.MaxQuantOutput(mq_txt_folder)
+    pd.testing.assert_frame_equal(mq_output.peptides, expected.peptides)
+    pd.testing.assert_frame_equal(mq_output.load('evidence', columns=['Charge']),
+                                  expected.load('evidence', columns=['Charge']))
+    chunks = mq_output.iter_table('evidence', chunksize=2, columns=['Score'])
+    assert len(pd.concat(chunks)) == 4
+    with pytest.raises(FileNotFoundError):
+        mq_output.msms
+
+
+def test_maxquantoutputdynamic_zip_cache(mq_zip_archive):
+    mq_output = mq.MaxQuantOutputDynamic(mq_zip_archive, cache=True)
+    expected = mq_output.proteinGroups
+    cache_root = mq_zip_archive.parent / hela_data.io.cache.CACHE_FOLDER_NAME
+    fpath_cache = hela_data.io.cache.get_cache_fpath(mq_zip_archive.with_suffix('') / 'proteinGroups.txt',
+                                                     cache_root=cache_root)
+    assert fpath_cache.exists()
+    hela_data.io.cache.TABLE_CACHE.clear()
+    actual = mq.MaxQuantOutputDynamic(mq_zip_archive, cache=True).proteinGroups
+    pd.testing.assert_frame_equal(expected, actual)
+
+
+def test_maxquantoutput_tables_kept_on_instance(mq_txt_folder, monkeypatch):
+    mq_output = mq.MaxQuantOutput(mq_txt_folder)
+    peptides = mq_output.peptides
+    peptides.drop(peptides.index[0], inplace=True)
+    mq_output_dynamic = mq.MaxQuantOutputDynamic(mq_txt_folder)
+    proteinGroups = mq_output_dynamic.proteinGroups
+
+    def raise_on_parse(*args, **kwargs):
+        raise AssertionError('text file parsed again')
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, 'read_table', raise_on_parse)
+        assert mq_output.peptides is peptides
+        assert mq_output_dynamic.proteinGroups is proteinGroups
+
+
+def test_table_cache_disabled_by_default(mq_txt_folder):
+    table_cache = hela_data.io.cache.TABLE_CACHE
+    _ = mq.MaxQuantOutput(mq_txt_folder).peptides
+    assert len(table_cache) == 0
+
+
+def test_table_cache_shared_between_instances(mq_txt_folder):
+    table_cache = hela_data.io.cache.TABLE_CACHE
+    table_cache.resize(2**30)
+    peptides = mq.MaxQuantOutput(mq_txt_folder).peptides
+    pd.testing.assert_frame_equal(mq.MaxQuantOutputDynamic(mq_txt_folder).peptides, peptides)
+    assert table_cache.cache_info().hits == 1
+    assert table_cache.cache_info().misses == 1
+
+    evidence = mq.MaxQuantOutput(mq_txt_folder).load('evidence', columns=['Charge'])
+    pd.testing.assert_frame_equal(mq.MaxQuantOutput(mq_txt_folder).load('evidence', columns=['Charge']), evidence)
+    _ = mq.MaxQuantOutput(mq_txt_folder).load('evidence', columns=['Score'])
+    assert len(table_cache) == 3
+    assert table_cache.cache_info().hits == 2
+
+
+def test_table_cache_returns_copies(mq_txt_folder):
+    hela_data.io.cache.TABLE_CACHE.resize(2**30)
+    peptides = mq.MaxQuantOutput(mq_txt_folder).peptides
+    expected = peptides.copy()
+    peptides.iloc[:, 0] = None
+    peptides.drop(peptides.index[0], inplace=True)
+    actual = mq.MaxQuantOutput(mq_txt_folder).peptides
+    pd.testing.assert_frame_equal(actual, expected)
+    actual.iloc[:, 0] = None
+    pd.testing.assert_frame_equal(mq.MaxQuantOutput(mq_txt_folder).peptides, expected)
+
+
+def test_table_cache_disabled_in_forked_child():
+    table_cache = hela_data.io.cache.TABLE_CACHE
+    table_cache.resize(2**30)
+    table_cache.put('a', pd.DataFrame({'a': range(10)}))
+    with multiprocessing.get_context('fork').Pool(1) as p:
+        assert p.apply(_table_cache_info) == (0, 0)
+    assert len(table_cache) == 1
+
+
+def _table_cache_info():
+    table_cache = hela_data.io.cache.TABLE_CACHE
+    table_cache.put('b', pd.DataFrame({'b': range(10)}))
+    return len(table_cache), table_cache.max_bytes
+
+
+def test_table_cache_eviction():
+    table_cache = hela_data.io.cache.TableCache(max_bytes=2_000)
+    df = pd.DataFrame({'a': range(100)})  # 800 bytes + index
+    assert table_cache.put('a', df)
+    assert table_cache.put('b', df)
+    pd.testing.assert_frame_equal(table_cache.get('a'), df)  # b is now least recently used
+    assert table_cache.put('c', df)
+    assert 'b' not in table_cache
+    assert table_cache.get('b') is None
+    info = table_cache.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 1, 1, 2)
+    assert not table_cache.put('d', pd.DataFrame({'a': range(1_000)}))
+    table_cache.resize(0)
+    assert len(table_cache) == 0 and table_cache.nbytes == 0
+
+
+def _calculate_completness_reference(peps_exact_cleaved, peps_in_data):
+    # previous double loop implementation
+    c = 0
+    if not peps_exact_cleaved:
+        return 0
+    for _pep in peps_exact_cleaved:
+        for _found_pep in peps_in_data:
+            if _pep in _found_pep:
+                c += 1
+                break
+        if c == len(peps_in_data):
+            break
+    return c / len(peps_exact_cleaved)
+
+
+def test_calculate_completness_for_sample():
+    rng = np.random.default_rng(42)
+    alphabet = list('ACDEK')
+    for _ in range(200):
+        peps_exact = [''.join(rng.choice(alphabet, size=rng.integers(1, 4)))
+                      for _ in range(rng.integers(0, 8))]
+        peps_in_data = [''.join(rng.choice(alphabet, size=rng.integers(2, 9)))
+                        for _ in range(rng.integers(0, 6))]
+        expected = _calculate_completness_reference(peps_exact, peps_in_data)
+        assert mq.calculate_completness_for_sample(peps_exact, peps_in_data) == expected
+
+
+def test_peptide_matcher_ranges():
+    matcher = mq.PeptideMatcher(['AAK', 'CCDK', 'EEK'])
+    assert matcher.is_contained('CD')
+    assert not matcher.is_contained('KC')  # no match across peptides
+    assert not matcher.is_contained('CD', start=2)
+    assert matcher.is_contained('AK', stop=1)
+    assert not matcher.is_contained('AK', start=1, stop=1)
+    assert matcher.completeness(['EEK', 'AAK', 'CC'], start=1) == 2 / 3
+
+
+FASTA_DB = {'P12345': {'peptides': [['AAAAAK', 'CCDDEEK', 'XXK']]},
+            'Q67890': {'peptides': [['LLMMNNR', 'YYAACDK']]}}
+
+
+def test_extract_from_peptides_txt_parquet(tmp_path):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / sample) for sample in ['sample_1', 'sample_2']]
+    for folder in folders:
+        mq_output = mq.MaxQuantOutput(folder)
+        completeness = mq.ExtractFromPeptidesTxt(tmp_path / 'genes', mq_output, FASTA_DB,
+                                                 out_format='parquet')()
+        assert completeness == mq.ExtractFromPeptidesTxt(tmp_path / 'json', mq_output, FASTA_DB)()
+    assert completeness == {'GENE1': 2 / 3, 'GENE2': 1 / 3}
+    assert sorted(f.name for f in (tmp_path / 'json' / 'sample_1').iterdir()) == [
+        '0_completeness_all_genes.json', 'GENE1.json']
+
+    gene = mq.read_gene_dataset(tmp_path / 'genes', gene='GENE1')
+    assert gene[mq.SAMPLE_ID].tolist() == ['sample_1', 'sample_1', 'sample_2', 'sample_2']
+    assert gene.index.tolist() == ['AAAAAK', 'CCDDEEK'] * 2
+    expected = pd.read_json(tmp_path / 'json' / 'sample_1' / 'GENE1.json')
+    pd.testing.assert_series_equal(gene.loc[gene[mq.SAMPLE_ID] == 'sample_1', 'Intensity'],
+                                   expected['Intensity'], check_names=False, check_index=False)
+    assert mq.read_gene_dataset(tmp_path / 'genes', gene='GENE2').empty
+    assert list(mq.read_gene_dataset(tmp_path / 'genes', columns=['Intensity']).columns) == ['Intensity']
+
+
+def test_extract_from_peptides_txt_parquet_empty_sample(tmp_path):
+    # no peptide of sample_1 matches
+    fasta_db = {protein: {'peptides': [['WWWWK']]} for protein in FASTA_DB}
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / sample) for sample in ['sample_1', 'sample_2']]
+    completeness = mq.ExtractFromPeptidesTxt(tmp_path / 'genes', mq.MaxQuantOutput(folders[0]), fasta_db,
+                                             out_format='parquet')()
+    assert max(completeness.values()) < 0.6
+    mq.ExtractFromPeptidesTxt(tmp_path / 'genes', mq.MaxQuantOutput(folders[1]), FASTA_DB,
+                              out_format='parquet')()
+    assert len(list((tmp_path / 'genes').glob('*.parquet'))) == 2
+
+    genes = mq.read_gene_dataset(tmp_path / 'genes')
+    assert genes[mq.SAMPLE_ID].unique().tolist() == ['sample_2']
+    assert genes.index.tolist() == ['AAAAAK', 'CCDDEEK']
+    assert genes['Intensity'].dtype == 'int64'
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_extract_from_folders(tmp_path, n_workers):
+    folders = [create_mq_txt_folder(tmp_path / 'txt' / sample) for sample in ['sample_1', 'sample_2']]
+    (tmp_path / 'txt' / 'sample_3').mkdir()  # empty folder
+    folders.append(tmp_path / 'txt' / 'sample_3')
+    results = mq.extract_from_folders(folders, tmp_path / 'genes', FASTA_DB, n_workers=n_workers)
+    assert results.completeness.columns.tolist() == ['sample_1', 'sample_2']
+    assert results.completeness['sample_2'].to_dict() == {'GENE1': 2 / 3, 'GENE2': 1 / 3}
+    assert results.report.index.tolist() == ['sample_1', 'sample_2', 'sample_3']
+    assert results.report['error'].notna().tolist() == [False, False, True]
+    assert (tmp_path / 'genes' / 'sample_1' / 'GENE1.json').exists()
+
+
+GENE_SETS = ['GENE1', 'GENE1;GENE2', None, 'GENE3;GENE1', 'GENE1;GENE2', '', 'GENE2']
+
+
+def test_count_genes_in_sets():
+    expected = Counter()
+    for gene_set in GENE_SETS:
+        if gene_set is not None:
+            expected.update(gene_set.split(';'))
+    assert mq.count_genes_in_sets(GENE_SETS) == expected
+    assert mq.count_genes_in_sets(pd.Series(GENE_SETS, dtype='category')) == expected
+    assert mq.get_set_of_genes(GENE_SETS) == set(expected)
+
+
+def test_explode_gene_sets():
+    expected = pd.Series(GENE_SETS).str.split(';').explode()
+    expected = expected.where(expected.notna(), np.nan)
+    rows, genes = mq.explode_gene_sets(GENE_SETS)
+    assert rows.tolist() == expected.index.tolist()
+    pd.testing.assert_series_equal(pd.Series(genes, index=rows), expected, check_dtype=False)
+
+
+def test_get_gene_incidence():
+    peptides = pd.Series(GENE_SETS, index=[f'PEP{i}' for i in range(len(GENE_SETS))])
+    incidence = mq.get_gene_incidence(peptides)
+    assert incidence.matrix.shape == (7, 4)
+    assert incidence.index.equals(peptides.index)
+    counts = dict(zip(incidence.genes, incidence.matrix.sum(axis=0).A1))
+    assert counts == mq.count_genes_in_sets(GENE_SETS)
+    assert incidence.matrix[1].toarray().tolist() == [[1, 1, 0, 0]]
+    assert incidence.matrix[2].nnz == 0
@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 import hela_data.pandas
 
 
@@ -37,3 +40,26 @@ def test_flatten_dict_of_dicts():
     actual = hela_data.pandas.flatten_dict_of_dicts(data)
 
     assert expected == actual
+
+
+def select_max_by_sorting(df, grouping_columns, selection_column):
+    # previous implementation based on sorting
+    df = df.sort_values(by=[*grouping_columns, selection_column], ascending=False)
+    return df.drop_duplicates(subset=grouping_columns, keep='first')
+
+
+def test_select_max_by():
+    rng = np.random.default_rng(42)
+    n = 1_000
+    df = pd.DataFrame({'Sequence': rng.choice(['AAK', 'CCK', 'DDK', 'EEK', None], size=n),
+                       'Charge': rng.integers(1, 4, size=n),
+                       'Score': rng.choice([10.0, 20.0, 30.0, np.nan], size=n)})
+    # group with missing scores only
+    df.loc[n] = ['FFK', 2, np.nan]
+    df.loc[n + 1] = ['FFK', 2, np.nan]
+    grouping_columns = ['Sequence', 'Charge']
+    actual = hela_data.pandas.select_max_by(df, grouping_columns, 'Score')
+    expected = select_max_by_sorting(df, grouping_columns, 'Score')
+    assert actual.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(actual, expected.sort_index())
+    assert hela_data.pandas.select_max_by(df.iloc[:0], grouping_columns, 'Score').empty
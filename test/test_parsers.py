@@ -0,0 +1,100 @@
+import importlib
+
+import pandas as pd
+import pytest
+
+from hela_data import file_utils
+from hela_data.io import mq, parsers
+
+from conftest import TABLES, create_mq_txt_folder
+
+EDGE_CASES = """\
+id\tSequence\tEmpty\tFlag\tDate\tIDs\tCount\tMixed
+0\tAAAK\t\tTrue\t2020-01-01\t1;2\t1\tNA
+1\tCCK\t\tFalse\t2020-01-02\t3\t\t+
+2\tDDK\t\t\t2020-01-03\t4\t3\tn/a
+"""
+
+
+@pytest.fixture
+def txt_folder(tmp_path):
+    folder = create_mq_txt_folder(tmp_path / 'sample_1')
+    (folder / 'edge_cases.txt').write_text(EDGE_CASES)
+    return folder
+
+
+def assert_parity(fpath, **kwargs):
+    expected = parsers.read_table(fpath, engine='c', **kwargs)
+    actual = parsers.read_table(fpath, engine='pyarrow', **kwargs)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize('fname', [*TABLES, 'edge_cases.txt'])
+def test_read_table_parity(txt_folder, fname):
+    assert_parity(txt_folder / fname)
+    assert_parity(txt_folder / fname, index_col=0, low_memory=False)
+    with open(txt_folder / fname, 'rb') as f:
+        expected = parsers.read_table(f, engine='pyarrow')
+    pd.testing.assert_frame_equal(expected, parsers.read_table(txt_folder / fname))
+
+
+@pytest.mark.parametrize('fname', ['evidence.txt', 'peptides.txt', 'proteinGroups.txt'])
+def test_read_table_parity_dtypes(txt_folder, fname):
+    file = fname.removesuffix('.txt')
+    columns = list(pd.read_table(txt_folder / fname, nrows=0).columns[[0, 2, 3, 5, 7, 8]])
+    assert_parity(txt_folder / fname, usecols=columns, index_col=columns[0])
+    assert_parity(txt_folder / fname, usecols=columns, dtype=mq.get_dtypes(file, columns))
+    assert_parity(txt_folder / fname, dtype=mq.MQ_DTYPES[file])
+
+
+def test_read_table_parity_edge_cases(txt_folder):
+    fpath = txt_folder / 'edge_cases.txt'
+    assert_parity(fpath, usecols=['Sequence', 'IDs', 'Count'], index_col='Sequence')
+    assert_parity(fpath, dtype={'IDs': 'category', 'Count': pd.Int64Dtype(), 'Empty': str})
+    assert_parity(fpath, dtype=str)
+    df = parsers.read_table(fpath, engine='pyarrow')
+    assert df['Date'].tolist() == ['2020-01-01', '2020-01-02', '2020-01-03']
+    assert df['Mixed'].isna().tolist() == [True, False, True]
+
+
+def test_file_utils_loaders_parity(txt_folder):
+    pd.testing.assert_frame_equal(file_utils.load_summary(txt_folder / 'summary.txt', engine='pyarrow'),
+                                  file_utils.load_summary(txt_folder / 'summary.txt', engine='c'))
+    fpath = txt_folder / 'proteinGroups.txt'
+    pd.testing.assert_frame_equal(file_utils.load_protein_intensities(fpath, engine='pyarrow'),
+                                  file_utils.load_protein_intensities(fpath, engine='c'))
+
+
+def test_data_objects_loaders_parity(txt_folder, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_objects = importlib.import_module('hela_data.io.data_objects')
+    for engine in parsers.ENGINES:
+        parsers.set_parse_engine(engine)
+        try:
+            loaded = [data_objects.load_process_peptides(txt_folder, data_objects.usecols),
+                      data_objects.load_process_evidence(txt_folder, use_cols=['Score', 'Intensity',
+                                                                               'Reverse', 'Potential contaminant'],
+                                                         select_by='Score'),
+                      data_objects.load_and_process_proteinGroups(txt_folder)]
+        finally:
+            parsers.set_parse_engine('c')
+        if engine == 'c':
+            expected = loaded
+    for actual, _expected in zip(loaded, expected):
+        pd.testing.assert_frame_equal(actual, _expected)
+
+
+def test_set_parse_engine(txt_folder, monkeypatch):
+    with pytest.raises(ValueError):
+        parsers.set_parse_engine('python')
+    parsers.set_parse_engine('pyarrow')
+    try:
+        assert parsers.get_parse_engine() == 'pyarrow'
+
+        def raise_on_parse(*args, **kwargs):
+            raise AssertionError('pandas parser used')
+
+        monkeypatch.setattr(pd, 'read_table', raise_on_parse)
+        assert len(mq.MaxQuantOutput(txt_folder).peptides) == 6
+    finally:
+        parsers.set_parse_engine('c')
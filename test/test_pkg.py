@@ -1,3 +1,20 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# seconds to import data_objects in a fresh interpreter, can be set for slow machines
+IMPORT_TIME_BUDGET = float(os.environ.get('HELA_DATA_IMPORT_TIME_BUDGET', 2.0))
+
+MEASURE_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start,
+                  'modules': sorted(sys.modules)}}))
+"""
 
 
 def test_pkg_imports():
@@ -13,3 +30,31 @@ def test_pkg_imports():
     import hela_data.analyzers.analyzers
     import hela_data.data_handling
     import hela_data.databases.uniprot
+
+
+def measure_import(module, cwd):
+    completed = subprocess.run([sys.executable, '-c', MEASURE_IMPORT.format(module=module)],
+                               cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', ['hela_data', 'hela_data.log', 'hela_data.io.data_objects'])
+def test_import_without_side_effects(module, tmp_path):
+    d = measure_import(module, cwd=tmp_path)
+    assert not list(tmp_path.iterdir()), "import created files or folders"
+    loaded = set(d['modules'])
+    for heavy in ['matplotlib', 'seaborn', 'IPython']:
+        assert heavy not in loaded, f"import of {module} loads {heavy}"
+
+
+def test_import_time(tmp_path):
+    # best of three runs to be robust against a cold file system cache
+    seconds = min(measure_import('hela_data.io.data_objects', cwd=tmp_path)['seconds']
+                  for _ in range(3))
+    assert seconds < IMPORT_TIME_BUDGET, (f"import took {seconds:.2f}s, "
+                                          f"budget is {IMPORT_TIME_BUDGET:.2f}s")
+
+
+def test_lazy_plotting():
+    import hela_data
+    assert hela_data.savefig is hela_data.plotting.savefig
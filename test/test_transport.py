@@ -0,0 +1,36 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from hela_data.io.transport import attach_encoded_samples, prepare_transport, share_encoded_samples
+from hela_data.io.vocabulary import encode_samples
+
+
+def count_chunk(i):
+    index = pd.MultiIndex.from_tuples([('AAAAAK', 2), ('AAAAAK', 3), ('LLMMNNR', 2)], names=['Sequence', 'Charge'])
+    return share_encoded_samples({**encode_samples({f'sample_{i}': index, f'sample_{i}_b': index[1:]}),
+                                  'dumps': {f'sample_{i}': 'dump.csv'}})
+
+
+def test_share_encoded_samples_from_workers():
+    prepare_transport()
+    with multiprocessing.Pool(2) as p:
+        results = p.map(count_chunk, range(2))
+    for i, d in enumerate(results):
+        assert set(d) == {'shared', 'dumps'}
+        with attach_encoded_samples(d) as received:
+            assert received['features'].names == ['Sequence', 'Charge']
+            assert received['features'].tolist() == [('AAAAAK', 2), ('AAAAAK', 3), ('LLMMNNR', 2)]
+            assert {k: v.tolist() for k, v in received['samples'].items()} == {f'sample_{i}': [0, 1, 2],
+                                                                               f'sample_{i}_b': [1, 2]}
+            assert received['dumps'] == {f'sample_{i}': 'dump.csv'}
+
+
+def test_share_encoded_samples_missing_and_empty():
+    d = share_encoded_samples(encode_samples({'sample_1': pd.Index(['AAAAAK', np.nan, 'LLMMNNR'], name='Sequence')}))
+    with attach_encoded_samples(d) as received:
+        assert received['features'].name == 'Sequence'
+        assert received['samples']['sample_1'].tolist() == [0, -1, 1]
+    with attach_encoded_samples(share_encoded_samples(encode_samples({}))) as received:
+        assert len(received['features']) == 0 and received['samples'] == {}
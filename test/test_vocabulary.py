@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from hela_data.io.vocabulary import FeatureVocabulary, encode_samples, merge_encoded_samples
+
+
+def test_feature_vocabulary(tmp_path):
+    vocabulary = FeatureVocabulary(names=['Sequence', 'Charge'])
+    features = pd.MultiIndex.from_tuples([('AAK', 2), ('CCK', 3), ('AAK', 2)])
+    ids = vocabulary.encode(features)
+    assert ids.dtype == np.int32
+    assert ids.tolist() == [0, 1, 0]
+    assert vocabulary.encode(pd.MultiIndex.from_tuples([('DDK', 2), ('CCK', 3)])).tolist() == [2, 1]
+    assert vocabulary.lookup(pd.MultiIndex.from_tuples([('EEK', 1), ('DDK', 2)])).tolist() == [-1, 2]
+    assert len(vocabulary) == 3
+    assert vocabulary.decode([2, 0]).tolist() == [('DDK', 2), ('AAK', 2)]
+
+    vocabulary.save(tmp_path / 'vocabulary.parquet')
+    loaded = FeatureVocabulary.load(tmp_path / 'vocabulary.parquet')
+    assert loaded.index.equals(vocabulary.index)
+    assert loaded.index.names == ['Sequence', 'Charge']
+
+
+def test_encode_samples():
+    encoded = encode_samples({'sample_1': pd.Index(['AAK', 'CCK']),
+                              'sample_2': pd.Index(['CCK', np.nan, 'DDK'])})
+    assert encoded['features'].tolist() == ['AAK', 'CCK', 'DDK']
+    assert encoded['samples']['sample_1'].tolist() == [0, 1]
+    assert encoded['samples']['sample_2'].tolist() == [1, -1, 2]
+    vocabulary = FeatureVocabulary(names=['Gene names'])
+    assert vocabulary.encode(pd.Index(['DDK', np.nan])).tolist() == [0, -1]
+    assert encode_samples({})["samples"] == {}
+
+
+def test_merge_encoded_samples():
+    a = encode_samples({'sample_1': pd.Index(['AAK', 'CCK'])})
+    b = encode_samples({'sample_2': pd.Index(['DDK', np.nan, 'AAK'])})
+    merged = merge_encoded_samples(a, b)
+    assert merged['features'].tolist() == ['AAK', 'CCK', 'DDK']
+    assert merged['samples']['sample_1'].tolist() == [0, 1]
+    assert merged['samples']['sample_2'].tolist() == [2, -1, 0]